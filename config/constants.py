@@ -26,6 +26,22 @@ COLUNAS_DADOS = [
     'numero_caixa', 'size', 'peso'
 ]
 
+# Tipos declarados das colunas de produção - aplicados uma única vez no carregamento
+COLUNAS_CATEGORICAS = [
+    'maquina', 'rej1_defect', 'rej1_local', 'rej2_defect', 'rej2_local',
+    'rej3_defect', 'rej3_local', 'lote', 'size'
+]
+
+COLUNAS_NUMERICAS = ['percent_cam_d', 'percent_cam_w', 'peso']
+
+TIPOS_DADOS = {
+    col: 'category' if col in COLUNAS_CATEGORICAS
+    else 'float32' if col in COLUNAS_NUMERICAS
+    else 'datetime64[ns]' if col == 'data_hora'
+    else 'object'
+    for col in COLUNAS_DADOS
+}
+
 COLUNAS_USUARIOS = ['login', 'senha', 'tipo', 'permissoes', 'primeiro_login']
 
 COLUNAS_LOG = ['acao', 'usuario', 'detalhes', 'data_hora']
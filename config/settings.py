@@ -9,6 +9,36 @@ CSV_FILE = "dados_producao.csv"
 USERS_FILE = "usuarios.csv"
 LOG_FILE = "log_acoes.csv"
 
+# Espelho colunar (Parquet) do CSV de produção, ao lado dele - requer pyarrow
+PARQUET_DIR = "dados_producao_parquet"
+# Registros anexados dentro deste intervalo entram no espelho numa única sincronização
+ATRASO_ESPELHO = 30.0  # segundos
+
+# Armazenamento dos registros: "csv" (padrão) ou "sqlite" (banco indexado ao lado do CSV;
+# na primeira execução os CSVs existentes são importados)
+BACKEND_DADOS = "csv"
+SQLITE_FILE = "dados_producao.db"
+
+# Cubo horário pré-agregado (máquina × hora × defeito) usado pelos gráficos do dashboard
+CUBO_FILE = "dados_producao_cubo.json"
+
+# Índice com o último status de todas as máquinas (lido pelos monitores em uma operação)
+FROTA_FILE = "status_frota.json"
+
+# Publicação de status: documento completo só quando algo muda (ou a cada
+# INTERVALO_STATUS_COMPLETO); entre eles, sinal de vida a cada INTERVALO_HEARTBEAT.
+# Monitores consideram offline após 30s sem sinal - manter o heartbeat bem abaixo disso
+INTERVALO_HEARTBEAT = 10.0       # segundos
+INTERVALO_STATUS_COMPLETO = 300.0  # segundos
+
+# Canal direto de comandos (TCP, um JSON por linha) - o arquivo no compartilhamento continua
+# como alternativa. Desligado por padrão: abre uma porta de escuta em cada coletor
+CANAL_SOCKET_ATIVO = False
+PORTA_COMANDOS = 47810
+# Chave compartilhada (na pasta de rede) que assina cada comando do canal direto; sem ela
+# o canal não abre. Criar uma vez com utils.canal_socket.gerar_chave()
+CHAVE_CANAL_FILE = "canal_comandos.chave"
+
 VERSION = "8.0"
 
 def get_base_path():
@@ -16,10 +16,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import os
 import subprocess
+import threading
+import queue
 from datetime import datetime, timedelta
 
 # -----------------------------
@@ -27,8 +30,16 @@ from datetime import datetime, timedelta
 # -----------------------------
 
 # Importar configurações do coletor para garantir alinhamento 100%
-from config.settings import CAMINHO_REDE, CSV_FILE
-from config.constants import MAQUINAS_VALIDAS, COLUNAS_DADOS
+from config.settings import CAMINHO_REDE, CSV_FILE, PARQUET_DIR, BACKEND_DADOS, SQLITE_FILE, CUBO_FILE
+from config.constants import MAQUINAS_VALIDAS, COLUNAS_DADOS, COLUNAS_NUMERICAS, TIPOS_DADOS
+from data.incremental import LeitorIncremental, LeituraCancelada
+from data.columnar import ArmazemColunar
+from data.sqlite_backend import BackendSQLite
+from data.indice import IndiceTemporal
+from data.rollup import CuboHorario, agregar_janela
+from data.frequencia import COLUNAS_DEFEITO, contar_ocorrencias
+from gui.tabela_virtual import TabelaVirtual
+from data.schema import aplicar_schema, converter_data_hora
 
 # Configurar estilo profissional para os gráficos
 plt.style.use('seaborn-v0_8')
@@ -53,70 +64,254 @@ df = None
 # SISTEMA DE CARREGAMENTO ROBUSTO
 # -----------------------------
 
-def carregar_dataframe_seguro(caminho, colunas_padrao=None):
-    """Carrega DataFrame com tratamento robusto de erros - 100% COMPATÍVEL COM COLETOR"""
+def preparar_dados(df_temp):
+    """Normaliza um bloco de registros do CSV - 100% COMPATÍVEL COM COLETOR"""
+    # Garantir que todas as colunas do coletor existem
+    for col in COLUNAS_DADOS:
+        if col not in df_temp.columns:
+            df_temp[col] = '' if col not in ['percent_cam_d', 'percent_cam_w'] else 0.0
+    
+    # Colunas acrescentadas acima também entram no esquema tipado
+    df_temp = aplicar_schema(df_temp, TIPOS_DADOS)
+    
+    # Numéricas vazias contam como zero (mesma lógica do coletor)
+    for col in COLUNAS_NUMERICAS:
+        df_temp[col] = df_temp[col].fillna(0.0)
+    
+    df_temp = df_temp.dropna(subset=['data_hora'])
+    
+    # Filtrar máquinas válidas (mesma lista do coletor)
+    return df_temp[df_temp['maquina'].isin(MAQUINAS_VALIDAS)].copy()
+
+# Leitor incremental: cada ATUALIZAR DADOS processa só as linhas anexadas ao CSV
+leitor_csv = LeitorIncremental(CSV_FILE, COLUNAS_DADOS, TIPOS_DADOS, filtro=preparar_dados)
+
+# Espelho Parquet do CSV: gráficos leem só as colunas/partições de que precisam
+espelho = ArmazemColunar(os.path.join(os.path.dirname(CSV_FILE), PARQUET_DIR), CSV_FILE, TIPOS_DADOS)
+
+# Com BACKEND_DADOS = "sqlite" os filtros viram SELECTs indexados e só os
+# últimos DIAS_CARREGADOS_SQLITE dias ficam em memória para a tabela principal
+backend_sqlite = BackendSQLite(os.path.join(os.path.dirname(CSV_FILE), SQLITE_FILE), TIPOS_DADOS) if BACKEND_DADOS == 'sqlite' else None
+DIAS_CARREGADOS_SQLITE = 31
+
+# Índice temporal do frame carregado (refeito só quando o frame muda)
+indice_temporal = None
+
+def indexar(df_total):
+    """Retorna o índice temporal do frame, reaproveitando o existente quando possível"""
+    global indice_temporal
+    if indice_temporal is None or not indice_temporal.indexa(df_total):
+        indice_temporal = IndiceTemporal(df_total)
+    return indice_temporal
+
+# Cubo horário (máquina × hora × defeito) dos gráficos: acompanha o leitor do CSV
+# e fica gravado ao lado dele; `cubo_horario` é o que corresponde ao frame exibido
+CUBO_PATH = os.path.join(os.path.dirname(CSV_FILE), CUBO_FILE)
+cubo_leitor = None
+cubo_horario = None
+
+def _atualizar_cubo(novos, completo):
+    """Aplica ao cubo o que o leitor acabou de ler (chamado sob a trava do leitor)"""
+    global cubo_leitor
     try:
-        if os.path.exists(caminho):
-            print(f"📁 Carregando CSV de: {caminho}")
-            df_temp = pd.read_csv(caminho, dtype=str)
-            print(f"✅ CSV carregado: {len(df_temp)} registros")
-            
-            # Garantir que todas as colunas do coletor existem
-            for col in COLUNAS_DADOS:
-                if col not in df_temp.columns:
-                    df_temp[col] = '' if col not in ['percent_cam_d', 'percent_cam_w'] else 0.0
-            
-            # Tratar colunas numéricas (mesma lógica do coletor)
-            for col in ['percent_cam_d', 'percent_cam_w', 'peso']:
-                if col in df_temp.columns:
-                    df_temp[col] = pd.to_numeric(df_temp[col], errors='coerce').fillna(0.0)
-            
-            # Converter data/hora (mesma lógica do coletor)
-            if 'data_hora' in df_temp.columns:
-                df_temp['data_hora'] = pd.to_datetime(df_temp['data_hora'], errors='coerce')
-            
-            df_temp = df_temp.dropna(subset=['data_hora']).copy()
-            
-            # Filtrar máquinas válidas (mesma lista do coletor)
-            if 'maquina' in df_temp.columns:
-                maquinas_atuais = df_temp['maquina'].unique()
-                print(f"🏭 Máquinas encontradas: {maquinas_atuais.tolist()}")
-                df_temp = df_temp[df_temp['maquina'].isin(MAQUINAS_VALIDAS)].copy()
-            
-            print(f"🎯 Dados finais carregados: {len(df_temp)} registros")
-            return df_temp
-            
+        if completo or cubo_leitor is None:
+            salvo, estado = CuboHorario.carregar(CUBO_PATH)
+            if salvo is not None and estado == leitor_csv.estado():
+                print("🧊 Cubo horário reaproveitado do disco")
+                cubo_leitor = salvo
+                return cubo_leitor
+            cubo_leitor = CuboHorario.de_registros(novos if completo else leitor_csv.df)
+        elif len(novos) > 0:
+            cubo_leitor = cubo_leitor.mesclar(CuboHorario.de_registros(novos))
         else:
+            return cubo_leitor
+        cubo_leitor.salvar(CUBO_PATH, leitor_csv.estado())
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar cubo horário: {e}")
+        cubo_leitor = None
+    return cubo_leitor
+
+def carregar_dataframe_seguro(caminho=CSV_FILE, colunas_padrao=None):
+    """Carrega DataFrame com tratamento robusto de erros - 100% COMPATÍVEL COM COLETOR"""
+    try:
+        if not os.path.exists(caminho):
             print(f"⚠️ Arquivo CSV não encontrado: {caminho}")
-            return pd.DataFrame(columns=COLUNAS_DADOS)
+        
+        print(f"📁 Carregando CSV de: {caminho}")
+        if caminho == leitor_csv.caminho:
+            df_temp = leitor_csv.carregar(ao_ler=_atualizar_cubo)
+        else:
+            df_temp = LeitorIncremental(caminho, COLUNAS_DADOS, TIPOS_DADOS, filtro=preparar_dados).carregar()
+        
+        print(f"🎯 Dados finais carregados: {len(df_temp)} registros")
+        return df_temp
             
     except Exception as e:
         print(f"❌ Erro ao carregar CSV: {e}")
         return pd.DataFrame(columns=COLUNAS_DADOS)
 
-def load_data_source():
-    """Carrega dados diretamente do CSV na rede - COMPATÍVEL COM COLETOR"""
-    global df
+# Carga em segundo plano: a thread de trabalho só lê/prepara os dados e
+# devolve o resultado pela fila; a interface aplica via root.after
+fila_carregamento = queue.Queue()
+geracao_carregamento = 0
+cancelar_carregamento = threading.Event()
+carregando = False
+verificando_carregamento = False
+callbacks_pos_carga = []
+
+ETAPAS_CARREGAMENTO = {
+    'lendo': "Lendo arquivo",
+    'processando': "Processando registros",
+    'consultando': "Consultando banco",
+}
+
+def _carregar_em_segundo_plano(geracao, cancelar):
+    """Worker: carrega e indexa os dados sem tocar na interface"""
+    def progresso(etapa, fracao):
+        fila_carregamento.put(('progresso', geracao, (etapa, fracao)))
+    
+    leitura = {}
+    def ao_ler(novos, completo):
+        leitura['cubo'] = _atualizar_cubo(novos, completo)
     
     try:
-        df = carregar_dataframe_seguro(CSV_FILE)
-        
-        if df is not None and not df.empty:
-            atualizar_tree(df)
-            atualizar_status()
-            messagebox.showinfo("Sucesso", f"Dados atualizados com sucesso!\n{len(df)} registros carregados.")
+        if backend_sqlite is not None:
+            progresso('consultando', 0.0)
+            inicio = datetime.now() - timedelta(days=DIAS_CARREGADOS_SQLITE)
+            dados = preparar_dados(backend_sqlite.consultar(inicio=inicio, maquinas=MAQUINAS_VALIDAS))
         else:
-            atualizar_tree(None)
-            atualizar_status()
-            messagebox.showinfo("Informação", "Nenhum dado encontrado. Verifique o arquivo de produção.")
-            
+            print(f"📁 Carregando CSV de: {CSV_FILE}")
+            dados = leitor_csv.carregar(progresso=progresso, cancelar=cancelar, ao_ler=ao_ler)
+        
+        if cancelar.is_set():
+            raise LeituraCancelada()
+        
+        # Ordenação por data_hora (índice dos filtros) também fora da thread da interface
+        indice = IndiceTemporal(dados) if dados is not None and not dados.empty else None
+        fila_carregamento.put(('concluido', geracao, (dados, indice, leitura.get('cubo'))))
+    except LeituraCancelada:
+        print("⏹️ Carregamento cancelado")
+        fila_carregamento.put(('cancelado', geracao, None))
+        return
     except Exception as e:
         print(f"❌ Erro crítico ao carregar dados: {e}")
-        messagebox.showerror("Erro", f"Falha crítica ao carregar dados: {e}")
+        fila_carregamento.put(('erro', geracao, e))
+        return
+    
+    if backend_sqlite is None and espelho.disponivel:
+        espelho.sincronizar()
+
+def load_data_source(apos=None):
+    """Inicia a carga dos dados do CSV na rede - COMPATÍVEL COM COLETOR
+    
+    Uma nova chamada durante a carga abandona a anterior. `apos` é chamado
+    na thread da interface depois que os novos dados forem aplicados.
+    """
+    global geracao_carregamento, cancelar_carregamento, carregando, verificando_carregamento
+    
+    cancelar_carregamento.set()
+    cancelar_carregamento = threading.Event()
+    geracao_carregamento += 1
+    carregando = True
+    if apos is not None:
+        callbacks_pos_carga.append(apos)
+    
+    threading.Thread(target=_carregar_em_segundo_plano,
+                     args=(geracao_carregamento, cancelar_carregamento),
+                     daemon=True).start()
+    
+    mostrar_progresso(True)
+    if not verificando_carregamento:
+        verificando_carregamento = True
+        root.after(100, _verificar_carregamento)
+
+def cancelar_carga():
+    """Cancela a carga em andamento (o resultado, se chegar, é descartado)"""
+    global geracao_carregamento, carregando
+    cancelar_carregamento.set()
+    geracao_carregamento += 1
+    carregando = False
+    callbacks_pos_carga.clear()
+    mostrar_progresso(False)
+    status_label.config(text="⏹️ Carregamento cancelado")
+
+def _verificar_carregamento():
+    """Consome a fila do worker na thread da interface"""
+    global verificando_carregamento, carregando
+    
+    try:
+        while True:
+            tipo, geracao, conteudo = fila_carregamento.get_nowait()
+            if geracao != geracao_carregamento:
+                continue  # Resultado de uma carga abandonada
+            
+            if tipo == 'progresso':
+                etapa, fracao = conteudo
+                barra_progresso['value'] = fracao * 100
+                progresso_label.config(text=f"⏳ {ETAPAS_CARREGAMENTO.get(etapa, etapa)}... {fracao:.0%}")
+                continue
+            
+            carregando = False
+            mostrar_progresso(False)
+            if tipo == 'concluido':
+                _aplicar_dados_carregados(*conteudo)
+            elif tipo == 'erro':
+                callbacks_pos_carga.clear()
+                messagebox.showerror("Erro", f"Falha crítica ao carregar dados: {conteudo}")
+            else:
+                callbacks_pos_carga.clear()
+    except queue.Empty:
+        pass
+    
+    if carregando:
+        root.after(100, _verificar_carregamento)
+    else:
+        verificando_carregamento = False
+
+def _aplicar_dados_carregados(dados, indice, cubo=None):
+    """Troca o frame global pelos dados recém-carregados (thread da interface)"""
+    global df, indice_temporal, cubo_horario
+    
+    cubo_horario = cubo
+    if indice is not None:
+        # Frame global fica ordenado por data_hora: filtros viram busca binária
+        indice_temporal = indice
+        df = indice.df
+    else:
+        df = dados
+    
+    if df is not None and not df.empty:
+        atualizar_tree(df)
+        atualizar_status()
+        messagebox.showinfo("Sucesso", f"Dados atualizados com sucesso!\n{len(df)} registros carregados.")
+    else:
+        atualizar_tree(None)
+        atualizar_status()
+        messagebox.showinfo("Informação", "Nenhum dado encontrado. Verifique o arquivo de produção.")
+    
+    callbacks = list(callbacks_pos_carga)
+    callbacks_pos_carga.clear()
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar após carga: {e}")
+
+def mostrar_progresso(ativo):
+    """Mostra/oculta barra de progresso e botão de cancelar na barra de status"""
+    if ativo:
+        barra_progresso['value'] = 0
+        progresso_label.config(text="⏳ Carregando dados...")
+        btn_cancelar_carga.pack(side='right', padx=5)
+        barra_progresso.pack(side='right', padx=5)
+        progresso_label.pack(side='right', padx=5)
+    else:
+        for widget in (progresso_label, barra_progresso, btn_cancelar_carga):
+            widget.pack_forget()
 
-def atualizar_dados():
-    """Atualiza dados globalmente - interface pública"""
-    load_data_source()
+def atualizar_dados(apos=None):
+    """Atualiza dados globalmente - interface pública (carga em segundo plano)"""
+    load_data_source(apos)
 
 # -----------------------------
 # FUNÇÕES UTILITÁRIAS COMPATÍVEIS
@@ -137,20 +332,56 @@ def filtrar(df_total, di, df_final, hi, hf, maquina=None):
         dt_inicio = pd.Timestamp.combine(pd.to_datetime(di).date(), hi)
         dt_fim = pd.Timestamp.combine(pd.to_datetime(df_final).date(), hf)
         
-        if not pd.api.types.is_datetime64_any_dtype(df_total['data_hora']):
-            df_total['data_hora'] = pd.to_datetime(df_total['data_hora'], errors='coerce')
+        if backend_sqlite is not None:
+            # SELECT pelo índice (maquina, data_hora) - sem máscara sobre o DataFrame inteiro
+            maquinas = [maquina] if maquina and maquina.strip() and maquina in MAQUINAS_VALIDAS else MAQUINAS_VALIDAS
+            return preparar_dados(backend_sqlite.consultar(inicio=dt_inicio, fim=dt_fim, maquinas=maquinas))
         
-        mask = (df_total['data_hora'] >= dt_inicio) & (df_total['data_hora'] <= dt_fim)
-        df_filtered = df_total[mask].copy()
+        if not pd.api.types.is_datetime64_any_dtype(df_total['data_hora']):
+            df_total['data_hora'] = converter_data_hora(df_total['data_hora'])
         
-        if maquina and maquina.strip() and maquina in MAQUINAS_VALIDAS:
-            df_filtered = df_filtered[df_filtered['maquina'].astype(str) == maquina]
-            
-        return df_filtered
+        # Busca binária no frame ordenado; máquina resolvida pelo dicionário de posições
+        maquina = maquina if maquina and maquina.strip() and maquina in MAQUINAS_VALIDAS else None
+        return indexar(df_total).recortar(dt_inicio, dt_fim, maquina).copy()
     except Exception as e:
         print(f"⚠️ Erro no filtro: {e}")
         return pd.DataFrame()
 
+def filtrar_colunas(colunas, di, df_final, hi, hf, maquina=None):
+    """Igual a filtrar(), mas lê só as colunas pedidas do espelho colunar quando ele está em dia"""
+    try:
+        if backend_sqlite is None and espelho.em_dia():
+            dt_inicio = pd.Timestamp.combine(pd.to_datetime(di).date(), hi)
+            dt_fim = pd.Timestamp.combine(pd.to_datetime(df_final).date(), hf)
+            maquinas = [maquina] if maquina and maquina.strip() and maquina in MAQUINAS_VALIDAS else MAQUINAS_VALIDAS
+            
+            df_colunas = espelho.carregar(colunas + ['maquina', 'data_hora'], dt_inicio, dt_fim, maquinas)
+            if df_colunas is not None:
+                for col in COLUNAS_NUMERICAS:
+                    if col in df_colunas.columns:
+                        df_colunas[col] = df_colunas[col].fillna(0.0)
+                return df_colunas
+    except Exception as e:
+        print(f"⚠️ Espelho colunar indisponível, usando dados em memória: {e}")
+    
+    return filtrar(df, di, df_final, hi, hf, maquina)
+
+def agregar_periodo(di, df_final, hi, hf, maquina=None):
+    """Cubo da janela: horas cheias somadas do cubo horário, bordas parciais dos registros
+    
+    Retorna None quando o cubo não corresponde ao frame carregado (gráfico agrega os registros).
+    """
+    if backend_sqlite is not None or cubo_horario is None or indice_temporal is None or not indice_temporal.indexa(df):
+        return None
+    try:
+        dt_inicio = pd.Timestamp.combine(pd.to_datetime(di).date(), hi)
+        dt_fim = pd.Timestamp.combine(pd.to_datetime(df_final).date(), hf)
+        maquina = maquina if maquina and maquina.strip() and maquina in MAQUINAS_VALIDAS else None
+        return agregar_janela(cubo_horario, indice_temporal, dt_inicio, dt_fim, maquina)
+    except Exception as e:
+        print(f"⚠️ Cubo horário indisponível, agregando registros: {e}")
+        return None
+
 def get_last_24h_range():
     """Retorna data/hora inicial e final para as últimas 24h."""
     now = pd.Timestamp.now()
@@ -167,7 +398,7 @@ def get_last_week_range():
 # COMPONENTES DE INTERFACE
 # -----------------------------
 
-def criar_mensagem_sem_dados(parent):
+def criar_mensagem_sem_dados(parent, ao_atualizar=None):
     """Cria uma mensagem elegante para quando não há dados"""
     frame_msg = tk.Frame(parent, bg='white')
     frame_msg.pack(fill='both', expand=True)
@@ -181,7 +412,7 @@ def criar_mensagem_sem_dados(parent):
     
     # Botão para atualizar
     btn_atualizar = tk.Button(frame_msg, text="🔄 ATUALIZAR DADOS", 
-                             command=atualizar_dados,
+                             command=lambda: atualizar_dados(apos=ao_atualizar),
                              bg="#28a745", fg="white", font=("Arial", 10, "bold"),
                              width=20, height=2)
     btn_atualizar.pack(pady=20)
@@ -192,32 +423,33 @@ def criar_mensagem_sem_dados(parent):
 # TREEVIEW PRINCIPAL
 # -----------------------------
 
+def formatar_linhas_tabela(pagina):
+    """Formata só a página visível da tabela (operações vetorizadas sobre o recorte)"""
+    def texto(col):
+        return pagina[col].astype(str) if col in pagina.columns else pd.Series('', index=pagina.index)
+    
+    def percentual(col):
+        if col not in pagina.columns:
+            return np.char.mod('%.2f', np.zeros(len(pagina)))
+        return np.char.mod('%.2f', pd.to_numeric(pagina[col], errors='coerce').fillna(0.0).to_numpy(dtype=float))
+    
+    data_hora = pd.to_datetime(pagina['data_hora'], errors='coerce').dt.strftime("%d/%m/%Y %H:%M").fillna('')
+    
+    return list(zip(texto('maquina'), texto('rej1_defect'), texto('rej2_defect'), texto('rej3_defect'),
+                    percentual('percent_cam_d'), percentual('percent_cam_w'), data_hora))
+
 def atualizar_tree(df_filtered=None):
-    """Atualiza a treeview com dados ou mensagem de sem dados"""
-    for i in tree.get_children():
-        tree.delete(i)
-        
+    """Atualiza a tabela com dados ou mensagem de sem dados (só a página visível é desenhada)"""
     if df_filtered is None:
         df_filtered = df
         
     if df_filtered is None or df_filtered.empty:
         # Mostrar mensagem elegante quando não há dados
-        tree.insert('', 'end', values=(
+        tabela.mostrar_mensagem((
             "---", "---", "---", "---", "---", "---", "📭 Nenhum dado disponível - Clique em ATUALIZAR DADOS"
         ))
     else:
-        for _, row in df_filtered.iterrows():
-            maquina = str(row.get('maquina', ''))
-            rej1 = str(row.get('rej1_defect', ''))
-            rej2 = str(row.get('rej2_defect', ''))
-            rej3 = str(row.get('rej3_defect', ''))
-            cam_d = f"{row.get('percent_cam_d',0):.2f}" if pd.notna(row.get('percent_cam_d')) else '0.00'
-            cam_w = f"{row.get('percent_cam_w',0):.2f}" if pd.notna(row.get('percent_cam_w')) else '0.00'
-            data_hora = formatar_data_hora(row.get('data_hora'))
-            
-            tree.insert('', 'end', values=(
-                maquina, rej1, rej2, rej3, cam_d, cam_w, data_hora
-            ))
+        tabela.definir_dados(df_filtered)
 
 def aplicar_filtro_principal():
     """Aplica filtro na tabela principal"""
@@ -320,7 +552,7 @@ def mostrar_grafico_top5():
     
     # Botão de atualizar
     btn_atualizar_top = tk.Button(controle_frame, text="🔄 ATUALIZAR DADOS", 
-                                 command=lambda: [atualizar_dados(), atualizar_grafico()],
+                                 command=lambda: atualizar_dados(apos=atualizar_grafico),
                                  bg="#28a745", fg="white", font=("Arial", 10, "bold"),
                                  width=20, height=2)
     btn_atualizar_top.pack(side='left', padx=5)
@@ -372,7 +604,7 @@ def mostrar_grafico_top5():
     grafico_frame.pack(fill='both', expand=True, padx=20, pady=10)
     
     # Inicializar com mensagem de sem dados
-    msg_frame = criar_mensagem_sem_dados(grafico_frame)
+    msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: atualizar_grafico())
 
     def atualizar_grafico():
         nonlocal msg_frame
@@ -382,7 +614,7 @@ def mostrar_grafico_top5():
             widget.destroy()
             
         if df is None or df.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: atualizar_grafico())
             return
 
         try:
@@ -397,39 +629,33 @@ def mostrar_grafico_top5():
             messagebox.showerror("Erro", f"Formato de hora inválido: {e}")
             return
             
-        df_filtrado = filtrar(df,
-                              di=data_inicial_w.get_date(),
-                              df_final=data_final_w.get_date(),
-                              hi=hi_time,
-                              hf=hf_time,
-                              maquina=maquina_var.get())
+        janela = agregar_periodo(di=data_inicial_w.get_date(),
+                                 df_final=data_final_w.get_date(),
+                                 hi=hi_time,
+                                 hf=hf_time,
+                                 maquina=maquina_var.get())
+        if janela is not None:
+            contagem = janela.contagem_defeitos()
+        else:
+            df_filtrado = filtrar_colunas(['rej1_defect', 'rej2_defect', 'rej3_defect'],
+                                          di=data_inicial_w.get_date(),
+                                          df_final=data_final_w.get_date(),
+                                          hi=hi_time,
+                                          hf=hf_time,
+                                          maquina=maquina_var.get())
                               
-        if df_filtrado is None or df_filtrado.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
-
-        # Coletar defeitos válidos - VERIFICAR COLUNAS EXISTENTES
-        defeitos_list = []
-        colunas_defeitos = ['rej1_defect', 'rej2_defect', 'rej3_defect']
-        
-        for col in colunas_defeitos:
-            if col in df_filtrado.columns:
-                valid = df_filtrado[col].dropna().astype(str).str.strip()
-                valid = valid[valid != '']
-                valid = valid[valid.str.lower() != 'nan']
-                defeitos_list.append(valid)
-        
-        if not defeitos_list:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
+            if df_filtrado is None or df_filtrado.empty:
+                msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: atualizar_grafico())
+                return
 
-        defeitos = pd.concat(defeitos_list, ignore_index=True)
+            # Mesma contagem do cubo horário (texto sem espaços, sem vazios/'nan', empate alfabético)
+            contagem = contar_ocorrencias(df_filtrado, COLUNAS_DEFEITO, desempate_alfabetico=True)
         
-        if defeitos.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+        if contagem.empty:
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: atualizar_grafico())
             return
             
-        df_sorted = defeitos.value_counts().head(5)
+        df_sorted = contagem.head(5)
         total = df_sorted.sum()
 
         # Criar gráficos
@@ -522,7 +748,7 @@ def mostrar_grafico_pareto():
     
     # Botão de atualizar
     btn_atualizar_pareto = tk.Button(controle_frame, text="🔄 ATUALIZAR DADOS", 
-                                    command=lambda: [atualizar_dados(), aplicar_filtro()],
+                                    command=lambda: atualizar_dados(apos=aplicar_filtro),
                                     bg="#28a745", fg="white", font=("Arial", 10, "bold"),
                                     width=20, height=2)
     btn_atualizar_pareto.pack(side='left', padx=5)
@@ -568,7 +794,7 @@ def mostrar_grafico_pareto():
     grafico_frame.pack(fill='both', expand=True, padx=20, pady=10)
     
     # Inicializar com mensagem de sem dados
-    msg_frame = criar_mensagem_sem_dados(grafico_frame)
+    msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
 
     def aplicar_filtro():
         nonlocal msg_frame
@@ -578,7 +804,7 @@ def mostrar_grafico_pareto():
             widget.destroy()
 
         if df is None or df.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
             return
 
         try:
@@ -593,39 +819,32 @@ def mostrar_grafico_pareto():
             messagebox.showerror("Erro", f"Formato de hora inválido: {e}")
             return
 
-        df_f = filtrar(df,
-                       di=data_inicial_w.get_date(),
-                       df_final=data_final_w.get_date(),
-                       hi=hi_time,
-                       hf=hf_time,
-                       maquina=maquina_var.get())
-        
-        if df_f is None or df_f.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
-
-        # Coletar defeitos - VERIFICAR COLUNAS EXISTENTES
-        defeitos_list = []
-        colunas_defeitos = ['rej1_defect', 'rej2_defect', 'rej3_defect']
-        
-        for col in colunas_defeitos:
-            if col in df_f.columns:
-                valid = df_f[col].dropna().astype(str).str.strip()
-                valid = valid[valid != '']
-                valid = valid[valid.str.lower() != 'nan']
-                defeitos_list.append(valid)
+        janela = agregar_periodo(di=data_inicial_w.get_date(),
+                                 df_final=data_final_w.get_date(),
+                                 hi=hi_time,
+                                 hf=hf_time,
+                                 maquina=maquina_var.get())
+        if janela is not None:
+            contagem = janela.contagem_defeitos()
+        else:
+            df_f = filtrar_colunas(COLUNAS_DEFEITO,
+                                   di=data_inicial_w.get_date(),
+                                   df_final=data_final_w.get_date(),
+                                   hi=hi_time,
+                                   hf=hf_time,
+                                   maquina=maquina_var.get())
         
-        if not defeitos_list:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
+            if df_f is None or df_f.empty:
+                msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
+                return
 
-        defeitos = pd.concat(defeitos_list, ignore_index=True)
+            # Mesma contagem do cubo horário (texto sem espaços, sem vazios/'nan', empate alfabético)
+            contagem = contar_ocorrencias(df_f, COLUNAS_DEFEITO, desempate_alfabetico=True)
         
-        if defeitos.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+        if contagem.empty:
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
             return
             
-        contagem = defeitos.value_counts()
         total = contagem.sum()
         porcentagem = (contagem / total) * 100
         porcentagem_acum = porcentagem.cumsum()
@@ -723,7 +942,7 @@ def mostrar_media_rejeicao():
     
     # Botão de atualizar
     btn_atualizar_media = tk.Button(controle_frame, text="🔄 ATUALIZAR DADOS", 
-                                   command=lambda: [atualizar_dados(), aplicar_filtro()],
+                                   command=lambda: atualizar_dados(apos=aplicar_filtro),
                                    bg="#28a745", fg="white", font=("Arial", 10, "bold"),
                                    width=20, height=2)
     btn_atualizar_media.pack(side='left', padx=5)
@@ -769,7 +988,7 @@ def mostrar_media_rejeicao():
     grafico_frame.pack(fill='both', expand=True, padx=20, pady=10)
     
     # Inicializar com mensagem de sem dados
-    msg_frame = criar_mensagem_sem_dados(grafico_frame)
+    msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
 
     def aplicar_filtro():
         nonlocal msg_frame
@@ -779,7 +998,7 @@ def mostrar_media_rejeicao():
             widget.destroy()
 
         if df is None or df.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
             return
 
         try:
@@ -794,84 +1013,103 @@ def mostrar_media_rejeicao():
             messagebox.showerror("Erro", f"Formato de hora inválido: {e}")
             return
 
-        df_f = filtrar(df,
-                       di=data_inicial_w.get_date(),
-                       df_final=data_final_w.get_date(),
-                       hi=hi_time,
-                       hf=hf_time,
-                       maquina=maquina_var.get())
-
-        if df_f is None or df_f.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
+        janela = agregar_periodo(di=data_inicial_w.get_date(),
+                                 df_final=data_final_w.get_date(),
+                                 hi=hi_time,
+                                 hf=hf_time,
+                                 maquina=maquina_var.get())
+        if janela is not None:
+            # Somas/contagens do cubo já consideram só as linhas válidas
+            medias = janela.medias_por_maquina()
+            media_maquinas = []
+            for m in sorted(medias.index, key=lambda x: str(x)):
+                cam_d = float(medias.at[m, 'cam_d'])
+                cam_w = float(medias.at[m, 'cam_w'])
+                media_maquinas.append({
+                    'maquina': m,
+                    'CAM-D (%)': cam_d,
+                    'CAM-W (%)': cam_w,
+                    'Média (%)': (cam_d + cam_w) / 2
+                })
+        else:
+            df_f = filtrar_colunas(['percent_cam_d', 'percent_cam_w', 'rej1_defect', 'rej2_defect', 'rej3_defect'],
+                                   di=data_inicial_w.get_date(),
+                                   df_final=data_final_w.get_date(),
+                                   hi=hi_time,
+                                   hf=hf_time,
+                                   maquina=maquina_var.get())
+
+            if df_f is None or df_f.empty:
+                msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
+                return
 
-        # Verificar se as colunas necessárias existem
-        colunas_necessarias = ['maquina', 'percent_cam_d', 'percent_cam_w']
-        colunas_faltantes = [col for col in colunas_necessarias if col not in df_f.columns]
+            # Verificar se as colunas necessárias existem
+            colunas_necessarias = ['maquina', 'percent_cam_d', 'percent_cam_w']
+            colunas_faltantes = [col for col in colunas_necessarias if col not in df_f.columns]
         
-        if colunas_faltantes:
-            label = tk.Label(grafico_frame, text=f"📭 COLUNAS FALTANTES:\n{', '.join(colunas_faltantes)}", 
-                           font=("Arial", 14), fg="gray", bg='white')
-            label.pack(expand=True)
-            return
+            if colunas_faltantes:
+                label = tk.Label(grafico_frame, text=f"📭 COLUNAS FALTANTES:\n{', '.join(colunas_faltantes)}", 
+                               font=("Arial", 14), fg="gray", bg='white')
+                label.pack(expand=True)
+                return
 
-        # Filtrar dados válidos
-        condicoes = []
+            # Filtrar dados válidos
+            condicoes = []
         
-        # Verificar colunas de percentuais
-        if 'percent_cam_d' in df_f.columns:
-            condicoes.append(df_f['percent_cam_d'] > 0)
-        if 'percent_cam_w' in df_f.columns:
-            condicoes.append(df_f['percent_cam_w'] > 0)
+            # Verificar colunas de percentuais
+            if 'percent_cam_d' in df_f.columns:
+                condicoes.append(df_f['percent_cam_d'] > 0)
+            if 'percent_cam_w' in df_f.columns:
+                condicoes.append(df_f['percent_cam_w'] > 0)
             
-        # Verificar colunas de defeitos
-        colunas_defeitos = ['rej1_defect', 'rej2_defect', 'rej3_defect']
-        for col in colunas_defeitos:
-            if col in df_f.columns:
-                cond_defeito = (
-                    (df_f[col].notna()) & 
-                    (df_f[col] != '') & 
-                    (df_f[col].str.lower() != 'nan')
-                )
-                condicoes.append(cond_defeito)
-
-        if not condicoes:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
+            # Verificar colunas de defeitos
+            colunas_defeitos = ['rej1_defect', 'rej2_defect', 'rej3_defect']
+            for col in colunas_defeitos:
+                if col in df_f.columns:
+                    cond_defeito = (
+                        (df_f[col].notna()) & 
+                        (df_f[col] != '') & 
+                        (df_f[col].str.lower() != 'nan')
+                    )
+                    condicoes.append(cond_defeito)
+
+            if not condicoes:
+                msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
+                return
 
-        # Combinar condições
-        condicao_final = condicoes[0]
-        for cond in condicoes[1:]:
-            condicao_final = condicao_final | cond
+            # Combinar condições
+            condicao_final = condicoes[0]
+            for cond in condicoes[1:]:
+                condicao_final = condicao_final | cond
 
-        df_valid = df_f[condicao_final]
+            df_valid = df_f[condicao_final]
 
-        if df_valid.empty:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
-            return
+            if df_valid.empty:
+                msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
+                return
 
-        # Calcular médias por máquina
-        maquinas_com_dados = sorted(df_valid['maquina'].dropna().unique(), key=lambda x: str(x))
-        media_maquinas = []
+            # Calcular médias por máquina
+            maquinas_com_dados = sorted(df_valid['maquina'].dropna().unique(), key=lambda x: str(x))
+            media_maquinas = []
         
-        for m in maquinas_com_dados:
-            df_m = df_valid[df_valid['maquina'] == m]
-            cam_d = df_m['percent_cam_d'].mean() if 'percent_cam_d' in df_m.columns else 0.0
-            cam_w = df_m['percent_cam_w'].mean() if 'percent_cam_w' in df_m.columns else 0.0
+            for m in maquinas_com_dados:
+                df_m = df_valid[df_valid['maquina'] == m]
+                cam_d = df_m['percent_cam_d'].mean() if 'percent_cam_d' in df_m.columns else 0.0
+                cam_w = df_m['percent_cam_w'].mean() if 'percent_cam_w' in df_m.columns else 0.0
             
-            if pd.isna(cam_d): cam_d = 0.0
-            if pd.isna(cam_w): cam_w = 0.0
-            media_total = (cam_d + cam_w) / 2
+                if pd.isna(cam_d): cam_d = 0.0
+                if pd.isna(cam_w): cam_w = 0.0
+                media_total = (cam_d + cam_w) / 2
 
-            media_maquinas.append({
-                'maquina': m,
-                'CAM-D (%)': cam_d,
-                'CAM-W (%)': cam_w,
-                'Média (%)': media_total
-            })
+                media_maquinas.append({
+                    'maquina': m,
+                    'CAM-D (%)': cam_d,
+                    'CAM-W (%)': cam_w,
+                    'Média (%)': media_total
+                })
 
         if not media_maquinas:
-            msg_frame = criar_mensagem_sem_dados(grafico_frame)
+            msg_frame = criar_mensagem_sem_dados(grafico_frame, lambda: aplicar_filtro())
             return
 
         # Ordenar por média total
@@ -1078,19 +1316,9 @@ tk.Button(botoes_graficos, text="📋 MÉDIA DE REJEIÇÃO", command=mostrar_med
 tree_frame = tk.Frame(root, bg='white')
 tree_frame.pack(fill='both', expand=True, padx=15, pady=10)
 
-# Adicionar scrollbar à tabela
-scrollbar = ttk.Scrollbar(tree_frame)
-scrollbar.pack(side='right', fill='y')
-
+# Tabela virtual: só as linhas visíveis existem no Treeview (rolagem troca os valores)
 columns = ('Máquina', 'Rej1', 'Rej2', 'Rej3', 'CAM-D (%)', 'CAM-W (%)', 'Data/Hora')
-tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
-scrollbar.config(command=tree.yview)
-
-for col in columns:
-    tree.heading(col, text=col)
-    tree.column(col, width=150, anchor='center')
-
-tree.pack(fill='both', expand=True)
+tabela = TabelaVirtual(tree_frame, columns, formatar_linhas_tabela)
 
 # Status bar
 status_frame = tk.Frame(root, bg='#34495e', height=30)
@@ -1101,6 +1329,12 @@ status_label = tk.Label(status_frame, text="Total de registros carregados: 0 | 
                        font=("Arial", 9), fg="white", bg='#34495e')
 status_label.pack(side='left', padx=10)
 
+# Progresso da carga em segundo plano (visível só durante a carga)
+progresso_label = tk.Label(status_frame, text="", font=("Arial", 9), fg="white", bg='#34495e')
+barra_progresso = ttk.Progressbar(status_frame, length=200, mode='determinate', maximum=100)
+btn_cancelar_carga = tk.Button(status_frame, text="✖ Cancelar", command=cancelar_carga,
+                               font=("Arial", 8), bg="#c0392b", fg="white")
+
 # Inicializar com dados vazios
 atualizar_tree(None)
 atualizar_status()
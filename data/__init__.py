@@ -1,7 +1,17 @@
 """Camada de dados"""
 
 from .manager import DataManager
-from .loader import carregar_dataframe_seguro
-from .saver import salvar_dataframe_seguro
+from .loader import carregar_dataframe_seguro, ler_csv_tipado
+from .saver import salvar_dataframe_seguro, anexar_dataframe_seguro
+from .schema import aplicar_schema, concatenar_tipado
+from .incremental import LeitorIncremental
+from .columnar import ArmazemColunar
+from .sqlite_backend import BackendSQLite
+from .indice import IndiceTemporal
+from .rollup import CuboHorario
+from .frequencia import contar_ocorrencias, contar_ocorrencias_por
 
-__all__ = ['DataManager', 'carregar_dataframe_seguro', 'salvar_dataframe_seguro']
+__all__ = ['DataManager', 'carregar_dataframe_seguro', 'ler_csv_tipado', 'salvar_dataframe_seguro',
+           'anexar_dataframe_seguro', 'aplicar_schema', 'concatenar_tipado', 'LeitorIncremental',
+           'ArmazemColunar', 'BackendSQLite', 'IndiceTemporal', 'CuboHorario',
+           'contar_ocorrencias', 'contar_ocorrencias_por']
@@ -0,0 +1,282 @@
+"""Espelho colunar (Parquet) do CSV de produção para análises
+
+Layout particionado por mês e máquina:
+    <diretorio>/mes=AAAA-MM/maquina=NNN/part-<ns>-<id>.parquet
+
+O CSV continua sendo a fonte da verdade; o espelho acompanha o arquivo pelo
+deslocamento em bytes (mesma lógica do LeitorIncremental) e é refeito do
+zero quando o CSV é reescrito.
+
+O manifesto é o commit do espelho: guarda a posição no CSV junto com a lista
+de arquivos válidos, e a consulta só lê os arquivos listados. Uma
+sincronização grava as partes novas, troca o manifesto (os.replace) e só
+então apaga o que saiu da lista. Se ela for interrompida no meio, as partes
+gravadas ficam órfãs (ignoradas e apagadas na próxima sincronização) e as
+linhas são relidas da mesma posição, sem duplicar. A reconstrução segue o
+mesmo caminho: quem consulta vê o espelho antigo inteiro até a troca do
+manifesto, nunca partições pela metade.
+"""
+
+import json
+import os
+import time
+import uuid
+import pandas as pd
+from .incremental import LeitorIncremental
+from .schema import aplicar_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+
+ARQUIVO_MANIFESTO = "_manifesto.json"
+ARQUIVO_TRAVA = "_sincronizando.lock"
+
+
+class ArmazemColunar:
+    """Mantém e consulta o espelho Parquet do CSV de produção"""
+
+    LIMITE_PARTES = 64        # Compacta a partição quando passar disso
+    TRAVA_EXPIRADA = 600      # Segundos até considerar uma trava abandonada
+
+    def __init__(self, diretorio, csv_path, tipos):
+        self.diretorio = diretorio
+        self.csv_path = csv_path
+        self.tipos = tipos
+        self._leitor = LeitorIncremental(csv_path, list(tipos), tipos)
+
+    @property
+    def disponivel(self):
+        return PYARROW_DISPONIVEL
+
+    # ------------------------------------------------------------------
+    # Sincronização com o CSV
+    # ------------------------------------------------------------------
+
+    def sincronizar(self):
+        """Traz para o espelho as linhas novas do CSV (ou reconstrói se ele mudou)"""
+        if not PYARROW_DISPONIVEL:
+            return False
+
+        if not self._adquirir_trava():
+            return False  # Outro processo/thread já está sincronizando
+
+        try:
+            manifesto = self._ler_manifesto()
+            # Manifesto sem a lista de partes (formato antigo): reconstrói
+            self._leitor.restaurar(manifesto.get('leitor') if 'partes' in manifesto else None)
+            partes = list(manifesto.get('partes', []))
+            novos, completo = self._leitor.ler_novos()
+
+            descartadas = []
+            if completo:
+                descartadas, partes = partes, []
+            if len(novos) > 0:
+                descartadas += self._gravar(novos, partes)
+
+            # Commit: a partir daqui a consulta enxerga as partes novas
+            self._salvar_manifesto({'leitor': self._leitor.estado(), 'partes': partes,
+                                    'atualizado_em': time.time()})
+            self._remover_partes(descartadas)
+            self._remover_orfas(partes)
+            if completo:
+                print(f"🗂️ Espelho colunar reconstruído: {len(novos)} registros")
+            return True
+        except Exception as e:
+            print(f"⚠️ Erro ao sincronizar espelho colunar: {e}")
+            return False
+        finally:
+            self._liberar_trava()
+
+    def em_dia(self):
+        """True quando o espelho já contém tudo que está no CSV"""
+        if not PYARROW_DISPONIVEL:
+            return False
+        try:
+            manifesto = self._ler_manifesto()
+            estado = manifesto.get('leitor')
+            return 'partes' in manifesto and bool(estado and estado.get('cabecalho')) and estado['offset'] == os.path.getsize(self.csv_path)
+        except Exception:
+            return False
+
+    def _gravar(self, novos, partes):
+        """Grava um arquivo por partição (mês, máquina) com as linhas novas
+
+        Acrescenta as partes gravadas em `partes` (caminhos relativos, como no
+        manifesto) e devolve as que saíram da lista por compactação.
+        """
+        compactadas = []
+        novos = aplicar_schema(novos.reindex(columns=list(self.tipos)), self.tipos)
+        mes = novos['data_hora'].dt.strftime('%Y-%m').fillna('sem_data')
+        maquina = novos['maquina'].astype(object).where(novos['maquina'].notna(), 'N/D').astype(str)
+
+        for (mes_part, maquina_part), indices in novos.groupby([mes, maquina]).groups.items():
+            pasta = f"mes={mes_part}/maquina={maquina_part}"
+            partes.append(self._gravar_parte(pasta, self._para_tabela(novos.loc[indices])))
+
+            da_pasta = [p for p in partes if p.rsplit('/', 1)[0] == pasta]
+            if len(da_pasta) > self.LIMITE_PARTES:
+                partes[:] = [p for p in partes if p not in da_pasta] + [self._compactar(pasta, da_pasta)]
+                compactadas += da_pasta
+        return compactadas
+
+    def _caminho(self, relativo):
+        return os.path.join(self.diretorio, *relativo.split('/'))
+
+    def _gravar_parte(self, pasta, tabela):
+        """Grava a tabela em um arquivo novo da pasta; devolve o caminho relativo"""
+        nome = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        os.makedirs(self._caminho(pasta), exist_ok=True)
+        temporario = self._caminho(f"{pasta}/_{nome}")
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, self._caminho(f"{pasta}/{nome}"))
+        return f"{pasta}/{nome}"
+
+    def _compactar(self, pasta, partes):
+        """Junta os arquivos pequenos da partição em um só (os antigos saem depois do commit)"""
+        tabela = pa.concat_tables([pq.read_table(self._caminho(p)) for p in partes])
+        return self._gravar_parte(pasta, tabela)
+
+    def _schema(self):
+        campos = []
+        for col, tipo in self.tipos.items():
+            if col == 'maquina':
+                continue  # Vem do nome da partição
+            if tipo.startswith('float'):
+                campos.append((col, pa.float32()))
+            elif tipo.startswith('datetime64'):
+                campos.append((col, pa.timestamp('ns')))
+            else:
+                campos.append((col, pa.string()))
+        return pa.schema(campos)
+
+    def _para_tabela(self, df):
+        """Converte o bloco para o schema fixo do espelho (texto, float32, timestamp)"""
+        schema = self._schema()
+        dados = {}
+        for campo in schema:
+            serie = df[campo.name] if campo.name in df.columns else pd.Series(None, index=df.index, dtype=object)
+            if pa.types.is_string(campo.type):
+                serie = serie.astype(object).map(lambda v: None if pd.isna(v) else str(v))
+            dados[campo.name] = serie
+        return pa.Table.from_pandas(pd.DataFrame(dados), schema=schema, preserve_index=False)
+
+    def _remover_partes(self, partes):
+        for parte in partes:
+            try:
+                os.remove(self._caminho(parte))
+            except OSError:
+                pass  # Ainda aberta por uma consulta - sai como órfã na próxima sincronização
+
+    def _remover_orfas(self, partes):
+        """Apaga arquivos fora do manifesto (sincronização interrompida) e pastas vazias"""
+        validas = {os.path.normpath(self._caminho(p)) for p in partes}
+        for raiz, _, arquivos in os.walk(self.diretorio, topdown=False):
+            for arquivo in arquivos:
+                caminho = os.path.join(raiz, arquivo)
+                if arquivo.endswith('.parquet') and os.path.normpath(caminho) not in validas:
+                    try:
+                        os.remove(caminho)
+                    except OSError:
+                        pass
+            if raiz != self.diretorio and not os.listdir(raiz):
+                try:
+                    os.rmdir(raiz)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def carregar(self, colunas=None, inicio=None, fim=None, maquinas=None):
+        """Lê apenas as colunas e partições necessárias
+
+        Args:
+            colunas: Colunas desejadas (None = todas)
+            inicio, fim: Intervalo de data_hora (inclusivo)
+            maquinas: Lista de máquinas aceitas
+
+        Returns:
+            DataFrame tipado (sem ordem garantida) ou None se indisponível
+        """
+        if not PYARROW_DISPONIVEL or not os.path.isdir(self.diretorio):
+            return None
+
+        # Só os arquivos do manifesto: partes de uma sincronização em andamento ficam de fora
+        arquivos = [self._caminho(p) for p in self._ler_manifesto().get('partes', [])]
+        if not arquivos:
+            return aplicar_schema(pd.DataFrame(columns=colunas or list(self.tipos)), self.tipos)
+
+        particionamento = ds.partitioning(pa.schema([('mes', pa.string()), ('maquina', pa.string())]), flavor='hive')
+        dataset = ds.dataset(arquivos, format='parquet', partitioning=particionamento,
+                             partition_base_dir=self.diretorio)
+
+        filtro = None
+        def incluir(condicao):
+            nonlocal filtro
+            filtro = condicao if filtro is None else filtro & condicao
+
+        # Filtros sobre 'mes' e 'maquina' eliminam pastas inteiras sem abri-las
+        if inicio is not None:
+            inicio = pd.Timestamp(inicio)
+            incluir(ds.field('mes') >= inicio.strftime('%Y-%m'))
+            incluir(ds.field('data_hora') >= inicio.to_pydatetime())
+        if fim is not None:
+            fim = pd.Timestamp(fim)
+            incluir(ds.field('mes') <= fim.strftime('%Y-%m'))
+            incluir(ds.field('data_hora') <= fim.to_pydatetime())
+        if maquinas is not None:
+            incluir(ds.field('maquina').isin([str(m) for m in maquinas]))
+
+        if colunas is None:
+            colunas = [c for c in dataset.schema.names if c != 'mes']
+        else:
+            colunas = [c for c in dict.fromkeys(colunas) if c in dataset.schema.names]
+
+        df = dataset.to_table(columns=colunas, filter=filtro).to_pandas()
+        return aplicar_schema(df, self.tipos)
+
+    # ------------------------------------------------------------------
+    # Manifesto e trava
+    # ------------------------------------------------------------------
+
+    def _ler_manifesto(self):
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_MANIFESTO), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_manifesto(self, manifesto):
+        caminho = os.path.join(self.diretorio, ARQUIVO_MANIFESTO)
+        temporario = caminho + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f)
+        os.replace(temporario, caminho)
+
+    def _adquirir_trava(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        trava = os.path.join(self.diretorio, ARQUIVO_TRAVA)
+        try:
+            if time.time() - os.path.getmtime(trava) > self.TRAVA_EXPIRADA:
+                os.remove(trava)
+        except OSError:
+            pass
+
+        try:
+            os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except OSError:
+            return False
+
+    def _liberar_trava(self):
+        try:
+            os.remove(os.path.join(self.diretorio, ARQUIVO_TRAVA))
+        except OSError:
+            pass
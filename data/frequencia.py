@@ -0,0 +1,108 @@
+"""Frequência de defeitos/locais nas colunas rej1/rej2/rej3 - contagem vetorizada
+
+As três colunas são empilhadas (rej1 inteira, depois rej2, depois rej3) como
+códigos de uma única série categórica; vazios e valores ignorados saem por
+máscara calculada uma vez por valor distinto, não por linha. Empates na
+contagem seguem a primeira ocorrência no empilhamento - a mesma ordem de
+Counter.most_common sobre as colunas concatenadas.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_DEFEITO = ['rej1_defect', 'rej2_defect', 'rej3_defect']
+COLUNAS_LOCAL = ['rej1_local', 'rej2_local', 'rej3_local']
+
+# Regras de validade: (remover_espacos, valores ignorados em minúsculas)
+REGRA_GRAFICOS = (True, ('nan',))   # Top 5/Pareto e cubo horário: conta o texto sem espaços
+REGRA_IA = (False, ('n/a',))        # Predição: conta o valor original, descarta N/A
+
+
+def rotular(valor, regra=REGRA_GRAFICOS):
+    """Rótulo contado para o valor, ou None se ele é nulo/vazio/ignorado pela regra"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    remover_espacos, ignorar = regra
+    texto = str(valor)
+    comparado = texto.strip() if remover_espacos else texto
+    if not texto.strip() or comparado.lower() in ignorar:
+        return None
+    return comparado if remover_espacos else valor
+
+
+def contar_ocorrencias(df, colunas, regra=REGRA_GRAFICOS, limite=None, desempate_alfabetico=False):
+    """Series rótulo -> ocorrências, da maior para a menor
+
+    Args:
+        limite: Mantém só os `limite` primeiros (ex.: Top 5)
+        desempate_alfabetico: Empates em ordem alfabética (a ordem do cubo
+            horário) em vez da primeira ocorrência
+    """
+    codigos, rotulos, _ = _empilhar(df, colunas, regra)
+    distintos, contagem = _ordenar(codigos[codigos >= 0])
+    serie = pd.Series(contagem, index=pd.Index([rotulos[c] for c in distintos], dtype=object), dtype='int64')
+    if desempate_alfabetico:
+        serie = serie.sort_index().sort_values(ascending=False, kind='mergesort')
+    return serie if limite is None else serie.head(limite)
+
+
+def contar_ocorrencias_por(df, colunas, por='maquina', regra=REGRA_GRAFICOS, limite=None):
+    """{valor de `por`: Series rótulo -> ocorrências} numa única passada pelo frame
+
+    Cada Series tem a mesma ordem que contar_ocorrencias daria no recorte
+    daquele valor; valores sem nenhuma ocorrência válida ficam de fora.
+    """
+    if por not in df.columns:
+        return {}
+    codigos, rotulos, blocos = _empilhar(df, colunas, regra)
+    grupos, valores = pd.factorize(df[por])
+    grupos = np.tile(grupos, blocos)
+
+    validos = (codigos >= 0) & (grupos >= 0)
+    n = max(len(rotulos), 1)
+    chaves, contagem = _ordenar(grupos[validos] * n + codigos[validos])
+    grupo_da_chave, rotulo_da_chave = np.divmod(chaves, n)
+
+    resultado = {}
+    for grupo in pd.unique(grupo_da_chave):
+        selecao = grupo_da_chave == grupo
+        indice = pd.Index([rotulos[c] for c in rotulo_da_chave[selecao]], dtype=object)
+        serie = pd.Series(contagem[selecao], index=indice, dtype='int64')
+        resultado[valores[grupo]] = serie if limite is None else serie.head(limite)
+    return resultado
+
+
+def _empilhar(df, colunas, regra):
+    """(código do rótulo por ocorrência, rótulos, colunas empilhadas); código -1 = inválida
+
+    A validade e o rótulo são decididos por valor distinto de cada coluna.
+    """
+    rotulos, posicao = [], {}
+    blocos = []
+    for col in colunas:
+        if col not in df.columns:
+            continue
+        codigos, distintos = pd.factorize(df[col])
+        mapa = np.full(len(distintos) + 1, -1, dtype=np.int64)  # última posição: NaN (código -1)
+        for i, valor in enumerate(distintos):
+            rotulo = rotular(valor, regra)
+            if rotulo is None:
+                continue
+            if rotulo not in posicao:
+                posicao[rotulo] = len(rotulos)
+                rotulos.append(rotulo)
+            mapa[i] = posicao[rotulo]
+        blocos.append(mapa[codigos])
+
+    if not blocos:
+        return np.empty(0, dtype=np.int64), rotulos, 0
+    return np.concatenate(blocos), rotulos, len(blocos)
+
+
+def _ordenar(chaves):
+    """(chaves distintas, contagens) por contagem decrescente; empate = primeira ocorrência"""
+    if len(chaves) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    distintas, primeira, contagem = np.unique(chaves, return_index=True, return_counts=True)
+    ordem = np.lexsort((primeira, -contagem))
+    return distintas[ordem], contagem[ordem]
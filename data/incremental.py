@@ -0,0 +1,217 @@
+"""Leitura incremental do CSV de produção pelo deslocamento em bytes"""
+
+import csv
+import io
+import os
+import threading
+import pandas as pd
+from .loader import carregar_dataframe_seguro, ler_csv_tipado, _dataframe_vazio
+from .schema import aplicar_schema, concatenar_tipado
+
+
+class LeituraCancelada(Exception):
+    """Leitura interrompida pelo evento de cancelamento"""
+
+
+class LeitorIncremental:
+    """Mantém o CSV em memória e, a cada atualização, lê só os bytes anexados
+
+    A leitura completa só acontece quando o arquivo encolheu, o cabeçalho
+    mudou ou o trecho já lido foi alterado (ex: reescrita por salvar_dados).
+    """
+
+    TAMANHO_ASSINATURA = 512
+    BLOCO_BYTES = 4 * 1024 * 1024     # Leitura do arquivo em blocos (progresso/cancelamento)
+    LINHAS_POR_BLOCO = 50000          # Parse em blocos de linhas quando há progresso
+
+    def __init__(self, caminho, colunas_padrao, tipos=None, filtro=None):
+        self.caminho = caminho
+        self.colunas_padrao = colunas_padrao
+        self.tipos = tipos
+        self.filtro = filtro
+        self._lock = threading.Lock()
+        self._resetar()
+
+    def _resetar(self):
+        self.df = None
+        self.offset = 0
+        self.linhas = 0
+        self.cabecalho = None
+        self.colunas = None
+        self.assinatura = b''
+
+    def invalidar(self):
+        """Descarta o estado - a próxima leitura será completa"""
+        with self._lock:
+            self._resetar()
+
+    def estado(self):
+        """Posição de leitura serializável (para retomar em outro processo/sessão)"""
+        with self._lock:
+            return {
+                'offset': self.offset,
+                'linhas': self.linhas,
+                'cabecalho': self.cabecalho.hex() if self.cabecalho is not None else None,
+                'colunas': self.colunas,
+                'assinatura': self.assinatura.hex()
+            }
+
+    def restaurar(self, estado):
+        """Retoma a leitura a partir de um estado salvo por estado()"""
+        with self._lock:
+            self._resetar()
+            if estado and estado.get('cabecalho'):
+                self.offset = estado['offset']
+                self.linhas = estado['linhas']
+                self.cabecalho = bytes.fromhex(estado['cabecalho'])
+                self.colunas = estado['colunas']
+                self.assinatura = bytes.fromhex(estado['assinatura'])
+
+    def carregar(self, progresso=None, cancelar=None, ao_ler=None):
+        """Retorna o DataFrame atualizado com as linhas novas do arquivo
+
+        Args:
+            progresso: Função opcional progresso(etapa, fracao) chamada durante a leitura
+            cancelar: threading.Event opcional - quando ligado, levanta LeituraCancelada
+            ao_ler: Função opcional ao_ler(novos, completo) com o que foi lido nesta chamada
+                (completo=True quando `novos` substitui tudo, False quando é só o acréscimo)
+        """
+        with self._lock:
+            try:
+                if self.df is None:
+                    self._resetar()
+
+                novos, completo = self._ler(progresso, cancelar)
+                if completo:
+                    self.df = novos
+                    print(f"✅ Arquivo carregado: {os.path.basename(self.caminho)} - {len(self.df)} registros")
+                elif len(novos) > 0:
+                    if self.tipos:
+                        self.df = concatenar_tipado(self.df, novos, self.tipos)
+                    else:
+                        self.df = pd.concat([self.df, novos], ignore_index=True)
+                    print(f"🔄 {os.path.basename(self.caminho)}: +{len(novos)} registros (leitura incremental)")
+                if ao_ler:
+                    ao_ler(novos, completo)
+                return self.df
+            except LeituraCancelada:
+                # Estado pode estar pela metade - próxima leitura será completa
+                self._resetar()
+                raise
+            except Exception as e:
+                print(f"⚠️ Erro na leitura incremental de {os.path.basename(self.caminho)}: {e}")
+                self._resetar()
+                df = self._filtrar(carregar_dataframe_seguro(self.caminho, self.colunas_padrao, self.tipos))
+                if ao_ler:
+                    ao_ler(df, True)
+                return df
+
+    def ler_novos(self):
+        """Lê só o que mudou sem acumular em memória
+        
+        Retorna (registros, completo): com completo=True os registros são o
+        arquivo inteiro e substituem tudo que foi lido antes.
+        """
+        with self._lock:
+            return self._ler()
+
+    def _ler(self, progresso=None, cancelar=None):
+        if not os.path.exists(self.caminho):
+            self._resetar()
+            return self._filtrar(_dataframe_vazio(self.colunas_padrao, self.tipos)), True
+
+        with open(self.caminho, 'rb') as f:
+            if self.cabecalho is None or not self._trecho_lido_intacto(f):
+                return self._ler_completo(f, progresso, cancelar), True
+            return self._ler_anexado(f, progresso, cancelar), False
+
+    def _ler_bytes(self, f, progresso, cancelar):
+        """Lê do ponto atual até o fim do arquivo em blocos"""
+        total = max(1, os.fstat(f.fileno()).st_size - f.tell())
+        blocos, lidos = [], 0
+        while True:
+            _verificar_cancelamento(cancelar)
+            bloco = f.read(self.BLOCO_BYTES)
+            if not bloco:
+                break
+            blocos.append(bloco)
+            lidos += len(bloco)
+            if progresso:
+                progresso('lendo', min(1.0, lidos / total))
+        return b''.join(blocos)
+
+    def _trecho_lido_intacto(self, f):
+        """Confere tamanho, cabeçalho e os últimos bytes já processados"""
+        if os.fstat(f.fileno()).st_size < self.offset:
+            return False
+        if f.readline() != self.cabecalho:
+            return False
+
+        f.seek(self.offset - len(self.assinatura))
+        return f.read(len(self.assinatura)) == self.assinatura
+
+    def _ler_completo(self, f, progresso=None, cancelar=None):
+        f.seek(0)
+        conteudo = self._ler_bytes(f, progresso, cancelar)
+        self._resetar()
+
+        fim_cabecalho = conteudo.find(b'\n') + 1
+        if fim_cabecalho == 0:
+            # Arquivo vazio ou cabeçalho incompleto - sem estado para reaproveitar
+            return self._filtrar(_dataframe_vazio(self.colunas_padrao, self.tipos))
+
+        self.cabecalho = conteudo[:fim_cabecalho]
+        self.colunas = next(csv.reader([self.cabecalho.decode('utf-8-sig').rstrip('\r\n')]))
+
+        corte = conteudo.rfind(b'\n') + 1
+        novos = self._parsear(conteudo[fim_cabecalho:corte], progresso, cancelar)
+        self.offset = corte
+        self.assinatura = conteudo[max(0, corte - self.TAMANHO_ASSINATURA):corte]
+        return novos if novos is not None else self._filtrar(_dataframe_vazio(self.colunas, self.tipos))
+
+    def _ler_anexado(self, f, progresso=None, cancelar=None):
+        f.seek(self.offset)
+        anexado = self._ler_bytes(f, progresso, cancelar)
+
+        # Linha parcial (gravação em andamento) fica para a próxima leitura
+        corte = anexado.rfind(b'\n') + 1
+        dados = anexado[:corte]
+        novos = self._parsear(dados, progresso, cancelar)
+        self.offset += corte
+        self.assinatura = (self.assinatura + dados)[-self.TAMANHO_ASSINATURA:]
+        return novos if novos is not None else self._filtrar(_dataframe_vazio(self.colunas, self.tipos))
+
+    def _parsear(self, dados, progresso=None, cancelar=None):
+        """Converte um trecho de linhas completas em DataFrame tipado"""
+        if not dados.strip():
+            return None
+
+        if (progresso is None and cancelar is None) or len(dados) < self.BLOCO_BYTES:
+            df = ler_csv_tipado(io.BytesIO(dados), self.tipos, colunas=self.colunas)
+        else:
+            df = self._parsear_em_blocos(dados, progresso, cancelar)
+        self.linhas += len(df)
+        return self._filtrar(df)
+
+    def _parsear_em_blocos(self, dados, progresso, cancelar):
+        """Parse em blocos de linhas, reportando progresso e verificando cancelamento"""
+        total = max(1, dados.count(b'\n'))
+        blocos, processadas = [], 0
+        for bloco in pd.read_csv(io.BytesIO(dados), header=None, names=self.colunas,
+                                 dtype=str, chunksize=self.LINHAS_POR_BLOCO):
+            _verificar_cancelamento(cancelar)
+            blocos.append(bloco)
+            processadas += len(bloco)
+            if progresso:
+                progresso('processando', min(1.0, processadas / total))
+
+        df = pd.concat(blocos, ignore_index=True)
+        return aplicar_schema(df, self.tipos) if self.tipos else df
+
+    def _filtrar(self, df):
+        return self.filtro(df) if self.filtro else df
+
+
+def _verificar_cancelamento(cancelar):
+    if cancelar is not None and cancelar.is_set():
+        raise LeituraCancelada()
@@ -0,0 +1,61 @@
+"""Índice temporal para recortes por período/máquina com busca binária"""
+
+import numpy as np
+
+
+class IndiceTemporal:
+    """Mantém o frame ordenado por data_hora e as posições de cada máquina
+
+    Um recorte [inicio, fim] vira duas buscas binárias (searchsorted) e uma
+    fatia, em vez de máscaras booleanas sobre o frame inteiro.
+    """
+
+    def __init__(self, df, coluna_tempo='data_hora', coluna_maquina='maquina'):
+        if not df[coluna_tempo].is_monotonic_increasing:
+            # NaT vai para o fim e fica fora das buscas
+            df = df.sort_values(coluna_tempo, kind='mergesort', na_position='last').reset_index(drop=True)
+
+        self.df = df
+        tempos = df[coluna_tempo].values
+        self._validos = int(df[coluna_tempo].notna().sum())
+        self._tempos = tempos[:self._validos]
+
+        self._posicoes = {}
+        self._tempos_maquina = {}
+        if coluna_maquina in df.columns:
+            for maquina, posicoes in df.groupby(coluna_maquina, observed=True, sort=False).indices.items():
+                posicoes = posicoes[posicoes < self._validos]
+                self._posicoes[str(maquina)] = posicoes
+                self._tempos_maquina[str(maquina)] = tempos[posicoes]
+
+    def indexa(self, df):
+        """True se este índice foi construído para (ou já é) o frame informado"""
+        return df is self.df
+
+    def maquinas(self):
+        return list(self._posicoes)
+
+    def posicoes(self, inicio=None, fim=None, maquina=None):
+        """Posições (iloc) dos registros no intervalo, em ordem de data_hora"""
+        if maquina is not None:
+            posicoes = self._posicoes.get(str(maquina))
+            if posicoes is None:
+                return np.empty(0, dtype=np.intp)
+            a, b = self._limites(self._tempos_maquina[str(maquina)], inicio, fim)
+            return posicoes[a:b]
+
+        a, b = self._limites(self._tempos, inicio, fim)
+        return np.arange(a, b)
+
+    def recortar(self, inicio=None, fim=None, maquina=None):
+        """Registros com inicio <= data_hora <= fim (e da máquina, se informada)"""
+        if maquina is None:
+            a, b = self._limites(self._tempos, inicio, fim)
+            return self.df.iloc[a:b]
+        return self.df.iloc[self.posicoes(inicio, fim, maquina)]
+
+    @staticmethod
+    def _limites(tempos, inicio, fim):
+        a = 0 if inicio is None else int(tempos.searchsorted(np.datetime64(inicio, 'ns'), side='left'))
+        b = len(tempos) if fim is None else int(tempos.searchsorted(np.datetime64(fim, 'ns'), side='right'))
+        return a, max(a, b)
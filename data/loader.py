@@ -4,18 +4,40 @@ import pandas as pd
 import shutil
 import time
 import os
+from .schema import aplicar_schema
 
-def carregar_dataframe_seguro(caminho, colunas_padrao):
+def ler_csv_tipado(caminho, tipos=None, colunas=None):
+    """Lê CSV já no esquema declarado (categorias são criadas direto pelo parser)
+    
+    Com `colunas` informado o conteúdo é tratado como linhas sem cabeçalho
+    (usado na leitura incremental de trechos anexados ao arquivo).
+    """
+    opcoes = {'header': None, 'names': colunas} if colunas is not None else {}
+    if not tipos:
+        return pd.read_csv(caminho, dtype=str, **opcoes)
+    
+    if colunas is None:
+        colunas = pd.read_csv(caminho, nrows=0).columns
+    dtype = {col: 'category' if tipos.get(col) == 'category' else str for col in colunas}
+    df = pd.read_csv(caminho, dtype=dtype, **opcoes)
+    return aplicar_schema(df, tipos)
+
+def _dataframe_vazio(colunas_padrao, tipos=None):
+    """DataFrame vazio com as colunas (e tipos) padrão"""
+    df = pd.DataFrame(columns=colunas_padrao)
+    return aplicar_schema(df, tipos) if tipos else df
+
+def carregar_dataframe_seguro(caminho, colunas_padrao, tipos=None):
     """Carrega DataFrame com tratamento robusto de erros"""
     try:
         if os.path.exists(caminho):
             try:
-                df = pd.read_csv(caminho, dtype=str)
+                df = ler_csv_tipado(caminho, tipos)
                 print(f"✅ Arquivo carregado: {os.path.basename(caminho)} - {len(df)} registros")
                 return df
             except pd.errors.EmptyDataError:
                 print(f"⚠️ Arquivo vazio: {caminho}")
-                return pd.DataFrame(columns=colunas_padrao)
+                return _dataframe_vazio(colunas_padrao, tipos)
             except Exception as e:
                 print(f"⚠️ Erro ao ler {caminho}: {e}")
                 try:
@@ -24,10 +46,10 @@ def carregar_dataframe_seguro(caminho, colunas_padrao):
                     print(f"📦 Backup do arquivo corrompido salvo em: {backup_path}")
                 except:
                     pass
-                return pd.DataFrame(columns=colunas_padrao)
+                return _dataframe_vazio(colunas_padrao, tipos)
         else:
             print(f"📄 Criando novo arquivo: {os.path.basename(caminho)}")
-            return pd.DataFrame(columns=colunas_padrao)
+            return _dataframe_vazio(colunas_padrao, tipos)
     except Exception as e:
         print(f"❌ Erro crítico ao carregar {caminho}: {e}")
-        return pd.DataFrame(columns=colunas_padrao)
+        return _dataframe_vazio(colunas_padrao, tipos)
@@ -1,11 +1,17 @@
 """Gerenciador central de dados"""
 
+import os
+import threading
 import pandas as pd
 from .loader import carregar_dataframe_seguro
-from .saver import salvar_dataframe_seguro
+from .incremental import LeitorIncremental
+from .columnar import ArmazemColunar
+from .sqlite_backend import BackendSQLite, LeitorSQLite
+from .saver import salvar_dataframe_seguro, anexar_dataframe_seguro, preservar_texto_original
+from .schema import concatenar_tipado, converter_valor, registro_serializavel
 from utils.paths import obter_caminho_arquivo_seguro, garantir_arquivo_rede
-from config.settings import CSV_FILE, USERS_FILE, LOG_FILE
-from config.constants import COLUNAS_DADOS, COLUNAS_USUARIOS, COLUNAS_LOG, USUARIOS_PADRAO
+from config.settings import CSV_FILE, USERS_FILE, LOG_FILE, PARQUET_DIR, ATRASO_ESPELHO, BACKEND_DADOS, SQLITE_FILE
+from config.constants import COLUNAS_DADOS, COLUNAS_USUARIOS, COLUNAS_LOG, USUARIOS_PADRAO, TIPOS_DADOS
 
 
 class DataManager:
@@ -15,10 +21,145 @@ class DataManager:
         self.csv_path = None
         self.users_path = None
         self.log_path = None
-        self.df = None
+        self._df = None
+        self._df_log = None
         self.df_users = None
-        self.df_log = None
+
+        # Registros novos ficam em buffer (O(1) por inserção) e só viram
+        # DataFrame quando alguém lê df/df_log
+        self._buffer_dados = []
+        self._buffer_log = []
+        self._lock = threading.RLock()
+
+        # Ouvintes de mudança nos dados de produção: ouvinte(evento, registro, versao)
+        # - 'anexar': um registro novo (dict); 'recarregar': o df foi trocado (releitura);
+        # - 'reescrever': registros já gravados foram editados/regravados - quem
+        #   acompanha o arquivo por novo_leitor() precisa recomeçar a leitura.
+        # São chamados com a trava do DataManager - devem só enfileirar, sem bloquear.
+        self._ouvintes = []
+        self._versao = 0
+
         self._inicializar_caminhos()
+        self._leitor = LeitorIncremental(self.csv_path, COLUNAS_DADOS, TIPOS_DADOS)
+        self._espelho = ArmazemColunar(os.path.join(os.path.dirname(self.csv_path), PARQUET_DIR),
+                                       self.csv_path, TIPOS_DADOS)
+        self._timer_espelho = None
+
+        # Backend SQLite opcional: produção é lida sob demanda e só os ids novos são buscados
+        self.backend = None
+        self._sqlite_desatualizado = False
+        self._usuarios_gravados = {}  # Retrato {login: linha} do que está no banco (SQLite)
+        if BACKEND_DADOS == 'sqlite':
+            self.backend = BackendSQLite(os.path.join(os.path.dirname(self.csv_path), SQLITE_FILE), TIPOS_DADOS)
+
+    @property
+    def df(self):
+        """DataFrame de produção (materializa registros pendentes sob demanda)
+        
+        No SQLite é a tabela inteira em memória - para contagens e buscas usar
+        total_registros(), consultar() e carregar_colunas(), que vão pelos índices.
+        """
+        with self._lock:
+            if self.backend is not None:
+                return self._df_sqlite()
+            if self._buffer_dados:
+                self._df = concatenar_tipado(self._df, pd.DataFrame(self._buffer_dados), TIPOS_DADOS)
+                self._buffer_dados = []
+            return self._df
+
+    def _df_sqlite(self):
+        """df no modo SQLite: carga completa no primeiro acesso, depois só os ids novos"""
+        if self._df is None:
+            self._df = self.backend.carregar('producao')
+        elif self._sqlite_desatualizado:
+            ultimo_id = int(self._df.index.max()) if len(self._df) else 0
+            novos = self.backend.consultar(apos_id=ultimo_id)
+            if len(novos) > 0:
+                self._df = concatenar_tipado(self._df, novos, TIPOS_DADOS, ignorar_indice=False)
+        self._sqlite_desatualizado = False
+        return self._df
+
+    @df.setter
+    def df(self, valor):
+        with self._lock:
+            self._df = valor
+            self._buffer_dados = []
+            self._notificar('recarregar')
+
+    def adicionar_ouvinte(self, ouvinte):
+        """Registra ouvinte(evento, registro, versao) para 'anexar' e 'recarregar'"""
+        with self._lock:
+            if ouvinte not in self._ouvintes:
+                self._ouvintes.append(ouvinte)
+
+    def remover_ouvinte(self, ouvinte):
+        with self._lock:
+            if ouvinte in self._ouvintes:
+                self._ouvintes.remove(ouvinte)
+
+    def novo_leitor(self):
+        """Leitor próprio das linhas de produção, posicionado no fim do que já foi lido
+        
+        Returns:
+            (df_lido, leitor): leitor.ler_novos() devolve só as linhas que não estão
+            em df_lido (as anexadas depois, locais ou de outros coletores). Com
+            df_lido None o leitor começa do zero e a primeira leitura é completa.
+        """
+        with self._lock:
+            if self.backend is not None:
+                if self._df is None or self._sqlite_desatualizado or len(self._df) == 0:
+                    return None, LeitorSQLite(self.backend)
+                return self._df, LeitorSQLite(self.backend, int(self._df.index.max()))
+
+            # Registros em buffer já estão no arquivo, depois da posição do leitor
+            leitor = LeitorIncremental(self.csv_path, COLUNAS_DADOS, TIPOS_DADOS)
+            df_lido = self._leitor.df
+            if df_lido is not None:
+                leitor.restaurar(self._leitor.estado())
+            return df_lido, leitor
+
+    def _notificar(self, evento, registro=None):
+        """Avança a versão dos dados e avisa os ouvintes (chamar com a trava)"""
+        self._versao += 1
+        for ouvinte in list(self._ouvintes):
+            try:
+                ouvinte(evento, registro, self._versao)
+            except Exception as e:
+                print(f"⚠️ Erro no ouvinte de dados ({evento}): {e}")
+
+    @property
+    def df_log(self):
+        """DataFrame de log (materializa registros pendentes sob demanda)"""
+        with self._lock:
+            if self._buffer_log:
+                self._df_log = self._materializar(self._df_log, self._buffer_log)
+                self._buffer_log = []
+            return self._df_log
+
+    @df_log.setter
+    def df_log(self, valor):
+        with self._lock:
+            self._df_log = valor
+            self._buffer_log = []
+
+    @staticmethod
+    def _materializar(df_base, buffer):
+        """Converte o buffer de registros em DataFrame com um único concat"""
+        novos = pd.DataFrame(buffer)
+        if df_base is None:
+            return novos
+        if len(df_base) == 0:
+            colunas = list(df_base.columns) + [c for c in novos.columns if c not in df_base.columns]
+            return novos.reindex(columns=colunas)
+        return pd.concat([df_base, novos], ignore_index=True)
+
+    def total_registros(self):
+        """Total de registros de produção sem materializar o buffer"""
+        with self._lock:
+            if self.backend is not None and (self._df is None or self._sqlite_desatualizado):
+                return self.backend.contar('producao')
+            base = len(self._df) if self._df is not None else 0
+            return base + len(self._buffer_dados)
 
     def _inicializar_caminhos(self):
         """Inicializa caminhos dos arquivos - TENTA REDE, FALLBACK LOCAL"""
@@ -46,6 +187,9 @@ class DataManager:
         print(f"📁 Caminho usuários: {self.users_path}")
         print(f"🌐 Caminho rede: {CAMINHO_REDE}")
         
+        if self.backend is not None:
+            return self._inicializar_sqlite()
+        
         # Verificar acesso à rede
         tem_acesso_rede = os.path.exists(CAMINHO_REDE)
         
@@ -60,7 +204,7 @@ class DataManager:
             os.makedirs(CAMINHO_REDE, exist_ok=True)
         
         df_log_temp = carregar_dataframe_seguro(self.log_path, COLUNAS_LOG)
-        df_temp = carregar_dataframe_seguro(self.csv_path, COLUNAS_DADOS)
+        df_temp = self._leitor.carregar()
         
         # CARREGAR USUÁRIOS DA REDE
         df_users_temp = carregar_dataframe_seguro(self.users_path, COLUNAS_USUARIOS)
@@ -117,22 +261,253 @@ class DataManager:
         self.df = df_temp
         self.df_users = df_users_temp
         self.df_log = df_log_temp
+        self._sincronizar_espelho()
 
         return self.df, self.df_users, self.df_log
 
+    def _inicializar_sqlite(self):
+        """Modo SQLite: importa os CSVs uma única vez; produção fica para carga sob demanda"""
+        self.backend.importar_se_vazia('producao', lambda: carregar_dataframe_seguro(self.csv_path, COLUNAS_DADOS, TIPOS_DADOS))
+        self.backend.importar_se_vazia('log', lambda: carregar_dataframe_seguro(self.log_path, COLUNAS_LOG))
+        self.backend.importar_se_vazia('usuarios', lambda: carregar_dataframe_seguro(self.users_path, COLUNAS_USUARIOS))
+
+        # Garante usuários padrão
+        df_users_temp = self.backend.carregar('usuarios')
+        for usuario in USUARIOS_PADRAO:
+            if usuario["login"] not in df_users_temp["login"].values:
+                self.backend.inserir('usuarios', usuario)
+                print(f"➕ Usuário padrão adicionado: {usuario['login']}")
+        df_users_temp = self.backend.carregar('usuarios')
+
+        self.df = None
+        self.df_users = df_users_temp.reset_index(drop=True)
+        self._usuarios_gravados = self.backend.linhas_por_chave('usuarios', self.df_users, 'login')
+        self.df_log = self.backend.carregar('log').reset_index(drop=True)
+
+        print(f"📊 Dados produção: {self.backend.contar('producao')} registros (SQLite)")
+        print(f"👥 Usuários: {len(self.df_users)} cadastrados")
+        print(f"📝 Logs: {len(self.df_log)} registros")
+
+        return self._df, self.df_users, self.df_log
+
+    def recarregar_dados(self):
+        """Relê o CSV de produção processando apenas as linhas anexadas desde a última leitura"""
+        with self._lock:
+            if self.backend is not None:
+                self._sqlite_desatualizado = True
+                self._notificar('recarregar')
+                return self.df
+            # Registros em buffer já foram gravados no arquivo e voltam pela leitura
+            self.df = df = self._leitor.carregar()
+        # Linhas de outros coletores também vão para o espelho (agrupadas com as locais)
+        self._sincronizar_espelho(ATRASO_ESPELHO)
+        return df
+
     def salvar_dados(self):
-        """Salva dados de produção"""
-        return salvar_dataframe_seguro(self.df, self.csv_path)
+        """Salva dados de produção (reescrita completa - usar após edições/exclusões)
+        
+        No SQLite não há o que salvar: inserções e edições já foram gravadas uma
+        a uma, e regravar o retrato em memória apagaria o que outros coletores
+        inseriram desde a leitura.
+        """
+        if self.backend is not None:
+            return True
+        with self._lock:
+            # data_hora que não foi reconhecida na leitura (NaT) não apaga o texto do arquivo
+            df = preservar_texto_original(self.df, self.csv_path, ['data_hora'])
+            sucesso = salvar_dataframe_seguro(df, self.csv_path)
+            self._leitor.invalidar()
+            self._notificar('reescrever')
+        self._sincronizar_espelho()
+        return sucesso
+
+    def _sincronizar_espelho(self, atraso=0):
+        """Atualiza o espelho colunar em segundo plano (não bloqueia a interface)
+        
+        Com atraso, chamadas dentro do intervalo viram uma única sincronização
+        (um arquivo por partição com todos os registros do período).
+        """
+        if not self._espelho.disponivel or self.backend is not None:
+            return
+        with self._lock:
+            if self._timer_espelho is not None:
+                if atraso:
+                    return  # Já agendada - os registros novos vão junto
+                self._timer_espelho.cancel()
+            self._timer_espelho = threading.Timer(atraso, self._executar_sincronizacao_espelho)
+            self._timer_espelho.daemon = True
+            self._timer_espelho.start()
+
+    def _executar_sincronizacao_espelho(self):
+        with self._lock:
+            self._timer_espelho = None
+        self._espelho.sincronizar()
+
+    def carregar_colunas(self, colunas, inicio=None, fim=None, maquinas=None):
+        """Carrega só as colunas pedidas (+ maquina/data_hora) para análises
+        
+        Usa o espelho Parquet quando ele está em dia com o CSV; senão recorta o df em memória.
+        """
+        colunas = list(colunas) + ['maquina', 'data_hora']
+        if self.backend is not None:
+            return self.backend.consultar(inicio=inicio, fim=fim, maquinas=maquinas, colunas=colunas)
+        try:
+            if self._espelho.em_dia():
+                df = self._espelho.carregar(colunas, inicio, fim, maquinas)
+                if df is not None:
+                    # Partições voltam sem ordem garantida - ordem cronológica, como o CSV
+                    return df.sort_values('data_hora', kind='mergesort', ignore_index=True)
+        except Exception as e:
+            print(f"⚠️ Espelho colunar indisponível, usando dados em memória: {e}")
+
+        df = self.df
+        if df is None:
+            return None
+        mascara = pd.Series(True, index=df.index)
+        if inicio is not None:
+            mascara &= df['data_hora'] >= pd.Timestamp(inicio)
+        if fim is not None:
+            mascara &= df['data_hora'] <= pd.Timestamp(fim)
+        if maquinas is not None:
+            mascara &= df['maquina'].isin(maquinas)
+        return df.loc[mascara, [c for c in dict.fromkeys(colunas) if c in df.columns]]
+
+    def consultar(self, maquina=None, lote=None, inicio=None, fim=None, limite=None):
+        """Busca registros de produção - SELECT indexado no SQLite, máscara sobre o df no CSV
+        
+        No CSV, máquina e lote são buscados por trecho (sem diferenciar maiúsculas);
+        no SQLite, para usar os índices, a máquina precisa ser exata e o lote é
+        buscado pelo prefixo.
+        """
+        if self.backend is not None:
+            return self.backend.consultar(maquina=maquina, lote=lote, inicio=inicio, fim=fim, limite=limite)
+
+        df = self.recarregar_dados()
+        if df is None or len(df) == 0:
+            return df
+
+        mascara = pd.Series(True, index=df.index)
+        if maquina:
+            mascara &= df['maquina'].str.contains(maquina, case=False, na=False)
+        if lote:
+            mascara &= df['lote'].str.contains(lote, case=False, na=False)
+        if inicio is not None:
+            mascara &= df['data_hora'] >= pd.Timestamp(inicio)
+        if fim is not None:
+            mascara &= df['data_hora'] <= pd.Timestamp(fim)
+
+        df = df[mascara]
+        return df.tail(limite) if limite else df
+
+    def obter_registro(self, idx):
+        """Registro de produção (dict) pelo índice - no SQLite o índice é o id da linha"""
+        if self.backend is not None:
+            registro = self.backend.obter(idx)
+        else:
+            df = self.df
+            registro = df.loc[idx].to_dict() if df is not None and idx in df.index else None
+        return registro_serializavel(registro) if registro is not None else None
+
+    def atualizar_registro(self, idx, alteracoes):
+        """Edita um registro existente respeitando o esquema (CSV: reescrita completa; SQLite: UPDATE)"""
+        if self.backend is not None:
+            if not self.backend.atualizar(idx, alteracoes):
+                return False
+            with self._lock:
+                if self._df is not None and idx in self._df.index:
+                    self._aplicar_alteracoes(self._df, idx, alteracoes)
+                self._notificar('reescrever')
+            return True
+
+        df = self.df
+        if df is None or idx not in df.index:
+            return False
+
+        with self._lock:
+            self._aplicar_alteracoes(df, idx, alteracoes)
+
+        # Reescrita completa - salvar_dados avisa os ouvintes ('reescrever')
+        return self.salvar_dados()
+
+    @staticmethod
+    def _aplicar_alteracoes(df, idx, alteracoes):
+        """Grava as alterações na linha sem mudar o dtype das colunas
+        
+        Categoria nova entra antes na lista de categorias; números são
+        convertidos para o tipo exato da coluna (float64 → float32).
+        """
+        for campo, valor in alteracoes.items():
+            tipo = TIPOS_DADOS.get(campo, 'object')
+            if campo in df.columns and isinstance(df[campo].dtype, pd.CategoricalDtype):
+                if not pd.isna(valor) and valor not in df[campo].cat.categories:
+                    df[campo] = df[campo].cat.add_categories([valor])
+            else:
+                valor = converter_valor(valor, tipo)
+                if campo in df.columns and df[campo].dtype.kind == 'f':
+                    valor = df[campo].dtype.type(valor)
+            df.at[idx, campo] = valor
+
+    def adicionar_registro(self, registro):
+        """Adiciona registro de produção gravando apenas a linha nova no CSV"""
+        if self.backend is not None:
+            return self._inserir_sqlite('producao', registro)
+
+        with self._lock:
+            self._buffer_dados.append(dict(registro))
+
+            novo_registro = pd.DataFrame([registro])
+            if anexar_dataframe_seguro(novo_registro, self.csv_path):
+                # Avisado depois de gravado: quem lê o arquivo já encontra a linha
+                self._notificar('anexar', dict(registro))
+                self._sincronizar_espelho(ATRASO_ESPELHO)
+                return True
+
+            # Fallback: arquivo inexistente ou cabeçalho diferente → reescrita completa ('reescrever')
+            return self.salvar_dados()
+
+    def _inserir_sqlite(self, tabela, registro):
+        """Insere uma linha em transação própria no backend SQLite"""
+        try:
+            self.backend.inserir(tabela, registro)
+            with self._lock:
+                if tabela == 'producao':
+                    self._sqlite_desatualizado = True
+                    self._notificar('anexar', dict(registro))
+                else:
+                    if self._df_log is None:
+                        self._df_log = pd.DataFrame(columns=COLUNAS_LOG)
+                    self._buffer_log.append(dict(registro))
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao gravar no SQLite ({tabela}): {e}")
+            return False
 
     def salvar_usuarios(self):
         """Salva usuários"""
+        if self.backend is not None:
+            try:
+                # Só o que mudou desde a leitura/último salvamento - usuários
+                # cadastrados por outros coletores nesse meio tempo ficam no banco
+                atuais = self.backend.linhas_por_chave('usuarios', self.df_users, 'login')
+                self.backend.gravar_alteracoes('usuarios', 'login', self._usuarios_gravados, atuais)
+                self._usuarios_gravados = atuais
+                return True
+            except Exception as e:
+                print(f"❌ Erro ao salvar usuários no SQLite: {e}")
+                return False
         return salvar_dataframe_seguro(self.df_users, self.users_path)
 
     def salvar_log(self, registro):
         """Salva registro de log"""
-        if self.df_log is None:
-            self.df_log = pd.DataFrame(columns=COLUNAS_LOG)
+        if self.backend is not None:
+            return self._inserir_sqlite('log', registro)
+
+        with self._lock:
+            if self._df_log is None:
+                self._df_log = pd.DataFrame(columns=COLUNAS_LOG)
+            self._buffer_log.append(dict(registro))
 
         novo_registro = pd.DataFrame([registro])
-        self.df_log = pd.concat([self.df_log, novo_registro], ignore_index=True)
+        if anexar_dataframe_seguro(novo_registro, self.log_path):
+            return True
         return salvar_dataframe_seguro(self.df_log, self.log_path)
@@ -0,0 +1,213 @@
+"""Cubo horário pré-agregado (hora × máquina × defeito) para os gráficos do dashboard"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from .frequencia import COLUNAS_DEFEITO
+from .schema import FORMATO_DATA_HORA
+UM_NS = pd.Timedelta(1, unit='ns')
+
+
+def _fatorar_texto(serie, remover_espacos):
+    """Códigos por linha + máscara de valores válidos (não vazio, não 'nan') calculada por valor distinto"""
+    codigos, distintos = pd.factorize(serie)
+    texto = pd.Index(distintos).astype(str)
+    if remover_espacos:
+        texto = texto.str.strip()
+    validos_distintos = np.asarray((texto != '') & (texto.str.lower() != 'nan'), dtype=bool)
+    validos = (codigos >= 0) & validos_distintos[np.maximum(codigos, 0)]
+    return codigos, np.asarray(texto, dtype=object), validos
+
+
+class CuboHorario:
+    """Contagens de defeito e somas de CAM-D/CAM-W por máquina e hora cheia
+
+    - defeitos: Series (hora, maquina, defeito) -> ocorrências (texto sem espaços,
+      ignorando vazios e 'nan' - mesma regra do Top 5/Pareto)
+    - medias: DataFrame (hora, maquina) -> soma_cam_d, soma_cam_w, registros
+      (apenas linhas "válidas" da Média de Rejeição: percentual > 0 ou algum defeito)
+
+    Imutável: atualizações devolvem um novo cubo.
+    """
+
+    def __init__(self, defeitos=None, medias=None):
+        if defeitos is None:
+            indice = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), [], []], names=['hora', 'maquina', 'defeito'])
+            defeitos = pd.Series([], index=indice, dtype='int64')
+        if medias is None:
+            indice = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), []], names=['hora', 'maquina'])
+            medias = pd.DataFrame({'soma_cam_d': [], 'soma_cam_w': [], 'registros': []}, index=indice)
+        self.defeitos = defeitos
+        self.medias = medias
+
+    @classmethod
+    def de_registros(cls, df):
+        """Agrega registros brutos (precisa de data_hora, maquina, defeitos e percentuais)"""
+        if df is None or len(df) == 0:
+            return cls()
+
+        hora = df['data_hora'].dt.floor('h').to_numpy()
+        maquina = df['maquina'].astype(str).to_numpy()
+        com_hora = ~pd.isna(hora)
+
+        # Defeitos: as três colunas empilhadas, um registro por ocorrência
+        blocos = []
+        valido_media = np.zeros(len(df), dtype=bool)
+        for col in COLUNAS_DEFEITO:
+            if col not in df.columns:
+                continue
+            codigos, texto, validos = _fatorar_texto(df[col], remover_espacos=True)
+            validos &= com_hora
+            blocos.append(pd.DataFrame({
+                'hora': hora[validos],
+                'maquina': maquina[validos],
+                'defeito': texto[codigos[validos]],
+            }))
+            valido_media |= _fatorar_texto(df[col], remover_espacos=False)[2]
+
+        if blocos:
+            ocorrencias = pd.concat(blocos, ignore_index=True)
+            defeitos = ocorrencias.groupby(['hora', 'maquina', 'defeito']).size()
+        else:
+            defeitos = cls().defeitos
+
+        # Médias: somas e contagem das linhas válidas
+        cam_d, cam_w = (
+            pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64') if col in df.columns
+            else np.zeros(len(df))
+            for col in ('percent_cam_d', 'percent_cam_w')
+        )
+        valido_media |= (cam_d > 0) | (cam_w > 0)
+        valido_media &= com_hora
+
+        linhas = pd.DataFrame({
+            'hora': hora[valido_media],
+            'maquina': maquina[valido_media],
+            'soma_cam_d': np.nan_to_num(cam_d[valido_media]),
+            'soma_cam_w': np.nan_to_num(cam_w[valido_media]),
+            'registros': 1,
+        })
+        medias = linhas.groupby(['hora', 'maquina']).sum()
+
+        return cls(defeitos.sort_index(), medias.sort_index())
+
+    def mesclar(self, outro):
+        """Soma célula a célula com outro cubo"""
+        defeitos = pd.concat([self.defeitos, outro.defeitos]).groupby(level=[0, 1, 2]).sum()
+        medias = pd.concat([self.medias, outro.medias]).groupby(level=[0, 1]).sum()
+        return CuboHorario(defeitos.sort_index(), medias.sort_index())
+
+    def recortar(self, inicio, fim_exclusivo, maquina=None):
+        """Horas cheias em [inicio, fim_exclusivo) - fatia por busca binária no índice ordenado"""
+        defeitos = self.defeitos.loc[inicio:fim_exclusivo - UM_NS]
+        medias = self.medias.loc[inicio:fim_exclusivo - UM_NS]
+        if maquina is not None:
+            defeitos = defeitos[defeitos.index.get_level_values('maquina') == str(maquina)]
+            medias = medias[medias.index.get_level_values('maquina') == str(maquina)]
+        return CuboHorario(defeitos, medias)
+
+    def contagem_defeitos(self):
+        """Ocorrências por defeito, da maior para a menor (empate: ordem alfabética)"""
+        contagem = self.defeitos.groupby(level='defeito').sum()
+        return contagem.sort_values(ascending=False, kind='mergesort')
+
+    def medias_por_maquina(self):
+        """Médias de CAM-D/CAM-W por máquina (DataFrame indexado pela máquina)"""
+        somas = self.medias.groupby(level='maquina').sum()
+        somas = somas[somas['registros'] > 0]
+        return pd.DataFrame({
+            'cam_d': somas['soma_cam_d'] / somas['registros'],
+            'cam_w': somas['soma_cam_w'] / somas['registros'],
+        })
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def salvar(self, caminho, estado):
+        """Grava o cubo junto com o estado do leitor (offset/assinatura do CSV agregado)
+        
+        JSON e não pickle: o arquivo fica na pasta de rede e é lido por todos os
+        dashboards - carregar um pickle de lá executaria o que estivesse nele.
+        """
+        try:
+            defeitos = self.defeitos.reset_index(name='ocorrencias')
+            medias = self.medias.reset_index()
+            conteudo = {
+                'estado': estado,
+                'defeitos': {
+                    'hora': defeitos['hora'].dt.strftime(FORMATO_DATA_HORA).tolist(),
+                    'maquina': defeitos['maquina'].astype(str).tolist(),
+                    'defeito': defeitos['defeito'].astype(str).tolist(),
+                    'ocorrencias': defeitos['ocorrencias'].astype('int64').tolist(),
+                },
+                'medias': {
+                    'hora': medias['hora'].dt.strftime(FORMATO_DATA_HORA).tolist(),
+                    'maquina': medias['maquina'].astype(str).tolist(),
+                    'soma_cam_d': medias['soma_cam_d'].astype('float64').tolist(),
+                    'soma_cam_w': medias['soma_cam_w'].astype('float64').tolist(),
+                    'registros': medias['registros'].astype('int64').tolist(),
+                },
+            }
+            temporario = caminho + ".tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(conteudo, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+            return True
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar cubo horário: {e}")
+            return False
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Retorna (cubo, estado) gravados ou (None, None)"""
+        try:
+            if os.path.exists(caminho):
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    conteudo = json.load(f)
+                
+                defeitos = conteudo['defeitos']
+                indice = pd.MultiIndex.from_arrays([
+                    pd.to_datetime(pd.Series(defeitos['hora'], dtype=object), format=FORMATO_DATA_HORA).astype('datetime64[ns]'),
+                    defeitos['maquina'], defeitos['defeito'],
+                ], names=['hora', 'maquina', 'defeito'])
+                serie_defeitos = pd.Series(defeitos['ocorrencias'], index=indice, dtype='int64')
+                
+                medias = conteudo['medias']
+                indice = pd.MultiIndex.from_arrays([
+                    pd.to_datetime(pd.Series(medias['hora'], dtype=object), format=FORMATO_DATA_HORA).astype('datetime64[ns]'),
+                    medias['maquina'],
+                ], names=['hora', 'maquina'])
+                tabela_medias = pd.DataFrame({
+                    'soma_cam_d': np.asarray(medias['soma_cam_d'], dtype='float64'),
+                    'soma_cam_w': np.asarray(medias['soma_cam_w'], dtype='float64'),
+                    'registros': np.asarray(medias['registros'], dtype='int64'),
+                }, index=indice)
+                return cls(serie_defeitos.sort_index(), tabela_medias.sort_index()), conteudo['estado']
+        except Exception as e:
+            print(f"⚠️ Cubo horário ignorado (arquivo inválido): {e}")
+        return None, None
+
+
+def agregar_janela(cubo, indice, inicio, fim, maquina=None):
+    """Agrega a janela [inicio, fim]: horas cheias vêm do cubo, bordas parciais dos registros
+
+    Args:
+        cubo: CuboHorario dos registros indexados
+        indice: IndiceTemporal do mesmo frame (para as bordas)
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    primeira_cheia = inicio.ceil('h')
+    fim_cheias = (fim + UM_NS).floor('h')
+
+    if primeira_cheia >= fim_cheias:
+        return CuboHorario.de_registros(indice.recortar(inicio, fim, maquina))
+
+    janela = cubo.recortar(primeira_cheia, fim_cheias, maquina)
+    if inicio < primeira_cheia:
+        janela = janela.mesclar(CuboHorario.de_registros(indice.recortar(inicio, primeira_cheia - UM_NS, maquina)))
+    if fim_cheias <= fim:
+        janela = janela.mesclar(CuboHorario.de_registros(indice.recortar(fim_cheias, fim, maquina)))
+    return janela
@@ -1,14 +1,16 @@
 """Sistema de salvamento de dados"""
 
 import os
+import csv
 import pandas as pd
 from config.settings import CAMINHO_LOCAL
+from data.schema import FORMATO_DATA_HORA
 
 def salvar_dataframe_seguro(dataframe, caminho):
     """Salva DataFrame com tratamento robusto de erros"""
     try:
         os.makedirs(os.path.dirname(caminho), exist_ok=True)
-        dataframe.to_csv(caminho, index=False, encoding='utf-8')
+        dataframe.to_csv(caminho, index=False, encoding='utf-8', date_format=FORMATO_DATA_HORA)
         print(f"💾 Dados salvos: {os.path.basename(caminho)} - {len(dataframe)} registros")
         return True
     except Exception as e:
@@ -18,9 +20,88 @@ def salvar_dataframe_seguro(dataframe, caminho):
             temp_dir = os.path.join(CAMINHO_LOCAL, "backup")
             os.makedirs(temp_dir, exist_ok=True)
             temp_path = os.path.join(temp_dir, os.path.basename(caminho))
-            dataframe.to_csv(temp_path, index=False, encoding='utf-8')
+            dataframe.to_csv(temp_path, index=False, encoding='utf-8', date_format=FORMATO_DATA_HORA)
             print(f"📦 Backup salvo em: {temp_path}")
             return True
         except Exception as e2:
             print(f"❌ Erro crítico ao salvar backup: {e2}")
             return False
+
+def anexar_dataframe_seguro(novos, caminho):
+    """
+    Anexa apenas as linhas novas ao final do CSV (com fsync).
+    
+    Retorna False quando o anexo não é possível (arquivo inexistente/vazio,
+    colunas novas ou erro de escrita) - o chamador deve então reescrever
+    o arquivo completo com salvar_dataframe_seguro.
+    """
+    try:
+        if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+            return False
+        
+        # Usar a ordem de colunas do cabeçalho existente
+        with open(caminho, 'r', encoding='utf-8', newline='') as f:
+            cabecalho = next(csv.reader([f.readline()]), [])
+        
+        if not cabecalho or set(novos.columns) - set(cabecalho):
+            return False
+        
+        # Garantir que a última linha termina com quebra de linha
+        with open(caminho, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            termina_com_quebra = f.read(1) == b'\n'
+        
+        with open(caminho, 'a', encoding='utf-8', newline='') as f:
+            if not termina_com_quebra:
+                f.write(os.linesep)
+            novos.reindex(columns=cabecalho).to_csv(f, header=False, index=False, date_format=FORMATO_DATA_HORA)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        print(f"💾 Registros anexados: {os.path.basename(caminho)} + {len(novos)} registros")
+        return True
+    except Exception as e:
+        print(f"⚠️ Erro ao anexar em {caminho}: {e}")
+        return False
+
+def preservar_texto_original(dataframe, caminho, colunas):
+    """
+    Cópia do DataFrame para regravar o CSV sem apagar valores que não foram convertidos.
+    
+    O DataFrame segue a ordem das linhas do arquivo (registros novos no fim):
+    onde ele tem vazio (NaT/NaN) e o arquivo tinha texto, volta o texto original
+    em vez de gravar vazio por cima. Se o arquivo tem mais linhas que o DataFrame
+    (exclusões), não há como alinhar e o DataFrame é devolvido como está.
+    """
+    try:
+        colunas = [c for c in colunas if c in dataframe.columns]
+        if not colunas or not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+            return dataframe
+        originais = pd.read_csv(caminho, usecols=lambda c: c in colunas, dtype=str,
+                                keep_default_na=False, encoding='utf-8')
+        if len(originais) == 0 or len(originais) > len(dataframe):
+            return dataframe
+        
+        resultado = dataframe
+        for col in colunas:
+            if col not in originais.columns:
+                continue
+            texto = originais[col].str.strip().to_numpy()
+            vazios = dataframe[col].iloc[:len(originais)].isna().to_numpy()
+            perdidos = (vazios & (texto != '')).nonzero()[0]
+            if len(perdidos) == 0:
+                continue
+            
+            if resultado is dataframe:
+                resultado = dataframe.copy()
+            serie = resultado[col]
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                serie = serie.dt.strftime(FORMATO_DATA_HORA)
+            serie = serie.astype(object)
+            serie.iloc[perdidos] = texto[perdidos]
+            resultado[col] = serie
+            print(f"⚠️ {len(perdidos)} valor(es) de '{col}' não reconhecido(s) - texto original mantido em {os.path.basename(caminho)}")
+        return resultado
+    except Exception as e:
+        print(f"⚠️ Erro ao conferir valores originais de {caminho}: {e}")
+        return dataframe
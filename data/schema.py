@@ -0,0 +1,117 @@
+"""Esquema tipado dos dados de produção"""
+
+from datetime import datetime
+
+import pandas as pd
+
+# data_hora é gravada sempre neste formato (to_csv com date_format)
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M:%S"
+
+# Formatos aceitos na leitura, na ordem de tentativa - o gravado pelo coletor
+# primeiro, depois variações de arquivos antigos/editados à mão
+FORMATOS_DATA_HORA = (
+    FORMATO_DATA_HORA,
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+)
+
+
+def _eh_categoria(serie):
+    return isinstance(serie.dtype, pd.CategoricalDtype)
+
+
+def aplicar_schema(df, tipos):
+    """Converte as colunas do DataFrame para os tipos declarados (category, float32, datetime)"""
+    for col, tipo in tipos.items():
+        if col not in df.columns:
+            continue
+        
+        serie = df[col]
+        if tipo == 'category':
+            if not _eh_categoria(serie):
+                df[col] = serie.astype('category')
+        elif tipo.startswith('float'):
+            if serie.dtype != tipo:
+                df[col] = pd.to_numeric(serie, errors='coerce').astype(tipo)
+        elif tipo.startswith('datetime64'):
+            if not pd.api.types.is_datetime64_any_dtype(serie):
+                df[col] = converter_data_hora(serie)
+    return df
+
+
+def converter_data_hora(serie):
+    """Converte texto em datetime testando os FORMATOS_DATA_HORA
+    
+    Sem inferir o formato pelo primeiro valor: um registro só com a data (meia-noite)
+    não derruba para NaT os demais. Cada formato só é tentado nos valores que os
+    anteriores não reconheceram; o que nenhum reconhece fica NaT.
+    """
+    texto = serie.astype(str).str.strip()
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    pendentes = serie.notna() & (texto != '')
+    for formato in FORMATOS_DATA_HORA:
+        if not pendentes.any():
+            break
+        resultado[pendentes] = pd.to_datetime(texto[pendentes], format=formato, errors='coerce')
+        pendentes &= resultado.isna()
+    return resultado
+
+
+def converter_valor(valor, tipo):
+    """Converte um valor isolado (ex: edição manual) para o tipo da coluna"""
+    if tipo.startswith('float'):
+        return pd.to_numeric(pd.Series([valor]), errors='coerce').iloc[0]
+    if tipo.startswith('datetime64'):
+        if isinstance(valor, (pd.Timestamp, datetime)):
+            return pd.Timestamp(valor)
+        return converter_data_hora(pd.Series([valor], dtype=object)).iloc[0]
+    return valor
+
+
+def registro_serializavel(registro):
+    """Converte um registro tipado (Timestamp, float32, NaN) em valores simples, como no CSV"""
+    convertido = {}
+    for campo, valor in registro.items():
+        if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+            convertido[campo] = ''
+        elif isinstance(valor, pd.Timestamp):
+            convertido[campo] = valor.strftime(FORMATO_DATA_HORA)
+        elif getattr(valor, 'dtype', None) is not None and valor.dtype.kind == 'f':
+            convertido[campo] = float(str(valor))  # float32 sem ruído de precisão (1.2 e não 1.2000000476)
+        elif hasattr(valor, 'item'):
+            convertido[campo] = valor.item()
+        else:
+            convertido[campo] = valor
+    return convertido
+
+
+def concatenar_tipado(df_base, novos, tipos, ignorar_indice=True):
+    """Concatena registros novos mantendo as colunas categóricas (sem cair para object)"""
+    novos = aplicar_schema(novos, tipos)
+    
+    if df_base is None:
+        return novos
+    if len(df_base) == 0:
+        colunas = list(df_base.columns) + [c for c in novos.columns if c not in df_base.columns]
+        novos = aplicar_schema(novos.reindex(columns=colunas), tipos)
+        return novos.reset_index(drop=True) if ignorar_indice else novos
+    
+    # Categorias precisam ser idênticas dos dois lados para o concat preservar o dtype
+    df_base = df_base.copy(deep=False)
+    for col, tipo in tipos.items():
+        if tipo != 'category' or col not in df_base.columns or col not in novos.columns:
+            continue
+        if not (_eh_categoria(df_base[col]) and _eh_categoria(novos[col])):
+            continue
+        
+        categorias = df_base[col].cat.categories.union(novos[col].cat.categories)
+        if not df_base[col].cat.categories.equals(categorias):
+            df_base[col] = df_base[col].cat.set_categories(categorias)
+        novos[col] = novos[col].cat.set_categories(categorias)
+    
+    return pd.concat([df_base, novos], ignore_index=ignorar_indice)
@@ -0,0 +1,238 @@
+"""Backend SQLite para produção, usuários e log (alternativa aos CSVs)"""
+
+import os
+import sqlite3
+import threading
+import pandas as pd
+from config.constants import COLUNAS_DADOS, COLUNAS_USUARIOS, COLUNAS_LOG
+from .schema import aplicar_schema
+
+TABELAS = {
+    'producao': COLUNAS_DADOS,
+    'usuarios': COLUNAS_USUARIOS,
+    'log': COLUNAS_LOG,
+}
+
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M:%S"
+
+
+class BackendSQLite:
+    """Registros em SQLite com índices para as consultas por máquina/período e lote/caixa
+
+    O `id` (rowid) de cada registro de produção vira o índice do DataFrame,
+    então edições apontam direto para a linha no banco.
+    """
+
+    def __init__(self, caminho, tipos=None):
+        self.caminho = caminho
+        self.tipos = tipos or {}
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._criar_estrutura()
+        print(f"🗄️ Backend SQLite: {caminho}")
+
+    def _criar_estrutura(self):
+        with self._lock, self._conn:
+            for tabela, colunas in TABELAS.items():
+                definicoes = ', '.join(f'"{col}" {self._tipo_sql(tabela, col)}' for col in colunas)
+                self._conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {tabela} (id INTEGER PRIMARY KEY AUTOINCREMENT, {definicoes})'
+                )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_producao_maquina_data ON producao (maquina, data_hora)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_producao_lote_caixa ON producao (lote, numero_caixa)')
+
+    def _tipo_sql(self, tabela, coluna):
+        if tabela == 'producao' and self.tipos.get(coluna, '').startswith('float'):
+            return 'REAL'
+        return 'TEXT'
+
+    def _valor(self, tabela, coluna, valor):
+        """Converte um valor Python/pandas para o tipo gravado na coluna"""
+        try:
+            if valor is None or pd.isna(valor):
+                return None
+        except (TypeError, ValueError):
+            pass  # listas/objetos - gravados como texto
+
+        if self._tipo_sql(tabela, coluna) == 'REAL':
+            valor = pd.to_numeric(valor, errors='coerce')
+            return None if pd.isna(valor) else float(valor)
+        if hasattr(valor, 'strftime'):
+            return valor.strftime(FORMATO_DATA_HORA)
+        return str(valor)
+
+    def _linha(self, tabela, registro):
+        return tuple(self._valor(tabela, col, registro.get(col)) for col in TABELAS[tabela])
+
+    def _sql_insert(self, tabela, com_id=False):
+        colunas = (['id'] if com_id else []) + TABELAS[tabela]
+        nomes = ', '.join(f'"{col}"' for col in colunas)
+        marcadores = ', '.join('?' for _ in colunas)
+        return f'INSERT INTO {tabela} ({nomes}) VALUES ({marcadores})'
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def inserir(self, tabela, registro):
+        """Insere um registro em uma transação curta e retorna o id gerado"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(self._sql_insert(tabela), self._linha(tabela, registro))
+            return cursor.lastrowid
+
+    def linhas_por_chave(self, tabela, df, chave):
+        """Retrato {chave: linha como gravada no banco} do DataFrame - base de gravar_alteracoes"""
+        posicao = TABELAS[tabela].index(chave)
+        linhas = (self._linha(tabela, r) for r in df.to_dict('records'))
+        return {linha[posicao]: linha for linha in linhas if linha[posicao] is not None}
+
+    def gravar_alteracoes(self, tabela, chave, anteriores, atuais):
+        """Aplica ao banco só a diferença entre dois retratos {chave: linha} da tabela
+
+        Linhas novas ou alteradas são atualizadas pela chave (inseridas se não
+        existem); só as chaves que saíram do retrato são apagadas. Registros que
+        outros processos gravaram depois da leitura não são tocados.
+
+        Returns:
+            (gravadas, apagadas)
+        """
+        colunas = TABELAS[tabela]
+        alteradas = [linha for valor, linha in atuais.items() if anteriores.get(valor) != linha]
+        removidas = [valor for valor in anteriores if valor not in atuais]
+
+        atribuicoes = ', '.join(f'"{col}" = ?' for col in colunas)
+        posicao = colunas.index(chave)
+        with self._lock, self._conn:
+            for linha in alteradas:
+                cursor = self._conn.execute(f'UPDATE {tabela} SET {atribuicoes} WHERE "{chave}" = ?',
+                                            linha + (linha[posicao],))
+                if cursor.rowcount == 0:
+                    self._conn.execute(self._sql_insert(tabela), linha)
+            for valor in removidas:
+                self._conn.execute(f'DELETE FROM {tabela} WHERE "{chave}" = ?', (valor,))
+        return len(alteradas), len(removidas)
+
+    def atualizar(self, id_registro, alteracoes):
+        """Atualiza campos de um registro de produção pelo id"""
+        campos = [c for c in alteracoes if c in COLUNAS_DADOS]
+        if not campos:
+            return False
+
+        atribuicoes = ', '.join(f'"{c}" = ?' for c in campos)
+        valores = [self._valor('producao', c, alteracoes[c]) for c in campos]
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f'UPDATE producao SET {atribuicoes} WHERE id = ?', valores + [int(id_registro)])
+            return cursor.rowcount == 1
+
+    def importar_se_vazia(self, tabela, carregar_df):
+        """Migração única: copia o CSV para a tabela quando ela ainda está vazia"""
+        if self.contar(tabela) > 0:
+            return 0
+
+        df = carregar_df()
+        if df is None or len(df) == 0:
+            return 0
+
+        linhas = [self._linha(tabela, r) for r in df.to_dict('records')]
+        with self._lock, self._conn:
+            self._conn.executemany(self._sql_insert(tabela), linhas)
+        print(f"📥 {len(linhas)} registros importados do CSV para a tabela '{tabela}'")
+        return len(linhas)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def carregar(self, tabela, onde='', parametros=(), limite=None, colunas=None):
+        """Lê registros da tabela como DataFrame indexado pelo id (colunas=None: todas)"""
+        colunas = [c for c in TABELAS[tabela] if colunas is None or c in colunas]
+        colunas = ', '.join(['id'] + [f'"{col}"' for col in colunas])
+        sql = f'SELECT {colunas} FROM {tabela}'
+        if onde:
+            sql += f' WHERE {onde}'
+        if limite:
+            # Os mais recentes, devolvidos em ordem cronológica
+            sql = f'SELECT * FROM ({sql} ORDER BY id DESC LIMIT {int(limite)}) ORDER BY id'
+        else:
+            sql += ' ORDER BY id'
+
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=list(parametros), index_col='id')
+
+        if tabela == 'producao' and self.tipos:
+            df = aplicar_schema(df, self.tipos)
+        return df
+
+    def consultar(self, maquina=None, lote=None, inicio=None, fim=None, maquinas=None, apos_id=None, limite=None,
+                  colunas=None):
+        """Consulta de produção resolvida pelos índices
+
+        Args:
+            maquina: Máquina exata (o índice não resolve busca por trecho)
+            lote: Prefixo do lote (busca por faixa no índice lote/numero_caixa)
+            inicio, fim: Intervalo de data_hora (inclusivo)
+            maquinas: Lista de máquinas aceitas
+            apos_id: Apenas registros com id maior (leitura incremental)
+            limite: Apenas os N registros mais recentes
+            colunas: Apenas estas colunas (None = todas)
+        """
+        condicoes, parametros = [], []
+        if maquina:
+            condicoes.append('maquina = ?')
+            parametros.append(str(maquina))
+        if maquinas is not None:
+            condicoes.append(f"maquina IN ({', '.join('?' for _ in maquinas)})")
+            parametros.extend(str(m) for m in maquinas)
+        if lote:
+            condicoes.append('lote >= ? AND lote < ?')
+            parametros.extend([lote, lote + '\uffff'])
+        if inicio is not None:
+            condicoes.append('data_hora >= ?')
+            parametros.append(pd.Timestamp(inicio).strftime(FORMATO_DATA_HORA))
+        if fim is not None:
+            condicoes.append('data_hora <= ?')
+            parametros.append(pd.Timestamp(fim).strftime(FORMATO_DATA_HORA))
+        if apos_id is not None:
+            condicoes.append('id > ?')
+            parametros.append(int(apos_id))
+
+        return self.carregar('producao', ' AND '.join(condicoes), parametros, limite, colunas)
+
+    def obter(self, id_registro):
+        """Registro de produção pelo id (dict) ou None"""
+        df = self.carregar('producao', 'id = ?', [int(id_registro)])
+        return df.iloc[0].to_dict() if len(df) else None
+
+    def contar(self, tabela):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0]
+
+    def ultimo_id(self, tabela):
+        with self._lock:
+            return self._conn.execute(f'SELECT MAX(id) FROM {tabela}').fetchone()[0] or 0
+
+
+class LeitorSQLite:
+    """Linhas novas da tabela de produção pelo id - mesmo contrato de LeitorIncremental.ler_novos"""
+
+    def __init__(self, backend, ultimo_id=None):
+        self.backend = backend
+        self.ultimo_id = ultimo_id  # None: a próxima leitura é completa
+
+    def invalidar(self):
+        self.ultimo_id = None
+
+    def ler_novos(self):
+        """(registros, completo): com completo=True os registros são a tabela inteira"""
+        completo = self.ultimo_id is None or self.backend.ultimo_id('producao') < self.ultimo_id
+        if completo:
+            novos = self.backend.carregar('producao')
+        else:
+            novos = self.backend.consultar(apos_id=self.ultimo_id)
+        if len(novos) > 0:
+            self.ultimo_id = int(novos.index.max())
+        elif completo:
+            self.ultimo_id = 0
+        return novos, completo
@@ -6,11 +6,18 @@ import datetime
 import os
 import json
 import uuid
+import queue
+import threading
 from models.machine import MachineConfig
 from models.batch import BatchConfig
 from config.constants import TABELA_SIZES
 from utils.machine_id import gerar_id_computador_avancado
 from config.settings import CAMINHO_REDE
+from utils.caixa_comandos import depositar_comando
+from utils.canal_socket import enviar_direto
+from utils.resultado_comandos import acompanhar_resultado, descrever
+from utils.transmissao import transmitir, resumo_transmissao
+from utils import status_frota
 from gui.user_manager import gerenciar_usuarios
 from utils.log_manager import abrir_gerenciador_logs
 from utils.command_priority_system import inicializar_sistema_prioridade, obter_sistema_prioridade
@@ -258,7 +265,7 @@ def abrir_painel_desenvolvedor(root, data_manager, machine_config: MachineConfig
    • Usuários cadastrados: {', '.join(data_manager.df_users['login'].tolist())}
 
 📊 DADOS:
-   • Total de registros: {len(data_manager.df)}
+   • Total de registros: {data_manager.total_registros()}
    • Total de logs: {len(data_manager.df_log)}
 
 📁 CAMINHOS:
@@ -355,26 +362,10 @@ def abrir_painel_desenvolvedor(root, data_manager, machine_config: MachineConfig
         def descobrir_maquinas():
             """Descobre máquinas online na rede"""
             try:
-                maquinas = []
-                if os.path.exists(CAMINHO_REDE):
-                    for arquivo in os.listdir(CAMINHO_REDE):
-                        if arquivo.startswith('status_maq_') and arquivo.endswith('.json'):
-                            try:
-                                caminho_arquivo = os.path.join(CAMINHO_REDE, arquivo)
-                                with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                                    status = json.load(f)
-                                
-                                timestamp_str = status.get('timestamp', '')
-                                if timestamp_str:
-                                    timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                                    agora = datetime.datetime.now()
-                                    diferenca = (agora - timestamp).total_seconds()
-                                    
-                                    if diferenca < 60:  # Online se atualizou nos últimos 60s
-                                        maquina_id = arquivo.replace('status_maq_', '').replace('.json', '')
-                                        maquinas.append(f"✅ {maquina_id} - {status.get('hostname', 'N/A')} - IP: {status.get('ip', 'N/A')}")
-                            except:
-                                continue
+                # Online se atualizou nos últimos 60s (uma leitura do índice da frota)
+                online = status_frota.maquinas_online([CAMINHO_REDE], idade_maxima=60)
+                maquinas = [f"✅ {maquina_id} - {status.get('hostname', 'N/A')} - IP: {status.get('ip', 'N/A')}"
+                            for maquina_id, status in sorted(online.items())]
                 
                 if maquinas:
                     maquinas_online_var.set("\n".join(maquinas))
@@ -459,20 +450,32 @@ def abrir_painel_desenvolvedor(root, data_manager, machine_config: MachineConfig
                     'remetente': maquina_remetente
                 }
                 
-                comando_file = os.path.join(CAMINHO_REDE, f"comando_maq_{maquina}.json")
+                # Canal direto (TCP) se a máquina anunciar; senão arquivo na rede
+                if not enviar_direto(maquina, comando_data):
+                    # Garantir que diretório existe
+                    os.makedirs(CAMINHO_REDE, exist_ok=True)
+                    
+                    # Arquivo próprio na caixa da máquina (não sobrescreve comando pendente)
+                    depositar_comando(CAMINHO_REDE, maquina, comando_data)
                 
-                # Garantir que diretório existe
-                os.makedirs(CAMINHO_REDE, exist_ok=True)
+                print(f"📤 Comando enviado: {comando} -> {maquina}")
                 
-                with open(comando_file, 'w', encoding='utf-8') as f:
-                    json.dump(comando_data, f, indent=2, ensure_ascii=False)
+                # Confirmação/resultado da máquina chega em segundo plano
+                lbl_resultado.config(text=f"⏳ {comando} -> {maquina}: aguardando confirmação...", fg="#7f8c8d")
                 
-                print(f"📤 Comando enviado: {comando} -> {maquina}")
+                def mostrar_resultado(registro, comando=comando, maquina=maquina):
+                    texto = descrever(registro)
+                    print(f"⏱️ {comando} -> {maquina}: {texto}")
+                    ok = registro is not None and registro.get('estado') == 'concluido'
+                    lbl_resultado.config(text=f"{'✅' if ok else '⚠️'} {comando} -> {maquina}: {texto}",
+                                         fg="#27ae60" if ok else "#e67e22")
+                
+                acompanhar_resultado(lbl_resultado, comando_data['id'], mostrar_resultado)
                 
                 messagebox.showinfo("✅ Sucesso", 
                                   f"Comando '{comando}' enviado para máquina '{maquina}'!\n\n"
                                   f"ID: {comando_data['id']}\n\n"
-                                  f"O comando será executado em até 1 segundo.")
+                                  f"A confirmação e as latências aparecem no painel de comandos.")
             except Exception as e:
                 print(f"❌ Erro ao enviar comando: {e}")
                 messagebox.showerror("Erro", f"Falha ao enviar comando: {e}")
@@ -481,6 +484,9 @@ def abrir_painel_desenvolvedor(root, data_manager, machine_config: MachineConfig
                  bg="#28a745", fg="white", font=("Arial", 11, "bold"), 
                  height=2, width=20).grid(row=3, column=1, pady=15)
         
+        lbl_resultado = tk.Label(frm_comandos, text="", font=("Arial", 9), wraplength=500, justify='left')
+        lbl_resultado.grid(row=5, column=0, columnspan=3, sticky='w', padx=10, pady=5)
+        
         # Exemplos de comandos
         frm_exemplos = tk.LabelFrame(frame_controle, text="💡 Exemplos de Parâmetros", font=("Arial", 9, "bold"))
         frm_exemplos.pack(fill='x', padx=20, pady=10)
@@ -512,58 +518,51 @@ def abrir_painel_desenvolvedor(root, data_manager, machine_config: MachineConfig
                 messagebox.showerror("Erro", "Parâmetros JSON inválidos!")
                 return
             
-            # Descobrir máquinas
-            maquinas = []
-            if os.path.exists(CAMINHO_REDE):
-                for arquivo in os.listdir(CAMINHO_REDE):
-                    if arquivo.startswith('status_maq_') and arquivo.endswith('.json'):
-                        try:
-                            caminho_arquivo = os.path.join(CAMINHO_REDE, arquivo)
-                            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                                status = json.load(f)
-                            
-                            timestamp_str = status.get('timestamp', '')
-                            if timestamp_str:
-                                timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                                agora = datetime.datetime.now()
-                                diferenca = (agora - timestamp).total_seconds()
-                                
-                                if diferenca < 60:
-                                    maquina_id = arquivo.replace('status_maq_', '').replace('.json', '')
-                                    maquinas.append(maquina_id)
-                        except:
-                            continue
+            # Descobrir máquinas (status guardado para o canal direto)
+            status_maquinas = status_frota.maquinas_online([CAMINHO_REDE], idade_maxima=60)
+            maquinas = list(status_maquinas)
             
             if not maquinas:
                 messagebox.showwarning("Aviso", "Nenhuma máquina online encontrada!")
                 return
             
-            # Enviar para todas
+            # Enviar para todas (exceto para si mesmo) em paralelo, fora da thread da interface
             maquina_remetente = machine_config.obter_configuracao_maquina()
-            enviados = 0
+            alvos = [m for m in maquinas if m != maquina_remetente]
             
-            for maquina in maquinas:
-                if maquina != maquina_remetente:  # Não enviar para si mesmo
-                    try:
-                        comando_data = {
-                            'acao': comando,
-                            'parametros': parametros,
-                            'id': str(uuid.uuid4()),
-                            'timestamp': datetime.datetime.now().isoformat(),
-                            'remetente': maquina_remetente
-                        }
-                        
-                        comando_file = os.path.join(CAMINHO_REDE, f"comando_maq_{maquina}.json")
-                        with open(comando_file, 'w', encoding='utf-8') as f:
-                            json.dump(comando_data, f, indent=2, ensure_ascii=False)
-                        
-                        enviados += 1
-                        print(f"📤 Comando enviado para: {maquina}")
-                    except Exception as e:
-                        print(f"❌ Erro ao enviar para {maquina}: {e}")
+            def enviar_para(maquina):
+                comando_data = {
+                    'acao': comando,
+                    'parametros': parametros,
+                    'id': str(uuid.uuid4()),
+                    'timestamp': datetime.datetime.now().isoformat(),
+                    'remetente': maquina_remetente
+                }
+                
+                if not enviar_direto(maquina, comando_data, status_maquinas.get(maquina)):
+                    depositar_comando(CAMINHO_REDE, maquina, comando_data)
+                return comando_data['id']
+            
+            fila_resultado = queue.Queue()
+            threading.Thread(target=lambda: fila_resultado.put(transmitir(alvos, enviar_para)),
+                             daemon=True).start()
+            lbl_resultado.config(text=f"⏳ Enviando '{comando}' para {len(alvos)} máquina(s)...", fg="#7f8c8d")
+            
+            def mostrar_resumo():
+                try:
+                    resultados = fila_resultado.get_nowait()
+                except queue.Empty:
+                    frm_comandos.after(50, mostrar_resumo)
+                    return
+                
+                resumo = resumo_transmissao(resultados)
+                print(f"📢 Broadcast '{comando}':\n{resumo}")
+                enviados = sum(1 for r in resultados if r['sucesso'])
+                lbl_resultado.config(text=f"📢 '{comando}': {enviados}/{len(resultados)} máquina(s)",
+                                     fg="#27ae60" if enviados == len(resultados) else "#e67e22")
+                messagebox.showinfo("📢 Broadcast", f"Comando '{comando}'\n\n{resumo}")
             
-            messagebox.showinfo("✅ Sucesso", 
-                              f"Comando '{comando}' enviado para {enviados} máquina(s)!")
+            frm_comandos.after(50, mostrar_resumo)
         
         tk.Button(frm_comandos, text="📢 Enviar para TODAS as Máquinas", command=enviar_para_todas,
                  bg="#e74c3c", fg="white", font=("Arial", 10, "bold"), 
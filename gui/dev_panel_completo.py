@@ -4,7 +4,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 import datetime
 import os
-import json
+import queue
 import uuid
 import subprocess
 import shutil
@@ -13,14 +13,19 @@ from models.batch import BatchConfig
 from config.constants import TABELA_SIZES
 from utils.machine_id import gerar_id_computador_avancado
 from config.settings import CAMINHO_REDE, CAMINHO_LOCAL
+from utils.caixa_comandos import depositar_comando
+from utils.canal_socket import enviar_direto
+from utils.resultado_comandos import acompanhar_resultado, descrever
+from utils import status_frota
 from gui.user_manager import gerenciar_usuarios
-from ml.predictor import PredicaoInteligente
+from ml.predictor import inicializar_ia
+from ml.deteccao_deriva import MonitorDeriva, descrever_alerta
 
 
 def criar_aba_ia_desenvolvedor(parent, data_manager, machine_config):
     """Cria aba de IA exclusiva para desenvolvedor com análise de todas as máquinas"""
     
-    ia = PredicaoInteligente(data_manager)
+    ia = inicializar_ia(data_manager)
     
     frame_principal = tk.Frame(parent)
     frame_principal.pack(fill='both', expand=True, padx=10, pady=10)
@@ -322,6 +327,54 @@ def criar_aba_ia_desenvolvedor(parent, data_manager, machine_config):
              command=gerar_comparativo,
              bg="#28a745", fg="white", font=("Arial", 12, "bold"),
              width=30, height=2).pack(pady=10)
+    
+    # Sub-aba 4: Deriva em tempo real (EWMA/CUSUM a cada registro novo)
+    tab_deriva = ttk.Frame(notebook_ia)
+    notebook_ia.add(tab_deriva, text="🚨 Deriva (Tempo Real)")
+    
+    frame_deriva = tk.Frame(tab_deriva)
+    frame_deriva.pack(fill='both', expand=True, padx=10, pady=10)
+    
+    lbl_deriva = tk.Label(frame_deriva, text="📈 Iniciando monitor de deriva...", 
+                          font=("Arial", 10, "bold"), fg="#6f42c1")
+    lbl_deriva.pack(anchor='w', pady=(0, 5))
+    
+    text_deriva = scrolledtext.ScrolledText(frame_deriva, font=("Consolas", 9), height=30, wrap=tk.WORD)
+    text_deriva.pack(fill='both', expand=True)
+    
+    monitor = MonitorDeriva(data_manager)
+    monitor.iniciar()
+    total_alertas = [0]
+    
+    def verificar_alertas():
+        """Esvazia a fila de alertas do monitor (thread do Tk, a cada segundo)"""
+        try:
+            while True:
+                alerta = monitor.alertas.get_nowait()
+                total_alertas[0] += 1
+                text_deriva.insert(tk.END, descrever_alerta(alerta) + "\n")
+                text_deriva.see(tk.END)
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            monitor.parar()
+            return
+        
+        try:
+            lbl_deriva.config(text=f"📈 EWMA/CUSUM: {monitor.maquinas} máquina(s) | "
+                                   f"{monitor.registros_processados} registro(s) novo(s) | {total_alertas[0]} alerta(s)")
+            frame_deriva.after(1000, verificar_alertas)
+        except tk.TclError:
+            monitor.parar()  # Painel fechado
+    
+    frame_deriva.bind('<Destroy>', lambda e: monitor.parar() if e.widget is frame_deriva else None)
+    
+    tk.Button(frame_deriva, text="🗑️ LIMPAR ALERTAS", 
+             command=lambda: text_deriva.delete(1.0, tk.END),
+             bg="#6c757d", fg="white", font=("Arial", 11, "bold"),
+             width=20).pack(pady=10)
+    
+    frame_deriva.after(1000, verificar_alertas)
 
 
 def abrir_painel_desenvolvedor_completo(root, data_manager, machine_config: MachineConfig, batch_config: BatchConfig):
@@ -409,55 +462,9 @@ def abrir_painel_desenvolvedor_completo(root, data_manager, machine_config: Mach
         maquinas_encontradas = []
         
         try:
-            # Buscar na REDE
-            if os.path.exists(CAMINHO_REDE):
-                arquivos = os.listdir(CAMINHO_REDE)
-                for arquivo in arquivos:
-                    if arquivo.startswith("status_maq_") and arquivo.endswith(".json"):
-                        try:
-                            caminho_arquivo = os.path.join(CAMINHO_REDE, arquivo)
-                            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                                status = json.load(f)
-                            
-                            # Verificar se está online (timestamp recente)
-                            timestamp_str = status.get('timestamp', '')
-                            if timestamp_str:
-                                timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                                agora = datetime.datetime.now()
-                                diferenca = (agora - timestamp).total_seconds()
-                                
-                                # Considerar online se atualizou nos últimos 30 segundos
-                                if diferenca < 30:
-                                    maquina = arquivo.replace("status_maq_", "").replace(".json", "")
-                                    if maquina not in maquinas_encontradas:
-                                        maquinas_encontradas.append(maquina)
-                        except:
-                            continue
-            
-            # Buscar LOCALMENTE também (para máquina atual)
-            try:
-                arquivos_locais = os.listdir(CAMINHO_LOCAL)
-                for arquivo in arquivos_locais:
-                    if arquivo.startswith("status_maq_") and arquivo.endswith(".json"):
-                        try:
-                            caminho_arquivo = os.path.join(CAMINHO_LOCAL, arquivo)
-                            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                                status = json.load(f)
-                            
-                            timestamp_str = status.get('timestamp', '')
-                            if timestamp_str:
-                                timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                                agora = datetime.datetime.now()
-                                diferenca = (agora - timestamp).total_seconds()
-                                
-                                if diferenca < 30:
-                                    maquina = arquivo.replace("status_maq_", "").replace(".json", "")
-                                    if maquina not in maquinas_encontradas:
-                                        maquinas_encontradas.append(maquina)
-                        except:
-                            continue
-            except:
-                pass
+            # REDE e LOCAL (máquina atual); online se atualizou nos últimos 30 segundos.
+            # Uma leitura do índice da frota por base.
+            maquinas_encontradas = list(status_frota.maquinas_online([CAMINHO_REDE, CAMINHO_LOCAL], idade_maxima=30))
             
             if maquinas_encontradas:
                 for maq in sorted(maquinas_encontradas):
@@ -610,7 +617,7 @@ def abrir_painel_desenvolvedor_completo(root, data_manager, machine_config: Mach
         stats_text.insert(tk.END, f"📦 Lote: {config_lote.get('lote', 'N/D')}\n")
         stats_text.insert(tk.END, f"📦 Caixa: {config_lote.get('caixa_atual', 0)}/{config_lote.get('total_caixas', 0)}\n\n")
         
-        stats_text.insert(tk.END, f"📊 Registros de Produção: {len(data_manager.df) if data_manager.df is not None else 0}\n")
+        stats_text.insert(tk.END, f"📊 Registros de Produção: {data_manager.total_registros()}\n")
         stats_text.insert(tk.END, f"👥 Usuários Cadastrados: {len(data_manager.df_users) if data_manager.df_users is not None else 0}\n")
         stats_text.insert(tk.END, f"📝 Logs do Sistema: {len(data_manager.df_log) if data_manager.df_log is not None else 0}\n\n")
         
@@ -717,7 +724,7 @@ def exportar_dados(data_manager):
 
 def verificar_integridade(data_manager):
     problemas = []
-    if data_manager.df is None or len(data_manager.df) == 0:
+    if data_manager.total_registros() == 0:
         problemas.append("⚠️ Sem dados de produção")
     if data_manager.df_users is None or len(data_manager.df_users) == 0:
         problemas.append("⚠️ Sem usuários cadastrados")
@@ -784,10 +791,10 @@ def enviar_comando_remoto(acao, listbox, log_func):
         messagebox.showwarning("Aviso", "Selecione uma máquina!")
         return
     
-    maquina = listbox.get(selecionados[0])
+    # Itens da lista vêm como "🟢 <máquina>"
+    maquina = listbox.get(selecionados[0]).split()[-1]
     
     try:
-        comando_file = os.path.join(CAMINHO_REDE, f"comando_maq_{maquina}.json")
         comando_data = {
             'id': str(uuid.uuid4()),
             'acao': acao,
@@ -795,10 +802,13 @@ def enviar_comando_remoto(acao, listbox, log_func):
             'parametros': {}
         }
         
-        with open(comando_file, 'w', encoding='utf-8') as f:
-            json.dump(comando_data, f, indent=2)
-        
-        log_func(f"✅ Comando '{acao}' enviado para {maquina}")
+        if enviar_direto(maquina, comando_data):
+            log_func(f"🔌 Comando '{acao}' entregue direto (TCP) para {maquina}")
+        else:
+            depositar_comando(CAMINHO_REDE, maquina, comando_data)
+            log_func(f"✅ Comando '{acao}' enviado para {maquina}")
+        acompanhar_resultado(listbox, comando_data['id'],
+                             lambda registro: log_func(f"⏱️ {acao} -> {maquina}: {descrever(registro)}"))
         messagebox.showinfo("Sucesso", f"✅ Comando enviado para {maquina}")
     except Exception as e:
         log_func(f"❌ Erro: {e}")
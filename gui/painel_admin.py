@@ -2,7 +2,6 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
 import datetime
 from utils.auditoria import (
     auditar_insercao_producao, 
@@ -330,16 +329,8 @@ def criar_aba_inserir_dados(parent, data_manager, machine_config, batch_config,
         dados['usuario_reg'] = usuario_selecionado  # USUÁRIO SELECIONADO
         dados['lote'] = lote_atual  # LOTE AUTOMÁTICO DO SISTEMA
         
-        # Inserir no DataFrame
-        novo_registro = pd.DataFrame([dados])
-        
-        if data_manager.df is None:
-            data_manager.df = novo_registro
-        else:
-            data_manager.df = pd.concat([data_manager.df, novo_registro], ignore_index=True)
-        
-        # Salvar
-        if data_manager.salvar_dados():
+        # Inserir e salvar (anexa apenas o novo registro ao CSV)
+        if data_manager.adicionar_registro(dados):
             # Auditar
             auditar_insercao_producao(usuario_logado, dados)
             
@@ -402,20 +393,14 @@ def criar_aba_editar_dados(parent, data_manager, usuario_logado):
         for item in tree.get_children():
             tree.delete(item)
         
-        if data_manager.df is None or len(data_manager.df) == 0:
+        # Últimos 100 registros (SELECT indexado no SQLite; no CSV, relê só o trecho novo)
+        df_filtrado = data_manager.consultar(maquina=filtro_maquina.get().strip() or None,
+                                             lote=filtro_lote.get().strip() or None,
+                                             limite=100)
+        if df_filtrado is None or len(df_filtrado) == 0:
             return
         
-        df_filtrado = data_manager.df.copy()
-        
-        # Aplicar filtros
-        if filtro_maquina.get():
-            df_filtrado = df_filtrado[df_filtrado['maquina'].str.contains(filtro_maquina.get(), case=False, na=False)]
-        
-        if filtro_lote.get():
-            df_filtrado = df_filtrado[df_filtrado['lote'].str.contains(filtro_lote.get(), case=False, na=False)]
-        
-        # Mostrar últimos 100 registros
-        for idx, row in df_filtrado.tail(100).iterrows():
+        for idx, row in df_filtrado.iterrows():
             tree.insert("", "end", values=[
                 idx,
                 row.get('maquina', ''),
@@ -451,12 +436,11 @@ def criar_aba_editar_dados(parent, data_manager, usuario_logado):
 def abrir_janela_edicao(data_manager, idx, usuario_logado, callback_atualizar):
     """Abre janela para editar registro específico"""
     
-    if data_manager.df is None or idx >= len(data_manager.df):
+    registro_original = data_manager.obter_registro(idx)
+    if registro_original is None:
         messagebox.showerror("Erro", "Registro não encontrado!")
         return
     
-    registro_original = data_manager.df.iloc[idx].to_dict()
-    
     janela_edicao = tk.Toplevel()
     janela_edicao.title(f"✏️ Editar Registro #{idx}")
     janela_edicao.geometry("600x700")
@@ -509,15 +493,12 @@ def abrir_janela_edicao(data_manager, idx, usuario_logado, callback_atualizar):
         for campo, var in vars_dict.items():
             dados_novos[campo] = var.get().strip()
         
-        # Atualizar DataFrame
-        for campo, valor in dados_novos.items():
-            data_manager.df.at[idx, campo] = valor
-        
-        data_manager.df.at[idx, 'justificativa'] = justificativa
-        data_manager.df.at[idx, 'usuario_reg'] = usuario_logado
+        # Atualizar registro (reescrita completa do CSV)
+        alteracoes = dict(dados_novos)
+        alteracoes['justificativa'] = justificativa
+        alteracoes['usuario_reg'] = usuario_logado
         
-        # Salvar
-        if data_manager.salvar_dados():
+        if data_manager.atualizar_registro(idx, alteracoes):
             # Auditar
             auditar_edicao_producao(usuario_logado, registro_original, dados_novos, justificativa)
             
@@ -3,14 +3,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
-from ml.predictor import PredicaoInteligente
+from ml.predictor import inicializar_ia
 
 
 def abrir_painel_ia(root, data_manager, machine_config):
     """Abre painel de IA com análises e predições"""
     
     # Inicializar IA
-    ia = PredicaoInteligente(data_manager)
+    ia = inicializar_ia(data_manager)
     
     janela_ia = tk.Toplevel(root)
     janela_ia.title("🤖 Painel de Inteligência Artificial")
@@ -394,7 +394,7 @@ def criar_aba_relatorio(parent, ia, machine_config):
         
         # Mostrar relatório
         text_relatorio.delete(1.0, tk.END)
-        text_relatorio.insert(tk.END, json.dumps(relatorio, indent=2, ensure_ascii=False))
+        text_relatorio.insert(tk.END, json.dumps(relatorio, indent=2, ensure_ascii=False, default=str))
     
     tk.Button(frame_botoes, text="📊 GERAR RELATÓRIO COMPLETO", 
              command=gerar_relatorio_completo,
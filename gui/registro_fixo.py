@@ -6,7 +6,6 @@ import datetime
 from models.batch import BatchConfig
 from models.machine import MachineConfig
 from data.manager import DataManager
-import pandas as pd
 
 
 # Variável global para a janela
@@ -353,13 +352,8 @@ def abrir_janela_lancamento_completo(root, machine_config: MachineConfig, batch_
             'peso': CONFIG_SIZE['peso']
         }
         
-        if data_manager.df is None:
-            data_manager.df = pd.DataFrame([novo_registro])
-        else:
-            data_manager.df = pd.concat([data_manager.df, pd.DataFrame([novo_registro])], ignore_index=True)
-        
-        # Salvar
-        if data_manager.salvar_dados():
+        # Salvar (anexa apenas o novo registro ao CSV)
+        if data_manager.adicionar_registro(novo_registro):
             messagebox.showinfo("Sucesso", "✅ Lançamento registrado!")
         else:
             messagebox.showwarning("Aviso", "Dados salvos apenas localmente")
@@ -0,0 +1,107 @@
+"""Tabela virtual - Treeview com número fixo de linhas reaproveitadas"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class TabelaVirtual:
+    """Treeview que só cria os itens visíveis e troca os valores ao rolar
+
+    Exibir 200 ou 200 mil registros custa o mesmo: apenas a página visível
+    passa pela função `formatar` (que recebe o recorte do DataFrame e
+    devolve uma lista de tuplas de valores).
+    """
+
+    ALTURA_LINHA_PADRAO = 20
+    LINHAS_RODA_MOUSE = 3
+
+    def __init__(self, master, colunas, formatar, largura_coluna=150):
+        self.formatar = formatar
+        self.dados = None
+        self.inicio = 0
+        self._itens = []
+        self._mensagem = None
+
+        self.scrollbar = ttk.Scrollbar(master, orient='vertical', command=self._rolar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree = ttk.Treeview(master, columns=colunas, show='headings')
+        for col in colunas:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=largura_coluna, anchor='center')
+        self.tree.pack(fill='both', expand=True)
+
+        self.tree.bind('<Configure>', lambda e: self._renderizar())
+        self.tree.bind('<MouseWheel>', self._roda_mouse)  # Windows / macOS
+        self.tree.bind('<Button-4>', lambda e: self.rolar_linhas(-self.LINHAS_RODA_MOUSE))  # Linux
+        self.tree.bind('<Button-5>', lambda e: self.rolar_linhas(self.LINHAS_RODA_MOUSE))
+        self.tree.bind('<Prior>', lambda e: self.rolar_linhas(-self._linhas_visiveis()))
+        self.tree.bind('<Next>', lambda e: self.rolar_linhas(self._linhas_visiveis()))
+
+    @property
+    def total(self):
+        return 0 if self.dados is None else len(self.dados)
+
+    def definir_dados(self, df):
+        """Troca o conteúdo da tabela (volta ao topo)"""
+        self.dados = df
+        self._mensagem = None
+        self.inicio = 0
+        self._renderizar()
+
+    def mostrar_mensagem(self, valores):
+        """Exibe uma única linha informativa no lugar dos dados"""
+        self.dados = None
+        self._mensagem = tuple(valores)
+        self.inicio = 0
+        self._renderizar()
+
+    def rolar_linhas(self, quantidade):
+        self.inicio += quantidade
+        self._renderizar()
+        return 'break'
+
+    def _roda_mouse(self, event):
+        return self.rolar_linhas(-self.LINHAS_RODA_MOUSE if event.delta > 0 else self.LINHAS_RODA_MOUSE)
+
+    def _rolar(self, *args):
+        """Comandos da scrollbar: ('moveto', fração) ou ('scroll', n, 'units'|'pages')"""
+        if args[0] == 'moveto':
+            self.inicio = int(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            passo = int(args[1])
+            self.inicio += passo * self._linhas_visiveis() if args[2] == 'pages' else passo
+        self._renderizar()
+
+    def _linhas_visiveis(self):
+        try:
+            altura_linha = int(ttk.Style().lookup('Treeview', 'rowheight') or self.ALTURA_LINHA_PADRAO)
+        except (tk.TclError, ValueError):
+            altura_linha = self.ALTURA_LINHA_PADRAO
+        # Desconta o cabeçalho (aprox. uma linha)
+        return max(1, self.tree.winfo_height() // altura_linha - 1)
+
+    def _renderizar(self):
+        linhas_visiveis = self._linhas_visiveis()
+
+        if self._mensagem is not None:
+            linhas = [self._mensagem]
+        elif self.total:
+            self.inicio = max(0, min(self.inicio, self.total - linhas_visiveis))
+            linhas = self.formatar(self.dados.iloc[self.inicio:self.inicio + linhas_visiveis])
+        else:
+            self.inicio = 0
+            linhas = []
+
+        # Itens são criados uma vez e reaproveitados; só mudam de quantidade no redimensionamento
+        while len(self._itens) < len(linhas):
+            self._itens.append(self.tree.insert('', 'end'))
+        while len(self._itens) > len(linhas):
+            self.tree.delete(self._itens.pop())
+        for item, valores in zip(self._itens, linhas):
+            self.tree.item(item, values=valores)
+
+        if self.total:
+            self.scrollbar.set(self.inicio / self.total, min(1.0, (self.inicio + linhas_visiveis) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -63,6 +63,7 @@ def limpar_arquivos_temporarios():
         '*.temp',
         'temp_*',
         'status_maq_*.json',
+        'status_fila_*.json',
         'comando_maq_*.json',
         'teste_*',
         'debug_*'
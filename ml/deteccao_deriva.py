@@ -0,0 +1,232 @@
+"""Detecção de deriva em tempo real - EWMA + CUSUM por máquina e métrica
+
+Cada par (máquina, percent_cam_d/percent_cam_w) tem um DetectorDeriva que
+aprende a linha de base (média e desvio) nos primeiros AQUECIMENTO valores e
+depois acompanha, em O(1) por registro:
+
+- carta de controle EWMA: alerta quando a média móvel exponencial sai de
+  base ± L_EWMA desvios (limite da EWMA, que aperta conforme ela estabiliza)
+- CUSUM bilateral: acumula desvios padronizados acima de K_CUSUM e alerta
+  quando a soma passa de H_CUSUM (pega derivas pequenas e persistentes)
+
+Depois de um alerta o detector reaprende a base - o novo nível vira o normal
+e o mesmo desvio não gera uma enxurrada de alertas.
+
+O MonitorDeriva acompanha o CSV/tabela de produção com um leitor próprio
+(data_manager.novo_leitor): a cada INTERVALO_LEITURA - ou logo que o
+DataManager avisa de um registro anexado - lê só o que foi gravado depois da
+última leitura, pelo deslocamento em bytes (ou pelo id no SQLite). Cada linha
+passa uma única vez pelos detectores, seja desta máquina ou de outro coletor
+gravando no mesmo arquivo. Na partida (e depois de uma reescrita do arquivo)
+a base de cada detector vem do fim do histórico, sem alertar sobre o passado.
+Os alertas saem na fila `alertas` (queue.Queue), lida pela interface.
+"""
+
+import math
+import queue
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from .estatisticas import AcumuladorWelford
+
+METRICAS = ('percent_cam_d', 'percent_cam_w')
+
+AQUECIMENTO = 30      # valores para aprender média/desvio da linha de base
+LAMBDA_EWMA = 0.2     # peso do valor novo na EWMA
+L_EWMA = 3.0          # largura do limite da EWMA (em desvios)
+K_CUSUM = 0.5         # folga do CUSUM (em desvios): desvios menores não acumulam
+H_CUSUM = 5.0         # limite do CUSUM (em desvios)
+DESVIO_MINIMO = 0.01  # base constante (desvio 0) ainda tem limite
+
+INTERVALO_LEITURA = 5.0  # segundos entre leituras das linhas novas (outros coletores)
+
+
+class DetectorDeriva:
+    """EWMA + CUSUM bilateral sobre uma série de valores"""
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Volta a aprender a linha de base"""
+        self.base = AcumuladorWelford()
+        self.media = None
+        self.desvio = None
+        self.ewma = None
+        self.passos = 0
+        self.cusum_alta = 0.0
+        self.cusum_baixa = 0.0
+
+    @property
+    def aquecido(self):
+        return self.media is not None
+
+    def atualizar(self, valor):
+        """Aplica um valor; devolve o dict do alerta ou None"""
+        if valor is None or math.isnan(valor):
+            return None
+
+        if not self.aquecido:
+            self.base.adicionar(valor)
+            if self.base.n >= AQUECIMENTO:
+                self.media = self.base.obter_media()
+                self.desvio = max(self.base.obter_desvio(), DESVIO_MINIMO)
+                self.ewma = self.media
+            return None
+
+        self.passos += 1
+        z = (valor - self.media) / self.desvio
+        self.ewma = LAMBDA_EWMA * valor + (1 - LAMBDA_EWMA) * self.ewma
+        self.cusum_alta = max(0.0, self.cusum_alta + z - K_CUSUM)
+        self.cusum_baixa = max(0.0, self.cusum_baixa - z - K_CUSUM)
+
+        fator = LAMBDA_EWMA / (2 - LAMBDA_EWMA) * (1 - (1 - LAMBDA_EWMA) ** (2 * self.passos))
+        limite_ewma = L_EWMA * self.desvio * math.sqrt(fator)
+
+        metodos = []
+        if abs(self.ewma - self.media) > limite_ewma:
+            metodos.append('EWMA')
+        if self.cusum_alta > H_CUSUM or self.cusum_baixa > H_CUSUM:
+            metodos.append('CUSUM')
+        if not metodos:
+            return None
+
+        direcao = 'alta' if self.ewma > self.media or self.cusum_alta > H_CUSUM else 'baixa'
+        alerta = {
+            'metodo': '+'.join(metodos),
+            'direcao': direcao,
+            'valor': round(valor, 2),
+            'media_base': round(self.media, 2),
+            'ewma': round(self.ewma, 2),
+            'cusum': round(max(self.cusum_alta, self.cusum_baixa), 2),
+            'severidade': 'ALTA' if direcao == 'alta' else 'MÉDIA',
+        }
+        self.reiniciar()
+        return alerta
+
+
+class MonitorDeriva:
+    """Detectores de todas as máquinas alimentados pelas linhas novas dos dados de produção
+
+    O ouvinte do DataManager só acorda a thread (roda com a trava do
+    DataManager); a thread lê as linhas novas, aplica aos detectores e
+    publica os alertas.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self.alertas = queue.Queue()
+        self.registros_processados = 0
+        self._detectores = {}
+        self._leitor = None
+        self._reescrito = False
+        self._acordar = threading.Event()
+        self._ativo = False
+
+    @property
+    def maquinas(self):
+        return len({maquina for maquina, _ in list(self._detectores)})
+
+    def iniciar(self):
+        if self._ativo:
+            return
+        self._ativo = True
+        self.data_manager.adicionar_ouvinte(self.ao_evento)
+        threading.Thread(target=self._executar, daemon=True, name="monitor_deriva").start()
+        print("📈 Monitor de deriva (EWMA/CUSUM) iniciado")
+
+    def parar(self):
+        if not self._ativo:
+            return
+        self._ativo = False
+        self.data_manager.remover_ouvinte(self.ao_evento)
+        self._acordar.set()
+
+    def ao_evento(self, evento, registro=None, versao=None):
+        # 'reescrever': o arquivo foi regravado - a posição do leitor não vale mais
+        if evento == 'reescrever':
+            self._reescrito = True
+        self._acordar.set()
+
+    def _executar(self):
+        while self._ativo:
+            try:
+                self._ler()
+            except Exception as e:
+                print(f"⚠️ Erro no monitor de deriva: {e}")
+            self._acordar.wait(timeout=INTERVALO_LEITURA)
+            self._acordar.clear()
+
+    def _ler(self):
+        """Aplica as linhas gravadas desde a última leitura; na partida/reescrita, só aprende a base"""
+        if self._leitor is None or self._reescrito:
+            self._reescrito = False
+            df, self._leitor = self.data_manager.novo_leitor()
+            self._semear(df)
+
+        novos, completo = self._leitor.ler_novos()
+        if completo:
+            self._semear(novos)
+            return
+        colunas = [c for c in ('maquina', 'data_hora') + METRICAS if c in novos.columns]
+        for registro in novos[colunas].to_dict('records'):
+            if not self._ativo:
+                return
+            self._processar(registro)
+
+    def _semear(self, df):
+        """Linha de base de cada detector a partir dos últimos AQUECIMENTO registros da máquina"""
+        self._detectores = {}
+        if df is None or len(df) == 0 or 'maquina' not in df.columns:
+            return
+        colunas = ['maquina'] + [c for c in METRICAS if c in df.columns]
+        recentes = df[colunas].groupby('maquina', sort=False, observed=True).tail(AQUECIMENTO)
+        for registro in recentes.to_dict('records'):
+            for metrica in METRICAS:
+                self._detector(registro['maquina'], metrica).atualizar(_numero(registro.get(metrica)))
+
+    def _processar(self, registro):
+        maquina = registro.get('maquina')
+        for metrica in METRICAS:
+            alerta = self._detector(maquina, metrica).atualizar(_numero(registro.get(metrica)))
+            if alerta:
+                alerta.update({
+                    'tipo': 'deriva',
+                    'maquina': maquina,
+                    'metrica': metrica,
+                    'data_hora': _data_hora(registro.get('data_hora')),
+                })
+                self.alertas.put(alerta)
+        self.registros_processados += 1
+
+    def _detector(self, maquina, metrica):
+        chave = (maquina, metrica)
+        if chave not in self._detectores:
+            self._detectores[chave] = DetectorDeriva()
+        return self._detectores[chave]
+
+
+def descrever_alerta(alerta):
+    """Linha de texto do alerta para o painel"""
+    seta = "⬆️" if alerta['direcao'] == 'alta' else "⬇️"
+    return (f"{'🔴' if alerta['severidade'] == 'ALTA' else '🟡'} [{alerta['data_hora']}] Máquina {alerta['maquina']} "
+            f"{seta} {alerta['metrica']} = {alerta['valor']} (base {alerta['media_base']}, "
+            f"EWMA {alerta['ewma']}, CUSUM {alerta['cusum']}) via {alerta['metodo']}")
+
+
+def _data_hora(valor):
+    """Data/hora do registro como texto (agora, se ele não tiver)"""
+    if valor is None or valor == '' or (not isinstance(valor, str) and pd.isna(valor)):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if hasattr(valor, 'strftime'):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    return str(valor)
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float('nan')
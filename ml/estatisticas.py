@@ -0,0 +1,344 @@
+"""Estatísticas incrementais por máquina para o sistema de IA
+
+Em vez de varrer todo o histórico a cada consulta, cada máquina mantém
+agregados atualizados registro a registro:
+
+- média/variância de CAM-D e CAM-W (Welford)
+- contagem de defeitos e locais (desempate pela primeira ocorrência, como
+  data.frequencia)
+- somas por período do dia (madrugada, manhã, tarde, noite)
+- médias das duas metades do histórico de CAM-D (tendência) - a segunda
+  metade, ainda não somada à primeira, fica guardada em no máximo
+  LIMITE_BLOCOS_TENDENCIA blocos de somas (exata enquanto cabe um valor por
+  bloco; depois o meio é rateado dentro do bloco que o contém)
+- buffer circular com os defeitos dos últimos JANELA_RECENTE registros
+
+A frota parte do df já lido pelo DataManager e, a cada consulta, soma só as
+linhas que chegaram depois ao CSV/tabela (leitor próprio, pelo deslocamento
+em bytes ou pelo id), inclusive as gravadas por outros coletores. Edições e
+reescritas completas ('reescrever') fazem a próxima consulta recomeçar.
+"""
+
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from data.frequencia import COLUNAS_DEFEITO, COLUNAS_LOCAL, REGRA_IA, rotular
+from data.schema import converter_data_hora
+
+JANELA_RECENTE = 100
+LIMITE_BLOCOS_TENDENCIA = 4096  # acima disso blocos vizinhos da segunda metade são somados
+
+# (nome, hora inicial, hora final) - mesma divisão da análise de horários críticos
+PERIODOS_DIA = (
+    ('Madrugada (00-06h)', 0, 6),
+    ('Manhã (06-12h)', 6, 12),
+    ('Tarde (12-18h)', 12, 18),
+    ('Noite (18-24h)', 18, 24),
+)
+
+
+class AcumuladorWelford:
+    """Média e variância em uma passada, ignorando valores nulos"""
+
+    __slots__ = ('n', 'media', 'm2', 'soma')
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.soma = 0.0
+
+    def adicionar(self, valor):
+        if math.isnan(valor):
+            return
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+        self.soma += valor
+
+    def mesclar(self, outro):
+        """Junta os valores de outro acumulador (combinação de Chan)"""
+        if outro.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.media, self.m2, self.soma = outro.n, outro.media, outro.m2, outro.soma
+            return
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        self.media += delta * outro.n / n
+        self.m2 += outro.m2 + delta * delta * self.n * outro.n / n
+        self.n = n
+        self.soma += outro.soma
+
+    @classmethod
+    def de_valores(cls, valores):
+        """Acumulador já com os valores de um array (nulos ignorados)"""
+        acumulador = cls()
+        validos = valores[~np.isnan(valores)]
+        if len(validos):
+            acumulador.n = len(validos)
+            acumulador.soma = float(validos.sum())
+            acumulador.media = acumulador.soma / acumulador.n
+            acumulador.m2 = float(((validos - acumulador.media) ** 2).sum())
+        return acumulador
+
+    def obter_media(self):
+        """Média (NaN sem valores)"""
+        return self.media if self.n else float('nan')
+
+    def obter_desvio(self):
+        """Desvio padrão amostral (NaN com menos de dois valores, como no pandas)"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float('nan')
+
+
+class ContadorOcorrencias:
+    """Ocorrências por rótulo, lembrando a primeira (coluna, linha) de cada um
+
+    Ordenar por (-ocorrências, primeira) reproduz a ordem de
+    data.frequencia.contar_ocorrencias sobre os mesmos registros.
+    """
+
+    def __init__(self):
+        self.contagem = {}
+        self.primeira = {}
+
+    def adicionar(self, rotulo, coluna, linha, quantidade=1):
+        if rotulo in self.contagem:
+            self.contagem[rotulo] += quantidade
+            self.primeira[rotulo] = min(self.primeira[rotulo], (coluna, linha))
+        else:
+            self.contagem[rotulo] = quantidade
+            self.primeira[rotulo] = (coluna, linha)
+
+    def serie(self):
+        """Series rótulo -> ocorrências, da maior para a menor"""
+        ordem = sorted(self.contagem, key=lambda r: (-self.contagem[r], self.primeira[r]))
+        return pd.Series([self.contagem[r] for r in ordem], index=pd.Index(ordem, dtype=object), dtype='int64')
+
+
+class EstatisticasMaquina:
+    """Agregados de uma máquina, na ordem em que os registros chegaram"""
+
+    def __init__(self):
+        self.registros = 0
+        self.cam_d = AcumuladorWelford()
+        self.cam_w = AcumuladorWelford()
+        self.tem_data_hora = False
+        self.periodos = [[0, 0.0, 0] for _ in PERIODOS_DIA]  # registros, soma CAM-D, CAM-D válidos
+        self.defeitos = ContadorOcorrencias()
+        self.locais = ContadorOcorrencias()
+        self.recentes = deque(maxlen=JANELA_RECENTE)
+
+        # Tendência: somas da primeira metade (registros // 2) + blocos [registros, soma,
+        # válidos] de CAM-D dos seguintes, que vão sendo somados a ela conforme a metade avança
+        self._pendentes_cam_d = deque()
+        self._meio = 0
+        self._soma_primeira = 0.0
+        self._validos_primeira = 0
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """Agregados dos registros de uma máquina (vetorizado)"""
+        est = cls()
+        est.adicionar_lote(df)
+        return est
+
+    def adicionar_lote(self, df):
+        """Aplica registros que chegaram depois dos já somados (vetorizado, na ordem do df)"""
+        deslocamento = self.registros
+        self.registros += len(df)
+        cam_d = _coluna_numerica(df, 'percent_cam_d')
+        self.cam_d.mesclar(AcumuladorWelford.de_valores(cam_d))
+        self.cam_w.mesclar(AcumuladorWelford.de_valores(_coluna_numerica(df, 'percent_cam_w')))
+        self._guardar_pendentes(cam_d)
+        self._avancar_metade()
+
+        if 'data_hora' in df.columns:
+            self.tem_data_hora = True
+            hora = _coluna_data_hora(df).dt.hour.to_numpy(dtype='float64')
+            com_hora = ~np.isnan(hora)
+            periodo = (hora[com_hora] // 6).astype(int)
+            valores = cam_d[com_hora]
+            validos = ~np.isnan(valores)
+            registros = np.bincount(periodo, minlength=len(PERIODOS_DIA))
+            somas = np.bincount(periodo[validos], weights=valores[validos], minlength=len(PERIODOS_DIA))
+            contagens = np.bincount(periodo[validos], minlength=len(PERIODOS_DIA))
+            for acumulado, r, soma, c in zip(self.periodos, registros, somas, contagens):
+                acumulado[0] += int(r)
+                acumulado[1] += float(soma)
+                acumulado[2] += int(c)
+
+        _contar_colunas(self.defeitos, df, COLUNAS_DEFEITO, deslocamento)
+        _contar_colunas(self.locais, df, COLUNAS_LOCAL, deslocamento)
+
+        colunas = [c for c in COLUNAS_DEFEITO if c in df.columns]
+        for registro in df[colunas].tail(JANELA_RECENTE).to_dict('records'):
+            self.recentes.append({col: registro.get(col) for col in COLUNAS_DEFEITO})
+
+    def medias_metades(self):
+        """(média de CAM-D na primeira metade dos registros, média na segunda)"""
+        validos_segunda = self.cam_d.n - self._validos_primeira
+        primeira = self._soma_primeira / self._validos_primeira if self._validos_primeira > 1e-9 else float('nan')
+        segunda = (self.cam_d.soma - self._soma_primeira) / validos_segunda if validos_segunda > 1e-9 else float('nan')
+        return primeira, segunda
+
+    def medias_periodos(self):
+        """[(período, média de CAM-D ou NaN, registros)] dos períodos com registros"""
+        return [
+            (nome, soma / validos if validos else float('nan'), registros)
+            for (nome, _, _), (registros, soma, validos) in zip(PERIODOS_DIA, self.periodos)
+            if registros
+        ]
+
+    def df_recente(self):
+        """Defeitos dos últimos JANELA_RECENTE registros, como DataFrame"""
+        return pd.DataFrame(list(self.recentes), columns=COLUNAS_DEFEITO)
+
+    def _guardar_pendentes(self, valores):
+        """Guarda os valores novos em blocos; passou do limite, junta blocos vizinhos
+
+        O tamanho de bloco acompanha a segunda metade (registros - meio), de modo
+        que ela sempre caiba em LIMITE_BLOCOS_TENDENCIA blocos do mesmo porte.
+        """
+        if len(valores) == 0:
+            return
+        tamanho = max(1, -(-2 * (self.registros - self._meio) // (LIMITE_BLOCOS_TENDENCIA - 2)))
+        validos = ~np.isnan(valores)
+        inicios = np.arange(0, len(valores), tamanho)
+        registros = np.diff(np.append(inicios, len(valores)))
+        somas = np.add.reduceat(np.where(validos, valores, 0.0), inicios)
+        contagens = np.add.reduceat(validos.astype('float64'), inicios)
+        self._pendentes_cam_d.extend([int(r), float(s), float(c)] for r, s, c in zip(registros, somas, contagens))
+
+        if len(self._pendentes_cam_d) > LIMITE_BLOCOS_TENDENCIA:
+            blocos = deque()
+            for bloco in self._pendentes_cam_d:
+                if blocos and blocos[-1][0] + bloco[0] <= tamanho:
+                    blocos[-1] = [a + b for a, b in zip(blocos[-1], bloco)]
+                else:
+                    blocos.append(bloco)
+            self._pendentes_cam_d = blocos
+
+    def _avancar_metade(self):
+        while self._meio < self.registros // 2:
+            bloco = self._pendentes_cam_d[0]
+            faltam = self.registros // 2 - self._meio
+            if bloco[0] <= faltam:
+                self._pendentes_cam_d.popleft()
+                self._soma_primeira += bloco[1]
+                self._validos_primeira += bloco[2]
+                self._meio += bloco[0]
+                continue
+            # O meio cai dentro do bloco: a parte da primeira metade entra pela proporção
+            fracao = faltam / bloco[0]
+            self._soma_primeira += bloco[1] * fracao
+            self._validos_primeira += bloco[2] * fracao
+            bloco[0] -= faltam
+            bloco[1] *= 1 - fracao
+            bloco[2] *= 1 - fracao
+            self._meio += faltam
+
+
+class EstatisticasFrota:
+    """EstatisticasMaquina de todas as máquinas, acompanhando os dados de produção
+
+    Com data_manager.novo_leitor(), os agregados partem do df já lido e cada
+    consulta soma só as linhas novas do arquivo/tabela; sem ele, são refeitos
+    do df a cada consulta.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.Lock()
+        self._maquinas = {}
+        self._leitor = None
+        self._reescrito = False
+
+        self._acompanhando = hasattr(data_manager, 'novo_leitor')
+        if self._acompanhando and hasattr(data_manager, 'adicionar_ouvinte'):
+            data_manager.adicionar_ouvinte(self.ao_evento)
+
+    def ao_evento(self, evento, registro=None, versao=None):
+        # Roda com a trava do DataManager: só marca - anexos e recargas chegam pelo leitor
+        if evento == 'reescrever':
+            self._reescrito = True
+
+    def maquina(self, maquina):
+        """EstatisticasMaquina da máquina (None se ela não tem registros)"""
+        with self._lock:
+            self._atualizar()
+            return self._maquinas.get(maquina)
+
+    def maquinas(self):
+        """{maquina: EstatisticasMaquina} na ordem em que as máquinas apareceram"""
+        with self._lock:
+            self._atualizar()
+            return dict(self._maquinas)
+
+    def _atualizar(self):
+        if not self._acompanhando:
+            self._maquinas = {}
+            self._somar(self.data_manager.df)
+            return
+
+        if self._leitor is None or self._reescrito:
+            self._reescrito = False
+            df, self._leitor = self.data_manager.novo_leitor()
+            self._maquinas = {}
+            self._somar(df)
+
+        novos, completo = self._leitor.ler_novos()
+        if completo:
+            self._maquinas = {}
+        self._somar(novos)
+
+    def _somar(self, df):
+        """Soma os registros aos agregados (um groupby, vetorizado por máquina)"""
+        if df is None or len(df) == 0 or 'maquina' not in df.columns:
+            return
+        for maquina, df_maquina in df.groupby('maquina', sort=False, observed=True):
+            if maquina in self._maquinas:
+                self._maquinas[maquina].adicionar_lote(df_maquina)
+            else:
+                self._maquinas[maquina] = EstatisticasMaquina.de_dataframe(df_maquina)
+
+
+def _coluna_numerica(df, coluna):
+    if coluna not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype='float64')
+
+
+def _coluna_data_hora(df):
+    if pd.api.types.is_datetime64_any_dtype(df['data_hora']):
+        return df['data_hora']
+    return converter_data_hora(df['data_hora'])
+
+
+def _contar_colunas(contador, df, colunas, deslocamento=0):
+    """Soma ao contador as ocorrências das colunas, com a primeira linha de cada valor
+
+    Args:
+        deslocamento: Registros já somados antes do df (numeração das linhas)
+    """
+    for coluna, col in enumerate(colunas):
+        if col not in df.columns:
+            continue
+        codigos, distintos = pd.factorize(df[col])
+        linhas = np.flatnonzero(codigos >= 0)
+        if len(linhas) == 0:
+            continue
+        contagens = np.bincount(codigos[linhas], minlength=len(distintos))
+        primeiras = np.full(len(distintos), -1)
+        presentes, indices = np.unique(codigos[linhas], return_index=True)
+        primeiras[presentes] = linhas[indices]
+
+        for i, valor in enumerate(distintos):
+            rotulo = rotular(valor, REGRA_IA)
+            if rotulo is not None and contagens[i]:
+                contador.adicionar(rotulo, coluna, deslocamento + int(primeiras[i]), int(contagens[i]))
@@ -7,80 +7,78 @@ from collections import Counter
 import json
 import os
 
+from data.frequencia import COLUNAS_DEFEITO, REGRA_IA, contar_ocorrencias
+from .estatisticas import EstatisticasFrota
+
+# Colunas lidas para a detecção de anomalias (+ maquina/data_hora)
+COLUNAS_ANOMALIAS = ['percent_cam_d', 'percent_cam_w'] + COLUNAS_DEFEITO
+
 
 class PredicaoInteligente:
     """Sistema de IA para predição de defeitos e análise preditiva"""
     
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        # Agregados por máquina mantidos a cada registro anexado (consultas sem varrer o histórico)
+        self.estatisticas = EstatisticasFrota(data_manager)
         self.modelo_treinado = False
         self.historico_predicoes = []
         
     def analisar_padroes_maquina(self, maquina):
         """Analisa padrões históricos de uma máquina específica"""
-        if self.data_manager.df is None or len(self.data_manager.df) == 0:
+        return self._analisar_padroes(maquina, self.estatisticas.maquina(maquina))
+    
+    def _analisar_padroes(self, maquina, est):
+        """analisar_padroes_maquina a partir dos agregados da máquina"""
+        if est is None or est.registros == 0:
             return None
         
-        # Filtrar dados da máquina
-        df_maquina = self.data_manager.df[self.data_manager.df['maquina'] == maquina].copy()
-        
-        if len(df_maquina) == 0:
-            return None
+        media_rejeicao = self._calcular_media_rejeicao(est)
         
         # Análise de padrões
         analise = {
             'maquina': maquina,
-            'total_registros': len(df_maquina),
-            'defeitos_mais_comuns': self._analisar_defeitos_comuns(df_maquina),
-            'locais_mais_problematicos': self._analisar_locais_problematicos(df_maquina),
-            'media_rejeicao': self._calcular_media_rejeicao(df_maquina),
-            'tendencia': self._analisar_tendencia(df_maquina),
-            'horarios_criticos': self._analisar_horarios_criticos(df_maquina),
-            'score_qualidade': self._calcular_score_qualidade(df_maquina)
+            'total_registros': est.registros,
+            'defeitos_mais_comuns': self._analisar_defeitos_comuns(est.defeitos.serie()),
+            'locais_mais_problematicos': self._analisar_locais_problematicos(est.locais.serie()),
+            'media_rejeicao': media_rejeicao,
+            'tendencia': self._analisar_tendencia(est),
+            'horarios_criticos': self._analisar_horarios_criticos(est),
+            'score_qualidade': self._calcular_score_qualidade(est, media_rejeicao)
         }
         
         return analise
     
     def prever_proximo_defeito(self, maquina):
         """Prevê qual será o próximo defeito mais provável"""
-        if self.data_manager.df is None or len(self.data_manager.df) == 0:
+        return self._prever_defeito(maquina, self.estatisticas.maquina(maquina))
+    
+    def _prever_defeito(self, maquina, est):
+        """prever_proximo_defeito a partir dos agregados da máquina"""
+        if est is None and not self.estatisticas.maquinas():
             return None
-        
-        # Filtrar últimos 100 registros da máquina
-        df_maquina = self.data_manager.df[self.data_manager.df['maquina'] == maquina].copy()
-        
-        if len(df_maquina) < 10:
+        if est is None or est.registros < 10:
             return {"erro": "Dados insuficientes para predição (mínimo 10 registros)"}
         
-        # Pegar últimos registros
-        df_recente = df_maquina.tail(100)
-        
-        # Coletar todos os defeitos
-        defeitos = []
-        for col in ['rej1_defect', 'rej2_defect', 'rej3_defect']:
-            if col in df_recente.columns:
-                defeitos.extend(df_recente[col].dropna().tolist())
+        # Últimos registros (buffer circular da máquina)
+        df_recente = est.df_recente()
         
-        # Remover valores vazios e N/A
-        defeitos = [d for d in defeitos if d and str(d).strip() and str(d).upper() != 'N/A']
+        # Frequência dos defeitos (sem vazios e N/A)
+        contagem = contar_ocorrencias(df_recente, COLUNAS_DEFEITO, REGRA_IA)
         
-        if not defeitos:
+        if contagem.empty:
             return {"erro": "Nenhum defeito registrado"}
         
-        # Análise de frequência
-        contador = Counter(defeitos)
-        defeitos_ordenados = contador.most_common(5)
-        
         # Calcular probabilidades
-        total = sum(contador.values())
+        total = int(contagem.sum())
         predicoes = []
         
-        for defeito, freq in defeitos_ordenados:
-            probabilidade = (freq / total) * 100
+        for defeito, freq in contagem.head(5).items():
+            probabilidade = (int(freq) / total) * 100
             predicoes.append({
                 'defeito': defeito,
                 'probabilidade': round(probabilidade, 2),
-                'ocorrencias': freq,
+                'ocorrencias': int(freq),
                 'nivel_risco': self._classificar_risco(probabilidade)
             })
         
@@ -98,45 +96,22 @@ class PredicaoInteligente:
     
     def detectar_anomalias(self, maquina=None):
         """Detecta anomalias nos dados de produção usando análise estatística"""
-        if self.data_manager.df is None or len(self.data_manager.df) == 0:
+        df = self._carregar_registros([maquina] if maquina else None)
+        if df is None or len(df) == 0:
             return []
         
-        df = self.data_manager.df.copy()
-        
-        if maquina:
-            df = df[df['maquina'] == maquina]
-        
+        return self._detectar_anomalias(df, maquina)
+    
+    def _detectar_anomalias(self, df, maquina=None):
+        """detectar_anomalias sobre um frame já recortado (não é alterado)"""
         if len(df) < 30:
             return []
         
-        anomalias = []
-        
         # 1. Detectar picos de rejeição
-        for col in ['percent_cam_d', 'percent_cam_w']:
-            if col in df.columns:
-                valores = pd.to_numeric(df[col], errors='coerce').dropna()
-                if len(valores) > 0:
-                    media = valores.mean()
-                    desvio = valores.std()
-                    limite_superior = media + (2 * desvio)
-                    
-                    # Encontrar valores anômalos
-                    anomalos = df[pd.to_numeric(df[col], errors='coerce') > limite_superior]
-                    
-                    for _, row in anomalos.iterrows():
-                        anomalias.append({
-                            'tipo': 'pico_rejeicao',
-                            'maquina': row.get('maquina', 'N/D'),
-                            'metrica': col,
-                            'valor': float(row[col]),
-                            'limite_esperado': round(limite_superior, 2),
-                            'data_hora': row.get('data_hora', 'N/D'),
-                            'severidade': 'ALTA' if float(row[col]) > limite_superior * 1.5 else 'MÉDIA'
-                        })
+        anomalias = self._picos_rejeicao(df)
         
         # 2. Detectar mudanças bruscas de padrão
         if 'data_hora' in df.columns:
-            df['data_hora'] = pd.to_datetime(df['data_hora'], errors='coerce')
             df = df.sort_values('data_hora')
             
             # Analisar últimos 7 dias vs 7 dias anteriores
@@ -148,8 +123,8 @@ class PredicaoInteligente:
             if len(ultimos_7_dias) > 0 and len(dias_anteriores) > 0:
                 for col in ['percent_cam_d', 'percent_cam_w']:
                     if col in df.columns:
-                        media_recente = pd.to_numeric(ultimos_7_dias[col], errors='coerce').mean()
-                        media_anterior = pd.to_numeric(dias_anteriores[col], errors='coerce').mean()
+                        media_recente = float(ultimos_7_dias[col].mean())
+                        media_anterior = float(dias_anteriores[col].mean())
                         
                         if not pd.isna(media_recente) and not pd.isna(media_anterior):
                             variacao = ((media_recente - media_anterior) / media_anterior) * 100
@@ -184,15 +159,57 @@ class PredicaoInteligente:
         
         return anomalias
     
+    def _picos_rejeicao(self, df):
+        """Registros acima de média + 2 desvios em CAM-D/CAM-W (limites de cada máquina no frame)
+        
+        Média e desvio por máquina com groupby().transform - o resultado não depende
+        de o frame vir recortado por máquina. Seleção por máscara e registros
+        montados de uma vez com to_dict('records').
+        """
+        anomalias = []
+        for col in ['percent_cam_d', 'percent_cam_w']:
+            if col not in df.columns:
+                continue
+            valores = df[col].astype('float64')
+            if valores.count() == 0:
+                continue
+            
+            if 'maquina' in df.columns:
+                grupos = valores.groupby(df['maquina'], observed=True)
+                limite_superior = grupos.transform('mean') + 2 * grupos.transform('std')
+            else:
+                limite_superior = pd.Series(valores.mean() + 2 * valores.std(), index=df.index)
+            
+            # Encontrar valores anômalos
+            mascara = valores > limite_superior
+            if not mascara.any():
+                continue
+            
+            anomalos = df[mascara]
+            valor = valores[mascara]
+            limite = limite_superior[mascara]
+            anomalias.extend(pd.DataFrame({
+                'tipo': 'pico_rejeicao',
+                'maquina': anomalos['maquina'] if 'maquina' in df.columns else 'N/D',
+                'metrica': col,
+                'valor': valor.round(2),
+                'limite_esperado': limite.round(2),
+                'data_hora': _texto_data_hora(anomalos['data_hora']) if 'data_hora' in df.columns else 'N/D',
+                'severidade': np.where(valor > limite * 1.5, 'ALTA', 'MÉDIA')
+            }, index=anomalos.index).to_dict('records'))
+        
+        return anomalias
+    
     def recomendar_acoes(self, maquina):
         """Recomenda ações baseadas em análise de dados"""
         analise = self.analisar_padroes_maquina(maquina)
-        predicao = self.prever_proximo_defeito(maquina)
-        anomalias = self.detectar_anomalias(maquina)
-        
         if not analise:
             return []
         
+        return self._recomendar(maquina, analise, self.detectar_anomalias(maquina))
+    
+    def _recomendar(self, maquina, analise, anomalias):
+        """recomendar_acoes a partir da análise e das anomalias já calculadas"""
         recomendacoes = []
         
         # Recomendações baseadas em score de qualidade
@@ -250,14 +267,22 @@ class PredicaoInteligente:
         return recomendacoes
     
     def gerar_relatorio_ia(self, maquina=None):
-        """Gera relatório completo com insights de IA"""
+        """Gera relatório completo com insights de IA
+        
+        Análise e predição vêm dos agregados incrementais de cada máquina; só
+        as anomalias precisam dos registros, separados por máquina uma única
+        vez (groupby). As recomendações reaproveitam esses resultados.
+        """
+        estatisticas = self.estatisticas.maquinas()
         if maquina:
             maquinas = [maquina]
         else:
             # Todas as máquinas
-            if self.data_manager.df is None or len(self.data_manager.df) == 0:
+            if not estatisticas:
                 return None
-            maquinas = self.data_manager.df['maquina'].unique().tolist()
+            maquinas = list(estatisticas)
+        
+        por_maquina = self._separar_por_maquina(maquinas)
         
         relatorio = {
             'data_geracao': datetime.now().isoformat(),
@@ -267,19 +292,19 @@ class PredicaoInteligente:
         }
         
         for maq in maquinas:
-            analise = self.analisar_padroes_maquina(maq)
-            predicao = self.prever_proximo_defeito(maq)
-            anomalias = self.detectar_anomalias(maq)
-            recomendacoes = self.recomendar_acoes(maq)
+            analise = self._analisar_padroes(maq, estatisticas.get(maq))
+            if not analise:
+                continue
             
-            if analise:
-                relatorio['analises'].append({
-                    'maquina': maq,
-                    'analise': analise,
-                    'predicao': predicao,
-                    'anomalias': anomalias,
-                    'recomendacoes': recomendacoes
-                })
+            df_maquina = por_maquina.get(maq)
+            anomalias = self._detectar_anomalias(df_maquina, maq) if df_maquina is not None else []
+            relatorio['analises'].append({
+                'maquina': maq,
+                'analise': analise,
+                'predicao': self._prever_defeito(maq, estatisticas[maq]),
+                'anomalias': anomalias,
+                'recomendacoes': self._recomendar(maq, analise, anomalias)
+            })
         
         # Resumo geral
         if relatorio['analises']:
@@ -296,58 +321,64 @@ class PredicaoInteligente:
     
     # Métodos auxiliares privados
     
-    def _analisar_defeitos_comuns(self, df):
+    def _carregar_registros(self, maquinas=None):
+        """Colunas usadas na detecção de anomalias, só das máquinas pedidas
+        
+        Lidas por data_manager.carregar_colunas (espelho Parquet ou SQLite quando
+        disponíveis, senão recorte do df em memória).
+        """
+        if hasattr(self.data_manager, 'carregar_colunas'):
+            return self.data_manager.carregar_colunas(COLUNAS_ANOMALIAS, maquinas=maquinas)
+        df = self.data_manager.df
+        if df is None or maquinas is None:
+            return df
+        return df[df['maquina'].isin(maquinas)]
+    
+    def _separar_por_maquina(self, maquinas):
+        """{maquina: registros} numa única leitura e uma única passada pelo frame"""
+        df = self._carregar_registros(maquinas if len(maquinas) == 1 else None)
+        if df is None or len(df) == 0:
+            return {}
+        if len(maquinas) == 1:
+            return {maquinas[0]: df}
+        return dict(tuple(df.groupby('maquina', sort=False, observed=True)))
+    
+    def _analisar_defeitos_comuns(self, contagem):
         """Analisa defeitos mais comuns"""
-        defeitos = []
-        for col in ['rej1_defect', 'rej2_defect', 'rej3_defect']:
-            if col in df.columns:
-                defeitos.extend(df[col].dropna().tolist())
-        
-        defeitos = [d for d in defeitos if d and str(d).strip() and str(d).upper() != 'N/A']
-        
-        if not defeitos:
+        if contagem.empty:
             return []
         
-        contador = Counter(defeitos)
-        total = len(defeitos)
+        total = int(contagem.sum())
         
         return [
             {
                 'defeito': defeito,
-                'ocorrencias': freq,
-                'percentual': round((freq / total) * 100, 2)
+                'ocorrencias': int(freq),
+                'percentual': round((int(freq) / total) * 100, 2)
             }
-            for defeito, freq in contador.most_common(5)
+            for defeito, freq in contagem.head(5).items()
         ]
     
-    def _analisar_locais_problematicos(self, df):
+    def _analisar_locais_problematicos(self, contagem):
         """Analisa locais mais problemáticos"""
-        locais = []
-        for col in ['rej1_local', 'rej2_local', 'rej3_local']:
-            if col in df.columns:
-                locais.extend(df[col].dropna().tolist())
-        
-        locais = [l for l in locais if l and str(l).strip() and str(l).upper() != 'N/A']
-        
-        if not locais:
+        if contagem.empty:
             return []
         
-        contador = Counter(locais)
-        total = len(locais)
+        total = int(contagem.sum())
         
         return [
             {
                 'local': local,
-                'ocorrencias': freq,
-                'percentual': round((freq / total) * 100, 2)
+                'ocorrencias': int(freq),
+                'percentual': round((int(freq) / total) * 100, 2)
             }
-            for local, freq in contador.most_common(3)
+            for local, freq in contagem.head(3).items()
         ]
     
-    def _calcular_media_rejeicao(self, df):
+    def _calcular_media_rejeicao(self, est):
         """Calcula média de rejeição"""
-        cam_d = pd.to_numeric(df['percent_cam_d'], errors='coerce').mean()
-        cam_w = pd.to_numeric(df['percent_cam_w'], errors='coerce').mean()
+        cam_d = est.cam_d.obter_media()
+        cam_w = est.cam_w.obter_media()
         
         return {
             'cam_d': round(cam_d, 2) if not pd.isna(cam_d) else 0,
@@ -355,18 +386,13 @@ class PredicaoInteligente:
             'media_geral': round((cam_d + cam_w) / 2, 2) if not pd.isna(cam_d) and not pd.isna(cam_w) else 0
         }
     
-    def _analisar_tendencia(self, df):
+    def _analisar_tendencia(self, est):
         """Analisa tendência de melhora ou piora"""
-        if len(df) < 20:
+        if est.registros < 20:
             return {'direcao': 'dados_insuficientes'}
         
         # Comparar primeira metade com segunda metade
-        meio = len(df) // 2
-        primeira_metade = df.iloc[:meio]
-        segunda_metade = df.iloc[meio:]
-        
-        media_primeira = pd.to_numeric(primeira_metade['percent_cam_d'], errors='coerce').mean()
-        media_segunda = pd.to_numeric(segunda_metade['percent_cam_d'], errors='coerce').mean()
+        media_primeira, media_segunda = est.medias_metades()
         
         if pd.isna(media_primeira) or pd.isna(media_segunda):
             return {'direcao': 'indeterminado'}
@@ -385,45 +411,31 @@ class PredicaoInteligente:
             'variacao': round(variacao, 2)
         }
     
-    def _analisar_horarios_criticos(self, df):
+    def _analisar_horarios_criticos(self, est):
         """Analisa horários com mais problemas"""
-        if 'data_hora' not in df.columns:
+        if not est.tem_data_hora:
             return []
         
-        df['data_hora'] = pd.to_datetime(df['data_hora'], errors='coerce')
-        df['hora'] = df['data_hora'].dt.hour
-        
-        # Agrupar por período do dia
-        periodos = {
-            'Madrugada (00-06h)': (0, 6),
-            'Manhã (06-12h)': (6, 12),
-            'Tarde (12-18h)': (12, 18),
-            'Noite (18-24h)': (18, 24)
-        }
-        
+        # Períodos do dia (madrugada, manhã, tarde, noite)
         resultados = []
-        for periodo, (inicio, fim) in periodos.items():
-            df_periodo = df[(df['hora'] >= inicio) & (df['hora'] < fim)]
-            if len(df_periodo) > 0:
-                media_rej = pd.to_numeric(df_periodo['percent_cam_d'], errors='coerce').mean()
-                if not pd.isna(media_rej):
-                    resultados.append({
-                        'periodo': periodo,
-                        'media_rejeicao': round(media_rej, 2),
-                        'registros': len(df_periodo)
-                    })
+        for periodo, media_rej, registros in est.medias_periodos():
+            if not pd.isna(media_rej):
+                resultados.append({
+                    'periodo': periodo,
+                    'media_rejeicao': round(media_rej, 2),
+                    'registros': registros
+                })
         
         # Ordenar por média de rejeição
         resultados.sort(key=lambda x: x['media_rejeicao'], reverse=True)
         return resultados
     
-    def _calcular_score_qualidade(self, df):
+    def _calcular_score_qualidade(self, est, media_rej):
         """Calcula score de qualidade (0-100)"""
-        if len(df) == 0:
+        if est.registros == 0:
             return 0
         
         # Fatores que influenciam o score
-        media_rej = self._calcular_media_rejeicao(df)
         media_geral = media_rej['media_geral']
         
         # Score baseado em rejeição (quanto menor, melhor)
@@ -516,12 +528,20 @@ class PredicaoInteligente:
             return f"PREVENTIVO: {recomendacao_base} (Probabilidade: {probabilidade}%)"
 
 
+def _texto_data_hora(serie):
+    """data_hora como texto (como no CSV) - o relatório vai para json.dumps"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime("%Y-%m-%d %H:%M:%S").fillna('N/D')
+    return serie.astype(object).where(serie.notna(), 'N/D').astype(str)
+
+
 # Instância global
 predicao_ia = None
 
 def inicializar_ia(data_manager):
-    """Inicializa sistema de IA"""
+    """Sistema de IA compartilhado do data_manager (os agregados são mantidos uma vez só)"""
     global predicao_ia
-    predicao_ia = PredicaoInteligente(data_manager)
+    if predicao_ia is None or predicao_ia.data_manager is not data_manager:
+        predicao_ia = PredicaoInteligente(data_manager)
     return predicao_ia
 
@@ -11,14 +11,29 @@ class MachineConfig:
     def __init__(self):
         self.config_path = os.path.join(CAMINHO_LOCAL, "config_maquina.json")
         self.size_path = os.path.join(CAMINHO_LOCAL, "config_size.json")
+        self._cache = {}  # caminho -> ((mtime_ns, tamanho), conteúdo)
+    
+    def _ler_json(self, caminho):
+        """Conteúdo do JSON, relido do disco só quando o arquivo muda (mtime/tamanho)
+        
+        FileNotFoundError propaga para o chamador decidir o padrão.
+        """
+        info = os.stat(caminho)
+        assinatura = (info.st_mtime_ns, info.st_size)
+        em_cache = self._cache.get(caminho)
+        if em_cache is not None and em_cache[0] == assinatura:
+            return em_cache[1]
+        
+        with open(caminho, 'r') as f:
+            config = json.load(f)
+        self._cache[caminho] = (assinatura, config)
+        return config
     
     def obter_configuracao_maquina(self):
         """Obtém configuração da máquina"""
         try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
-                return config.get('maquina', None)
+            return self._ler_json(self.config_path).get('maquina', None)
+        except FileNotFoundError:
             return None
         except Exception as e:
             print(f"❌ Erro configuração: {e}")
@@ -30,6 +45,7 @@ class MachineConfig:
             config = {'maquina': maquina}
             with open(self.config_path, 'w') as f:
                 json.dump(config, f)
+            self._cache.pop(self.config_path, None)
             return True
         except Exception as e:
             print(f"❌ Erro salvar configuração: {e}")
@@ -38,11 +54,11 @@ class MachineConfig:
     def obter_configuracao_size(self, maquina_atual=None):
         """Obtém configuração do size da máquina"""
         try:
-            if os.path.exists(self.size_path):
-                with open(self.size_path, 'r') as f:
-                    config = json.load(f)
-                return config
-            elif maquina_atual and maquina_atual in TABELA_SIZES:
+            try:
+                return dict(self._ler_json(self.size_path))  # Cópia: o chamador pode alterar
+            except FileNotFoundError:
+                pass
+            if maquina_atual and maquina_atual in TABELA_SIZES:
                 return {
                     'maquina': maquina_atual,
                     'size': TABELA_SIZES[maquina_atual]['size'],
@@ -58,6 +74,7 @@ class MachineConfig:
         try:
             with open(self.size_path, 'w') as f:
                 json.dump(config, f)
+            self._cache.pop(self.size_path, None)
             return True
         except Exception as e:
             print(f"❌ Erro salvar configuração size: {e}")
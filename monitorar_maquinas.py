@@ -4,79 +4,55 @@ Mostra quais estão online, offline e permite enviar comandos
 """
 
 import os
-import json
 import time
 import datetime
 from config.settings import CAMINHO_REDE, CAMINHO_LOCAL
+from utils import status_frota
 
 def listar_maquinas_ativas():
-    """Lista todas as máquinas que estão enviando status"""
+    """Lista todas as máquinas que estão enviando status
+    
+    Lê o índice da frota (status_frota.json) da rede e do local - uma leitura
+    por base; sem índice, cai na leitura dos status_maq_*.json.
+    """
     maquinas = {}
     
-    # Verificar arquivos de status na rede
-    try:
-        if os.path.exists(CAMINHO_REDE):
-            for arquivo in os.listdir(CAMINHO_REDE):
-                if arquivo.startswith('status_maq_') and arquivo.endswith('.json'):
-                    maquina = arquivo.replace('status_maq_', '').replace('.json', '')
-                    
-                    try:
-                        with open(os.path.join(CAMINHO_REDE, arquivo), 'r', encoding='utf-8') as f:
-                            status = json.load(f)
-                        
-                        # Verificar se status é recente (últimos 30 segundos)
-                        timestamp = datetime.datetime.fromisoformat(status['timestamp'])
-                        agora = datetime.datetime.now()
-                        diferenca = (agora - timestamp).total_seconds()
-                        
-                        maquinas[maquina] = {
-                            'status': 'ONLINE' if diferenca < 30 else 'OFFLINE',
-                            'ultimo_status': timestamp.strftime('%H:%M:%S'),
-                            'diferenca_segundos': int(diferenca),
-                            'dados': status
-                        }
-                        
-                    except Exception as e:
-                        maquinas[maquina] = {
-                            'status': 'ERRO',
-                            'erro': str(e)
-                        }
-    except Exception as e:
-        print(f"❌ Erro ao acessar rede: {e}")
-    
-    # Verificar arquivos locais também
-    try:
-        if os.path.exists(CAMINHO_LOCAL):
-            for arquivo in os.listdir(CAMINHO_LOCAL):
-                if arquivo.startswith('status_maq_') and arquivo.endswith('.json'):
-                    maquina = arquivo.replace('status_maq_', '').replace('.json', '')
-                    
-                    # Só adicionar se não estiver na rede
-                    if maquina not in maquinas:
-                        try:
-                            with open(os.path.join(CAMINHO_LOCAL, arquivo), 'r', encoding='utf-8') as f:
-                                status = json.load(f)
-                            
-                            timestamp = datetime.datetime.fromisoformat(status['timestamp'])
-                            agora = datetime.datetime.now()
-                            diferenca = (agora - timestamp).total_seconds()
-                            
-                            maquinas[maquina] = {
-                                'status': 'LOCAL' if diferenca < 30 else 'OFFLINE',
-                                'ultimo_status': timestamp.strftime('%H:%M:%S'),
-                                'diferenca_segundos': int(diferenca),
-                                'dados': status,
-                                'origem': 'LOCAL'
-                            }
-                            
-                        except Exception as e:
-                            maquinas[maquina] = {
-                                'status': 'ERRO',
-                                'erro': str(e),
-                                'origem': 'LOCAL'
-                            }
-    except Exception as e:
-        print(f"❌ Erro ao acessar local: {e}")
+    for base, origem in ((CAMINHO_REDE, 'REDE'), (CAMINHO_LOCAL, 'LOCAL')):
+        try:
+            if not os.path.exists(base):
+                continue
+            status_maquinas = status_frota.ler_status_maquinas(base)
+        except Exception as e:
+            print(f"❌ Erro ao acessar {origem.lower()}: {e}")
+            continue
+        
+        for maquina, status in status_maquinas.items():
+            # Só adicionar do local se não estiver na rede
+            if maquina in maquinas:
+                continue
+            
+            try:
+                # Verificar se status é recente (últimos 30 segundos)
+                timestamp = datetime.datetime.fromisoformat(status['timestamp'])
+                agora = datetime.datetime.now()
+                diferenca = (agora - timestamp).total_seconds()
+                
+                maquinas[maquina] = {
+                    'status': ('ONLINE' if origem == 'REDE' else 'LOCAL') if diferenca < 30 else 'OFFLINE',
+                    'ultimo_status': timestamp.strftime('%H:%M:%S'),
+                    'diferenca_segundos': int(diferenca),
+                    'dados': status
+                }
+                if origem == 'LOCAL':
+                    maquinas[maquina]['origem'] = 'LOCAL'
+                
+            except Exception as e:
+                maquinas[maquina] = {
+                    'status': 'ERRO',
+                    'erro': str(e)
+                }
+                if origem == 'LOCAL':
+                    maquinas[maquina]['origem'] = 'LOCAL'
     
     return maquinas
 
@@ -152,7 +128,7 @@ def mostrar_status_maquinas():
     print("="*80)
 
 def monitorar_continuo():
-    """Monitora continuamente as máquinas"""
+    """Monitora continuamente as máquinas (cada atualização lê só o índice da frota)"""
     print("🚀 INICIANDO MONITORAMENTO CONTÍNUO")
     print("   Pressione Ctrl+C para parar")
     print()
@@ -168,8 +144,17 @@ def monitorar_continuo():
     except KeyboardInterrupt:
         print("\n\n🛑 Monitoramento interrompido pelo usuário")
 
-def enviar_comando_broadcast(acao, parametros=None):
-    """Envia comando para TODAS as máquinas online"""
+def enviar_comando_broadcast(acao, parametros=None, aguardar=30, timeout_envio=5):
+    """Envia comando para TODAS as máquinas online (em paralelo)
+    
+    Args:
+        aguardar: Segundos para esperar a confirmação/resultado de todas
+                  (0 = só enviar)
+        timeout_envio: Prazo do envio para cada máquina, em segundos
+    
+    Returns:
+        Lista de resultados por máquina (ver utils.transmissao.transmitir)
+    """
     print(f"📡 ENVIANDO COMANDO BROADCAST: {acao}")
     
     maquinas = listar_maquinas_ativas()
@@ -177,24 +162,38 @@ def enviar_comando_broadcast(acao, parametros=None):
     
     if not online:
         print("❌ Nenhuma máquina online encontrada!")
-        return
+        return []
     
     print(f"🎯 Enviando para {len(online)} máquinas: {', '.join(online)}")
     
     from testar_comando_remoto import enviar_comando
-    
-    sucessos = 0
-    for maquina in online:
-        try:
-            if enviar_comando(maquina, acao, parametros):
-                sucessos += 1
-                print(f"  ✅ {maquina}")
-            else:
-                print(f"  ❌ {maquina}")
-        except Exception as e:
-            print(f"  ❌ {maquina}: {e}")
-    
-    print(f"\n📊 Resultado: {sucessos}/{len(online)} comandos enviados com sucesso")
+    from utils.resultado_comandos import aguardar_resultado, descrever
+    from utils.transmissao import transmitir, resumo_transmissao
+    
+    resultados = transmitir(
+        online,
+        lambda maquina: enviar_comando(maquina, acao, parametros,
+                                       status=maquinas[maquina].get('dados'), detalhado=False),
+        timeout=timeout_envio,
+    )
+    print(resumo_transmissao(resultados))
+    
+    enviados = {r['maquina']: r['retorno'] for r in resultados if r['sucesso']}
+    if not aguardar or not enviados:
+        return resultados
+    
+    # Prazo único para todas as confirmações
+    print(f"\n⏳ Aguardando confirmação (até {aguardar}s)...")
+    limite = time.monotonic() + aguardar
+    concluidos = 0
+    for maquina, comando_id in enviados.items():
+        registro = aguardar_resultado(comando_id, timeout=max(0.0, limite - time.monotonic()))
+        if registro and registro.get('estado') == 'concluido':
+            concluidos += 1
+        print(f"  ⏱️ {maquina}: {descrever(registro)}")
+    
+    print(f"\n📊 Executados: {concluidos}/{len(enviados)}")
+    return resultados
 
 if __name__ == "__main__":
     print("="*80)
@@ -1,13 +1,26 @@
 """Script para testar comandos remotos - Envia comando para máquina específica"""
 
-import json
 import os
 import uuid
 import datetime
 from config.settings import CAMINHO_REDE, CAMINHO_LOCAL
+from utils.caixa_comandos import depositar_comando
+from utils.canal_socket import enviar_direto
+from utils.resultado_comandos import aguardar_resultado, descrever
 
-def enviar_comando(maquina, acao, parametros=None):
-    """Envia comando para máquina específica"""
+def enviar_comando(maquina, acao, parametros=None, status=None, detalhado=True):
+    """Envia comando para máquina específica
+    
+    Tenta o canal direto (TCP) anunciado no status da máquina; se não houver
+    ou falhar, grava o arquivo de comando na rede (ou local, sem rede).
+    
+    Args:
+        status: Status da máquina já lido (evita reabrir status_maq_<N>.json)
+        detalhado: False omite as mensagens de sucesso (envio em paralelo)
+    
+    Returns:
+        ID do comando (para aguardar_resultado) ou None se nenhum envio funcionou
+    """
     
     if parametros is None:
         parametros = {}
@@ -22,43 +35,49 @@ def enviar_comando(maquina, acao, parametros=None):
         'origem': 'teste_manual'
     }
     
-    # Tentar enviar para REDE primeiro
-    comando_file_rede = os.path.join(CAMINHO_REDE, f"comando_maq_{maquina}.json")
-    comando_file_local = os.path.join(CAMINHO_LOCAL, f"comando_maq_{maquina}.json")
+    # Canal direto: entrega imediata sem passar pelo compartilhamento
+    if enviar_direto(maquina, comando_data, status):
+        if detalhado:
+            print(f"✅ Comando entregue DIRETO (TCP) para máquina {maquina} - ID: {comando_id}")
+        return comando_id
     
+    # Cada comando é um arquivo próprio na caixa da máquina (comandos_maq_<N>/),
+    # gravado com rename atômico - comandos em sequência não se sobrescrevem
     sucesso = False
     
-    # Tentar rede
+    # Tentar enviar para REDE primeiro
     try:
         if os.path.exists(CAMINHO_REDE):
-            with open(comando_file_rede, 'w', encoding='utf-8') as f:
-                json.dump(comando_data, f, indent=2, ensure_ascii=False)
-            print(f"✅ Comando enviado para REDE: {comando_file_rede}")
+            comando_file_rede = depositar_comando(CAMINHO_REDE, maquina, comando_data)
+            if detalhado:
+                print(f"✅ Comando enviado para REDE: {comando_file_rede}")
             sucesso = True
     except Exception as e:
         print(f"⚠️ Erro ao enviar para rede: {e}")
     
-    # Tentar local também (fallback)
-    try:
-        with open(comando_file_local, 'w', encoding='utf-8') as f:
-            json.dump(comando_data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Comando enviado para LOCAL: {comando_file_local}")
-        sucesso = True
-    except Exception as e:
-        print(f"⚠️ Erro ao enviar para local: {e}")
+    # Local só como fallback: a máquina destino lê a rede, e na própria máquina
+    # o receptor lê as duas pastas - gravar nas duas era uma escrita a mais
+    if not sucesso:
+        try:
+            comando_file_local = depositar_comando(CAMINHO_LOCAL, maquina, comando_data)
+            if detalhado:
+                print(f"✅ Comando enviado para LOCAL: {comando_file_local}")
+            sucesso = True
+        except Exception as e:
+            print(f"⚠️ Erro ao enviar para local: {e}")
     
-    if sucesso:
+    if sucesso and detalhado:
         print(f"\n📋 COMANDO ENVIADO:")
         print(f"   ID: {comando_id}")
         print(f"   Máquina: {maquina}")
         print(f"   Ação: {acao}")
         print(f"   Parâmetros: {parametros}")
         print(f"\n⏳ Aguardando execução pela máquina {maquina}...")
-        print(f"   (A máquina verifica comandos a cada 1ms)")
-    else:
-        print(f"\n❌ FALHA ao enviar comando!")
+        print(f"   (A máquina é acordada assim que o arquivo chega)")
+    elif not sucesso:
+        print(f"\n❌ FALHA ao enviar comando {acao} para {maquina}!")
     
-    return sucesso
+    return comando_id if sucesso else None
 
 
 if __name__ == "__main__":
@@ -150,8 +169,13 @@ if __name__ == "__main__":
     print()
     print("="*60)
     
-    # Enviar comando
-    enviar_comando(maquina, acao, parametros)
+    # Enviar comando e esperar a confirmação da máquina
+    comando_id = enviar_comando(maquina, acao, parametros)
+    if comando_id:
+        registro = aguardar_resultado(comando_id, timeout=30)
+        print(f"\n⏱️ Resultado: {descrever(registro)}")
+        if registro and registro.get('resultado') is not None:
+            print(f"   Retorno: {registro['resultado']}")
     
     print()
     print("="*60)
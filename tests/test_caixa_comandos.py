@@ -0,0 +1,44 @@
+"""Caixa de comandos (spool): ordem de execução em ler_pendentes"""
+
+import json
+import os
+
+from utils import caixa_comandos
+
+
+def _ids(pendentes):
+    return [comando['id'] if comando else None for _, _, comando in pendentes]
+
+
+def test_prioridade_e_depois_chegada(tmp_path):
+    base = str(tmp_path)
+    for id_comando, prioridade in (('a', 0), ('b', 5), ('c', 0), ('d', 5), ('e', 1)):
+        caixa_comandos.depositar_comando(base, 201, {'id': id_comando, 'acao': 'coletar_dados',
+                                                     'prioridade': prioridade})
+
+    assert _ids(caixa_comandos.ler_pendentes([('REDE', base)], 201)) == ['b', 'd', 'e', 'a', 'c']
+
+
+def test_bases_legado_e_corrompido(tmp_path):
+    rede, local = str(tmp_path / 'rede'), str(tmp_path / 'local')
+    os.makedirs(rede)
+    os.makedirs(local)
+    caixa_comandos.depositar_comando(rede, 201, {'id': 'rede-1'})
+    caixa_comandos.depositar_comando(local, 201, {'id': 'local-1'})
+    caixa_comandos.depositar_comando(rede, 202, {'id': 'outra-maquina'})
+    with open(caixa_comandos.arquivo_legado(rede, 201), 'w', encoding='utf-8') as f:
+        json.dump({'id': 'legado', 'prioridade': 'urgente?'}, f)  # Prioridade inválida conta como 0
+    with open(os.path.join(caixa_comandos.pasta_caixa(local, 201), '1-quebrado.json'), 'w') as f:
+        f.write('{"id": ')
+    with open(os.path.join(caixa_comandos.pasta_caixa(local, 201), '2-gravando.json.tmp'), 'w') as f:
+        f.write('{}')
+
+    pendentes = caixa_comandos.ler_pendentes([('REDE', rede), ('LOCAL', local)], 201)
+
+    # Prefixo de ns mais antigo primeiro; o arquivo quebrado (prefixo 1) volta como None para ser removido
+    assert _ids(pendentes) == [None, 'rede-1', 'local-1', 'legado']
+    assert [rotulo for rotulo, _, _ in pendentes] == ['LOCAL', 'REDE', 'LOCAL', 'REDE']
+
+    for _, caminho, _ in pendentes:
+        assert caixa_comandos.remover(caminho)
+    assert caixa_comandos.ler_pendentes([('REDE', rede), ('LOCAL', local)], 201) == []
@@ -0,0 +1,68 @@
+"""Canal direto de comandos: ida e volta por TCP em 127.0.0.1"""
+
+import time
+
+import pytest
+
+from utils.canal_socket import ServidorComandos, enviar_comando_socket, gerar_chave, ler_chave
+
+CHAVE = b'chave-de-teste-0123456789abcdef'
+
+
+@pytest.fixture
+def servidor():
+    recebidos = []
+
+    def ao_receber(comando):
+        recebidos.append(comando)
+        return {'id': comando['id'], 'aceito': True, 'maquina': '201'}
+
+    servidor = ServidorComandos(ao_receber, porta=0, host='127.0.0.1', chave=CHAVE)
+    assert servidor.iniciar()
+    yield servidor, recebidos
+    servidor.parar()
+
+
+def test_comando_assinado_ida_e_volta(servidor):
+    servidor, recebidos = servidor
+
+    resposta = enviar_comando_socket('127.0.0.1', {'id': 'c1', 'acao': 'coletar_dados', 'parametros': {}},
+                                     servidor.porta, chave=CHAVE)
+
+    assert resposta == {'id': 'c1', 'aceito': True, 'maquina': '201'}
+    assert [c['acao'] for c in recebidos] == ['coletar_dados']
+
+
+def test_comando_recusado(servidor):
+    servidor, recebidos = servidor
+
+    def enviar(comando, chave=CHAVE):
+        return enviar_comando_socket('127.0.0.1', comando, servidor.porta, chave=chave)
+
+    assert not enviar({'id': 'c2', 'acao': 'coletar_dados'}, chave=b'outra-chave-0123456789')['aceito']
+    assert not enviar({'id': 'c3', 'acao': 'executar_comando_sistema', 'parametros': {'comando': 'dir'}})['aceito']
+    assert not enviar({'id': 'c4', 'acao': 'coletar_dados', 'enviado_em': time.time() - 3600})['aceito']
+    assert enviar({'id': 'c5', 'acao': 'coletar_dados'})['aceito']
+    assert not enviar({'id': 'c5', 'acao': 'coletar_dados'})['aceito']  # Reenvio do mesmo id
+    assert [c['id'] for c in recebidos] == ['c5']
+
+
+def test_sem_chave_nao_escuta(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.canal_socket.CAMINHO_REDE', str(tmp_path))
+    servidor = ServidorComandos(lambda comando: {'aceito': True}, porta=0, host='127.0.0.1')
+
+    assert not servidor.iniciar()
+    assert not servidor.ativo
+
+
+def test_chave_gerada_na_pasta(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.canal_socket.CAMINHO_REDE', str(tmp_path))
+    chave = gerar_chave()
+
+    assert chave and gerar_chave() == chave == ler_chave()
+    servidor = ServidorComandos(lambda comando: {'id': comando['id'], 'aceito': True}, porta=0, host='127.0.0.1')
+    assert servidor.iniciar()
+    try:
+        assert enviar_comando_socket('127.0.0.1', {'id': 'c6', 'acao': 'coletar_dados'}, servidor.porta)['aceito']
+    finally:
+        servidor.parar()
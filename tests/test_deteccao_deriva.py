@@ -0,0 +1,94 @@
+"""Detecção de deriva: alertas EWMA/CUSUM por detector e pelo monitor"""
+
+import numpy as np
+import pandas as pd
+
+from config.constants import TIPOS_DADOS
+from data.incremental import LeitorIncremental
+from ml.deteccao_deriva import AQUECIMENTO, DetectorDeriva, MonitorDeriva
+
+COLUNAS = ['maquina', 'percent_cam_d', 'percent_cam_w', 'data_hora']
+
+
+def _alertas(detector, valores):
+    return [a for a in (detector.atualizar(v) for v in valores) if a]
+
+
+def test_serie_estavel_nao_alerta():
+    rng = np.random.default_rng(3)
+    detector = DetectorDeriva()
+
+    assert _alertas(detector, rng.normal(2.0, 0.2, 500)) == []
+    assert detector.aquecido
+
+
+def test_salto_alerta_e_reaprende_a_base():
+    rng = np.random.default_rng(4)
+    detector = DetectorDeriva()
+    _alertas(detector, rng.normal(2.0, 0.2, AQUECIMENTO))
+
+    alertas = _alertas(detector, [4.0, 4.1])
+
+    assert alertas and alertas[0]['direcao'] == 'alta'
+    assert alertas[0]['severidade'] == 'ALTA'
+    assert 'EWMA' in alertas[0]['metodo']
+    assert not detector.aquecido  # Depois do alerta volta a aprender
+
+
+def test_deriva_pequena_e_persistente_pelo_cusum():
+    detector = DetectorDeriva()
+    _alertas(detector, [1.9, 2.1] * (AQUECIMENTO // 2))
+
+    # +0,6 desvio: dentro do limite da EWMA, mas acumula no CUSUM
+    alertas = _alertas(detector, [2.06] * 100)
+
+    assert alertas
+    assert alertas[0]['metodo'] == 'CUSUM'
+    assert alertas[0]['direcao'] == 'alta'
+
+
+def test_nan_e_ignorado():
+    detector = DetectorDeriva()
+    assert detector.atualizar(float('nan')) is None
+    assert detector.base.n == 0
+
+
+class _Dados:
+    """DataManager mínimo para o monitor: novo_leitor() sobre um CSV"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def novo_leitor(self):
+        leitor = LeitorIncremental(self.caminho, COLUNAS, {c: TIPOS_DADOS[c] for c in COLUNAS})
+        df, _ = leitor.ler_novos()
+        return df, leitor
+
+
+def test_monitor_alerta_so_nas_linhas_novas(tmp_path):
+    caminho = str(tmp_path / 'producao.csv')
+    rng = np.random.default_rng(6)
+    historico = pd.DataFrame({
+        'maquina': ['201', '202'] * AQUECIMENTO,
+        'percent_cam_d': rng.normal(2.0, 0.2, 2 * AQUECIMENTO).round(2),
+        'percent_cam_w': rng.normal(1.0, 0.1, 2 * AQUECIMENTO).round(2),
+        'data_hora': '2025-01-01 08:00:00',
+    })
+    historico.to_csv(caminho, index=False)
+
+    monitor = MonitorDeriva(_Dados(caminho))
+    monitor._ativo = True
+    monitor._ler()
+    assert monitor.alertas.empty()
+    assert monitor.maquinas == 2
+
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write('202,2.1,1.0,2025-01-01 09:00:00\n' + '201,6.0,1.0,2025-01-01 09:05:00\n' * 2)
+    monitor._ler()
+
+    alertas = []
+    while not monitor.alertas.empty():
+        alertas.append(monitor.alertas.get())
+    assert monitor.registros_processados == 3
+    assert [(a['maquina'], a['metrica'], a['direcao']) for a in alertas] == [('201', 'percent_cam_d', 'alta')]
+    assert alertas[0]['data_hora'] == '2025-01-01 09:05:00'
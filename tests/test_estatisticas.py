@@ -0,0 +1,52 @@
+"""Estatísticas incrementais por máquina: tendência (médias das duas metades)"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import estatisticas
+from ml.estatisticas import EstatisticasMaquina
+
+
+def _metades(valores):
+    meio = len(valores) // 2
+    return np.nanmean(valores[:meio]), np.nanmean(valores[meio:])
+
+
+def _lote(valores):
+    return pd.DataFrame({'percent_cam_d': valores, 'percent_cam_w': valores})
+
+
+def test_metades_exatas_em_lotes():
+    valores = np.array([1.0, float('nan'), 3.0, 4.0, 10.0, 2.0, float('nan'), 8.0, 5.0])
+    est = EstatisticasMaquina()
+    for inicio, fim in ((0, 1), (1, 4), (4, 9)):
+        est.adicionar_lote(_lote(valores[inicio:fim]))
+
+    assert est.medias_metades() == pytest.approx(_metades(valores))
+
+
+def test_memoria_constante_com_registros_acumulando(monkeypatch):
+    monkeypatch.setattr(estatisticas, 'LIMITE_BLOCOS_TENDENCIA', 64)
+    rng = np.random.default_rng(7)
+    valores = np.concatenate([rng.normal(2.0, 0.5, 30000), rng.normal(3.0, 0.5, 30000)])
+    valores[::17] = float('nan')
+
+    est = EstatisticasMaquina()
+    tamanhos = []
+    for inicio in range(0, 40000, 2000):
+        est.adicionar_lote(_lote(valores[inicio:inicio + 2000]))
+        tamanhos.append(len(est._pendentes_cam_d))
+    for inicio in range(40000, 41000):  # Registro a registro, como no coletor
+        est.adicionar_lote(_lote(valores[inicio:inicio + 1]))
+        tamanhos.append(len(est._pendentes_cam_d))
+    est.adicionar_lote(_lote(valores[41000:]))
+    tamanhos.append(len(est._pendentes_cam_d))
+
+    assert max(tamanhos) <= 64
+    primeira, segunda = est.medias_metades()
+    esperado = _metades(valores)
+    assert not math.isnan(primeira)
+    assert (primeira, segunda) == pytest.approx(esperado, abs=0.02)
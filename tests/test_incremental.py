@@ -0,0 +1,108 @@
+"""Leitura incremental do CSV pelo deslocamento em bytes"""
+
+import os
+
+import pandas as pd
+
+from config.constants import TIPOS_DADOS
+from data.incremental import LeitorIncremental
+from data.saver import anexar_dataframe_seguro
+
+COLUNAS = ['maquina', 'percent_cam_d', 'data_hora']
+TIPOS = {col: TIPOS_DADOS[col] for col in COLUNAS}
+
+
+def _csv(tmp_path, linhas):
+    caminho = str(tmp_path / 'producao.csv')
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        f.write('maquina,percent_cam_d,data_hora\n' + ''.join(linhas))
+    return caminho
+
+
+def _linha(i):
+    return f'{201 + i % 3},{i}.5,2025-01-01 {i % 24:02d}:00:00\n'
+
+
+def test_le_so_o_anexado_pelo_deslocamento(tmp_path):
+    caminho = _csv(tmp_path, [_linha(i) for i in range(5)])
+    leitor = LeitorIncremental(caminho, COLUNAS, TIPOS)
+
+    df, completo = leitor.ler_novos()
+    assert completo and len(df) == 5
+    assert leitor.offset == os.path.getsize(caminho)
+
+    with open(caminho, 'a', encoding='utf-8', newline='') as f:
+        f.write(_linha(5) + _linha(6) + '203,7.5,2025-01')  # Última linha ainda sendo gravada
+    novos, completo = leitor.ler_novos()
+    assert not completo
+    assert list(novos['percent_cam_d']) == [5.5, 6.5]
+
+    with open(caminho, 'a', encoding='utf-8', newline='') as f:
+        f.write('-01 07:00:00\n')
+    novos, completo = leitor.ler_novos()
+    assert not completo
+    assert list(novos['percent_cam_d']) == [7.5]
+    assert novos['data_hora'].iloc[0] == pd.Timestamp('2025-01-01 07:00:00')
+    assert leitor.linhas == 8
+
+
+def test_trecho_alterado_forca_leitura_completa(tmp_path):
+    caminho = _csv(tmp_path, [_linha(i) for i in range(5)])
+    leitor = LeitorIncremental(caminho, COLUNAS, TIPOS)
+    leitor.ler_novos()
+
+    # Mesmo tamanho, conteúdo diferente (edição regravada): a assinatura não confere
+    with open(caminho, 'r+', encoding='utf-8', newline='') as f:
+        conteudo = f.read()
+        f.seek(0)
+        f.write(conteudo.replace('4.5', '9.5'))
+    df, completo = leitor.ler_novos()
+    assert completo
+    assert list(df['percent_cam_d']) == [0.5, 1.5, 2.5, 3.5, 9.5]
+
+    # Arquivo menor que o deslocamento (linhas excluídas)
+    _csv(tmp_path, [_linha(i) for i in range(2)])
+    df, completo = leitor.ler_novos()
+    assert completo and len(df) == 2
+
+
+def test_estado_retomado_por_outro_leitor(tmp_path):
+    caminho = _csv(tmp_path, [_linha(i) for i in range(3)])
+    leitor = LeitorIncremental(caminho, COLUNAS, TIPOS)
+    leitor.ler_novos()
+
+    with open(caminho, 'a', encoding='utf-8', newline='') as f:
+        f.write(_linha(3))
+    outro = LeitorIncremental(caminho, COLUNAS, TIPOS)
+    outro.restaurar(leitor.estado())
+    novos, completo = outro.ler_novos()
+
+    assert not completo
+    assert list(novos['percent_cam_d']) == [3.5]
+
+
+def test_anexo_segue_a_ordem_do_cabecalho(tmp_path):
+    caminho = _csv(tmp_path, [_linha(0)])
+    leitor = LeitorIncremental(caminho, COLUNAS, TIPOS)
+    leitor.ler_novos()
+
+    novos = pd.DataFrame([{'data_hora': '2025-01-02 08:00:00', 'percent_cam_d': 1.25, 'maquina': '209'}])
+    assert anexar_dataframe_seguro(novos, caminho)
+    lidos, completo = leitor.ler_novos()
+
+    assert not completo
+    assert lidos[COLUNAS].astype(str).values.tolist() == [['209', '1.25', '2025-01-02 08:00:00']]
+
+    # Coluna fora do cabeçalho ou arquivo inexistente: o chamador reescreve o arquivo
+    assert not anexar_dataframe_seguro(novos.assign(extra=1), caminho)
+    assert not anexar_dataframe_seguro(novos, str(tmp_path / 'outro.csv'))
+
+
+def test_anexo_sem_quebra_no_fim_do_arquivo(tmp_path):
+    caminho = _csv(tmp_path, [_linha(0).rstrip('\n')])
+
+    assert anexar_dataframe_seguro(pd.DataFrame([{'maquina': '202', 'percent_cam_d': 2.0,
+                                                  'data_hora': '2025-01-01 02:00:00'}]), caminho)
+    df, _ = LeitorIncremental(caminho, COLUNAS, TIPOS).ler_novos()
+
+    assert list(df['maquina'].astype(str)) == ['201', '202']
@@ -0,0 +1,42 @@
+"""Observador de comandos: pastas em que o watchdog não entrega eventos"""
+
+import os
+
+from utils.observador_arquivos import ObservadorComandos
+
+
+def test_pasta_sem_eventos_volta_ao_polling(tmp_path):
+    pasta = str(tmp_path)
+    observador = ObservadorComandos([pasta], nomes=['comando_maq_201.json'])
+    observador._observadas.add(pasta)  # Como se o watchdog observasse a pasta (sem nunca notificar)
+
+    assert observador.aguardar(timeout=0.01) is False
+    assert observador.modo == "watchdog"
+
+    # Escrita "remota": nenhum evento chega, só a varredura de segurança encontra o arquivo
+    with open(os.path.join(pasta, 'comando_maq_201.json'), 'w') as f:
+        f.write('{}')
+    observador._proxima_seguranca = observador._proxima_varredura = 0.0
+    assert observador.aguardar(timeout=0.01) is True
+    assert observador.modo == "watchdog + polling adaptativo"
+
+    # Daqui em diante o próximo comando é visto pelo polling, sem esperar a varredura de segurança
+    os.remove(os.path.join(pasta, 'comando_maq_201.json'))
+    observador.aguardar(timeout=0.01)
+    with open(os.path.join(pasta, 'comando_maq_201.json'), 'w') as f:
+        f.write('{}')
+    assert observador.aguardar(timeout=0.5) is True
+
+
+def test_pasta_com_eventos_continua_no_watchdog(tmp_path):
+    pasta = str(tmp_path)
+    observador = ObservadorComandos([pasta], nomes=['comando_maq_201.json'])
+    observador._observadas.add(pasta)
+
+    with open(os.path.join(pasta, 'comando_maq_201.json'), 'w') as f:
+        f.write('{}')
+    observador.notificar(pasta)
+    observador._proxima_seguranca = observador._proxima_varredura = 0.0
+
+    assert observador.aguardar(timeout=0.01) is True
+    assert observador.modo == "watchdog"
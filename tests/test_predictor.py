@@ -0,0 +1,57 @@
+"""Relatório de IA com dados tipados (data_hora como Timestamp)"""
+
+import json
+
+import pandas as pd
+
+from config.constants import TIPOS_DADOS
+from data.schema import aplicar_schema
+from ml.predictor import PredicaoInteligente
+
+
+class _DadosFixos:
+    """DataManager mínimo: só o df (sem ouvintes)"""
+
+    def __init__(self, df):
+        self.df = df
+
+
+def _df_com_pico():
+    registros = [{
+        'maquina': '201',
+        'rej1_defect': 'Furo',
+        'rej1_local': 'Corpo',
+        'percent_cam_d': 1.0,
+        'percent_cam_w': 1.0,
+        'data_hora': f'2025-01-01 {i % 24:02d}:00:00',
+    } for i in range(30)]
+    registros[-1]['percent_cam_d'] = 40.0
+    return aplicar_schema(pd.DataFrame(registros), TIPOS_DADOS)
+
+
+def test_relatorio_com_pico_vira_json():
+    ia = PredicaoInteligente(_DadosFixos(_df_com_pico()))
+
+    relatorio = ia.gerar_relatorio_ia()
+    anomalias = relatorio['analises'][0]['anomalias']
+    picos = [a for a in anomalias if a['tipo'] == 'pico_rejeicao']
+
+    assert picos
+    assert picos[0]['data_hora'] == '2025-01-01 05:00:00'
+    assert json.loads(json.dumps(relatorio, ensure_ascii=False))['analises'][0]['anomalias'] == anomalias
+
+
+def test_picos_com_limites_de_cada_maquina():
+    registros = [{
+        'maquina': maquina,
+        'percent_cam_d': base + 0.1 * (i % 3),
+        'percent_cam_w': 1.0,
+        'data_hora': f'2025-01-01 {i % 24:02d}:00:00',
+    } for maquina, base in (('201', 1.0), ('202', 10.0)) for i in range(30)]
+    registros[10]['percent_cam_d'] = 4.2
+    df = aplicar_schema(pd.DataFrame(registros), TIPOS_DADOS)
+
+    picos = PredicaoInteligente(_DadosFixos(df))._picos_rejeicao(df)
+
+    assert [(p['maquina'], p['metrica'], p['valor']) for p in picos] == [('201', 'percent_cam_d', 4.2)]
+    assert json.dumps(picos[0]['valor']) == '4.2'
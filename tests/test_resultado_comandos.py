@@ -0,0 +1,66 @@
+"""Ack e resultado de comandos: gravação pelo receptor e espera do remetente"""
+
+import threading
+import time
+
+from utils import resultado_comandos
+
+
+def test_ack_e_resultado_ida_e_volta(tmp_path):
+    base = str(tmp_path)
+    comando = {'id': 'cmd-1', 'acao': 'coletar_dados', 'enviado_em': time.time() - 0.5}
+
+    registro = resultado_comandos.novo_registro(comando, '201', 'REDE')
+    assert resultado_comandos.gravar_resultado(base, registro)
+    lido = resultado_comandos.ler_resultado('cmd-1', [base])
+    assert lido['estado'] == 'recebido'
+    assert lido['latencias_ms']['entrega'] >= 500
+
+    resultado_comandos.marcar(registro, 'executando')
+    resultado_comandos.gravar_resultado(base, registro)
+    resultado_comandos.marcar(registro, 'concluido', resultado='arquivo.csv')
+    resultado_comandos.gravar_resultado(base, registro)
+
+    final = resultado_comandos.aguardar_resultado('cmd-1', timeout=1.0, bases=[base])
+    assert final['estado'] == 'concluido'
+    assert final['resultado'] == 'arquivo.csv'
+    assert set(final['latencias_ms']) == {'entrega', 'fila', 'execucao', 'total'}
+    assert 'concluido' in resultado_comandos.descrever(final)
+
+
+def test_aguarda_o_receptor(tmp_path):
+    base = str(tmp_path)
+    registro = resultado_comandos.novo_registro({'id': 'cmd-2', 'acao': 'fazer_backup'}, '202')
+
+    def receptor():
+        time.sleep(0.05)
+        resultado_comandos.gravar_resultado(base, registro)
+        time.sleep(0.05)
+        resultado_comandos.gravar_resultado(base, resultado_comandos.marcar(registro, 'erro', erro='sem disco'))
+
+    threading.Thread(target=receptor).start()
+    final = resultado_comandos.aguardar_resultado('cmd-2', timeout=2.0, bases=[base])
+
+    assert final['estado'] == 'erro'
+    assert final['erro'] == 'sem disco'
+
+
+def test_timeout_devolve_ultimo_estado(tmp_path):
+    base = str(tmp_path)
+    assert resultado_comandos.aguardar_resultado('cmd-3', timeout=0.05, bases=[base]) is None
+
+    resultado_comandos.gravar_resultado(base, resultado_comandos.novo_registro({'id': 'cmd-3'}, '203'))
+    inicio = time.monotonic()
+    registro = resultado_comandos.aguardar_resultado('cmd-3', timeout=0.1, bases=[base])
+
+    assert registro['estado'] == 'recebido'
+    assert time.monotonic() - inicio < 1.0
+
+
+def test_base_mais_avancada_vence(tmp_path):
+    rede, local = str(tmp_path / 'rede'), str(tmp_path / 'local')
+    registro = resultado_comandos.novo_registro({'id': 'cmd-4'}, '204')
+    resultado_comandos.gravar_resultado(rede, dict(registro))
+    resultado_comandos.gravar_resultado(local, resultado_comandos.marcar(registro, 'concluido'))
+
+    assert resultado_comandos.ler_resultado('cmd-4', [rede, local])['estado'] == 'concluido'
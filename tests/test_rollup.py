@@ -0,0 +1,90 @@
+"""Cubo horário: persistência e agregação por janela"""
+
+import pandas as pd
+import pytest
+
+from config.constants import TIPOS_DADOS
+from data.indice import IndiceTemporal
+from data.rollup import CuboHorario, agregar_janela
+from data.schema import aplicar_schema
+
+
+def _registros():
+    registros = [{
+        'maquina': str(201 + i % 3),
+        'rej1_defect': ['Furo', 'Trinca', '', 'Mancha'][i % 4],
+        'rej2_defect': 'Furo' if i % 5 == 0 else '',
+        'percent_cam_d': float(i % 7),
+        'percent_cam_w': 0.5 * (i % 3),
+        'data_hora': f'2025-01-01 {i % 24:02d}:{(7 * i) % 60:02d}:00',
+    } for i in range(120)]
+    return aplicar_schema(pd.DataFrame(registros), TIPOS_DADOS)
+
+
+def test_cubo_salvo_e_carregado_sem_pickle(tmp_path):
+    caminho = str(tmp_path / 'cubo.json')
+    cubo = CuboHorario.de_registros(_registros())
+    estado = {'offset': 123, 'linhas': 120}
+
+    assert cubo.salvar(caminho, estado)
+    carregado, estado_lido = CuboHorario.carregar(caminho)
+
+    assert estado_lido == estado
+    pd.testing.assert_series_equal(carregado.defeitos, cubo.defeitos)
+    pd.testing.assert_frame_equal(carregado.medias, cubo.medias)
+
+
+def test_arquivo_invalido_e_ignorado(tmp_path):
+    caminho = tmp_path / 'cubo.json'
+    caminho.write_bytes(b'\x80\x04\x95 pickle antigo')
+
+    assert CuboHorario.carregar(str(caminho)) == (None, None)
+
+
+def _janela_bruta(df, inicio, fim, maquina=None):
+    mascara = (df['data_hora'] >= inicio) & (df['data_hora'] <= fim)
+    if maquina is not None:
+        mascara &= df['maquina'].astype(str) == maquina
+    return CuboHorario.de_registros(df[mascara])
+
+
+@pytest.mark.parametrize('inicio, fim, maquina', [
+    ('2025-01-01 00:00:00', '2025-01-01 23:59:59', None),   # Só horas cheias
+    ('2025-01-01 03:20:00', '2025-01-01 17:45:00', None),   # Bordas parciais dos dois lados
+    ('2025-01-01 03:20:00', '2025-01-01 17:45:00', '202'),
+    ('2025-01-01 05:10:00', '2025-01-01 05:50:00', '201'),  # Dentro de uma hora só
+    ('2025-01-01 06:00:00', '2025-01-01 07:00:00', None),   # Fim exatamente na hora cheia
+])
+def test_janela_do_cubo_igual_a_agregacao_dos_registros(inicio, fim, maquina):
+    df = _registros()
+    indice = IndiceTemporal(df)
+    cubo = CuboHorario.de_registros(indice.df)
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+
+    janela = agregar_janela(cubo, indice, inicio, fim, maquina)
+    bruta = _janela_bruta(df, inicio, fim, maquina)
+
+    pd.testing.assert_series_equal(janela.contagem_defeitos(), bruta.contagem_defeitos())
+    pd.testing.assert_frame_equal(janela.medias_por_maquina(), bruta.medias_por_maquina())
+
+
+def test_recortar_horas_cheias():
+    df = _registros()
+    cubo = CuboHorario.de_registros(df)
+    inicio, fim = pd.Timestamp('2025-01-01 04:00:00'), pd.Timestamp('2025-01-01 09:00:00')
+
+    recorte = cubo.recortar(inicio, fim, maquina='203')
+    bruta = _janela_bruta(df, inicio, fim - pd.Timedelta(1, unit='ns'), '203')
+
+    pd.testing.assert_series_equal(recorte.defeitos, bruta.defeitos)
+    pd.testing.assert_frame_equal(recorte.medias, bruta.medias)
+
+
+def test_mesclar_soma_celulas():
+    df = _registros()
+    metade = len(df) // 2
+    mesclado = CuboHorario.de_registros(df.iloc[:metade]).mesclar(CuboHorario.de_registros(df.iloc[metade:]))
+    inteiro = CuboHorario.de_registros(df)
+
+    pd.testing.assert_series_equal(mesclado.defeitos, inteiro.defeitos)
+    pd.testing.assert_frame_equal(mesclado.medias, inteiro.medias)
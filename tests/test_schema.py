@@ -0,0 +1,63 @@
+"""Esquema tipado: data_hora na leitura/gravação do CSV de produção"""
+
+import warnings
+
+import pandas as pd
+import pytest
+
+from config.constants import TIPOS_DADOS
+from data.loader import ler_csv_tipado
+from data.saver import anexar_dataframe_seguro, preservar_texto_original, salvar_dataframe_seguro
+from data.schema import aplicar_schema
+
+
+def test_primeira_linha_so_com_data_nao_apaga_as_demais():
+    df = aplicar_schema(pd.DataFrame({'data_hora': ['2025-01-01', '2025-01-01 10:30:00', '01/02/2025 08:15']}),
+                        TIPOS_DADOS)
+
+    assert list(df['data_hora']) == [pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-01 10:30:00'),
+                                     pd.Timestamp('2025-02-01 08:15')]
+
+
+def test_meia_noite_gravada_com_hora(tmp_path):
+    caminho = str(tmp_path / 'producao.csv')
+    df = aplicar_schema(pd.DataFrame({'maquina': ['201', '202'],
+                                      'data_hora': ['2025-01-01 00:00:00', '2025-01-02 00:00:00']}), TIPOS_DADOS)
+    assert salvar_dataframe_seguro(df, caminho)
+    novos = aplicar_schema(pd.DataFrame({'maquina': ['203'], 'data_hora': ['2025-01-03 00:00:00']}), TIPOS_DADOS)
+    assert anexar_dataframe_seguro(novos, caminho)
+
+    with open(caminho, encoding='utf-8') as f:
+        linhas = f.read().splitlines()
+    assert linhas[1:] == ['201,2025-01-01 00:00:00', '202,2025-01-02 00:00:00', '203,2025-01-03 00:00:00']
+
+    lido = ler_csv_tipado(caminho, TIPOS_DADOS)
+    assert lido['data_hora'].notna().all()
+
+
+def test_regravar_mantem_texto_nao_reconhecido(tmp_path):
+    caminho = str(tmp_path / 'producao.csv')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write('maquina,data_hora\n201,2025-01-01 10:00:00\n202,ontem às 10h\n203,\n')
+    df = ler_csv_tipado(caminho, TIPOS_DADOS)
+    assert df['data_hora'].isna().sum() == 2
+
+    assert salvar_dataframe_seguro(preservar_texto_original(df, caminho, ['data_hora']), caminho)
+
+    with open(caminho, encoding='utf-8') as f:
+        assert f.read().splitlines()[1:] == ['201,2025-01-01 10:00:00', '202,ontem às 10h', '203,']
+
+
+def test_edicao_mantem_float32_e_categoria():
+    from data.manager import DataManager
+
+    df = aplicar_schema(pd.DataFrame({'maquina': ['201', '202'], 'percent_cam_d': ['1.5', '2.0']}), TIPOS_DADOS)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        DataManager._aplicar_alteracoes(df, 1, {'percent_cam_d': '3.1', 'maquina': '209'})
+
+    assert df['percent_cam_d'].dtype == 'float32'
+    assert df.at[1, 'percent_cam_d'] == pytest.approx(3.1)
+    assert isinstance(df['maquina'].dtype, pd.CategoricalDtype)
+    assert list(df['maquina']) == ['201', '209']
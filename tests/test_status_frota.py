@@ -0,0 +1,75 @@
+"""Índice da frota: publicação concorrente e fallback para os status_maq_<N>.json"""
+
+import datetime
+import json
+import threading
+
+from utils import status_frota
+
+
+def _status(maquina, segundos_atras=0):
+    instante = datetime.datetime.now() - datetime.timedelta(seconds=segundos_atras)
+    return {'maquina': maquina, 'timestamp': instante.isoformat(), 'online': True}
+
+
+def test_publicacoes_simultaneas_nao_se_perdem(tmp_path):
+    base = str(tmp_path)
+    maquinas = [str(m) for m in range(201, 215)]
+    barreira = threading.Barrier(len(maquinas))
+
+    def publicar(maquina):
+        barreira.wait()
+        for _ in range(5):
+            assert status_frota.publicar_status(base, maquina, _status(maquina))
+
+    threads = [threading.Thread(target=publicar, args=(m,)) for m in maquinas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(status_frota.ler_frota(base)) == maquinas
+    assert not (tmp_path / 'status_frota.json.lock').exists()
+
+
+def test_entrada_mais_nova_e_mantida(tmp_path):
+    base = str(tmp_path)
+    novo = _status('201')
+    status_frota.publicar_status(base, '201', novo)
+    status_frota.publicar_status(base, '201', _status('201', segundos_atras=30))
+
+    assert status_frota.ler_frota(base)['201']['timestamp'] == novo['timestamp']
+
+
+def test_online_confere_arquivo_da_maquina(tmp_path):
+    base = str(tmp_path)
+    status_frota.publicar_status(base, '201', _status('201'))
+    status_frota.publicar_status(base, '202', _status('202', segundos_atras=300))
+    # 202 e 203 publicaram só o próprio arquivo (a publicação no índice não conseguiu a trava)
+    for maquina in ('202', '203'):
+        (tmp_path / f'status_maq_{maquina}.json').write_text(json.dumps(_status(maquina)), encoding='utf-8')
+
+    assert sorted(status_frota.maquinas_online([base], idade_maxima=60)) == ['201', '202', '203']
+
+
+def test_mescla_preserva_outras_maquinas_e_descarta_antigas(tmp_path):
+    base = str(tmp_path)
+    status_frota.publicar_status(base, '201', _status('201'))
+    status_frota.publicar_status(base, '209', _status('209', segundos_atras=status_frota.IDADE_MAXIMA_ENTRADA + 60))
+    status_frota.publicar_status(base, '202', dict(_status('202'), comandos_executados=['x'] * 10))
+
+    frota = status_frota.ler_frota(base)
+
+    assert sorted(frota) == ['201', '202']
+    assert 'comandos_executados' not in frota['202']
+
+
+def test_sem_indice_le_os_arquivos_de_status(tmp_path):
+    (tmp_path / 'status_maq_205.json').write_text(json.dumps(_status('205', segundos_atras=600)), encoding='utf-8')
+    (tmp_path / 'status_maq_206.json').write_text('{quebrado', encoding='utf-8')
+
+    maquinas = status_frota.ler_status_maquinas(str(tmp_path))
+
+    # O heartbeat só renova a data do arquivo: ela vale como timestamp
+    assert list(maquinas) == ['205']
+    assert status_frota.idade_segundos(maquinas['205']) < 60
@@ -0,0 +1,52 @@
+"""Transmissão paralela: timeout por alvo e ordem dos resultados"""
+
+import threading
+import time
+
+from utils.transmissao import resumo_transmissao, transmitir
+
+
+def test_alvo_lento_vira_timeout_sem_segurar_os_demais():
+    liberar = threading.Event()
+
+    def enviar(maquina):
+        if maquina == '203':
+            liberar.wait(5)
+            return 'tarde'
+        if maquina == '204':
+            raise OSError('rede indisponível')
+        if maquina == '205':
+            return None
+        return f'cmd-{maquina}'
+
+    inicio = time.monotonic()
+    try:
+        resultados = transmitir(['201', '202', '203', '204', '205', '201'], enviar, timeout=0.2)
+    finally:
+        liberar.set()
+    duracao = time.monotonic() - inicio
+
+    assert duracao < 2.0
+    assert [r['maquina'] for r in resultados] == ['201', '202', '203', '204', '205']
+    assert [r['sucesso'] for r in resultados] == [True, True, False, False, False]
+    assert resultados[0]['retorno'] == 'cmd-201'
+    assert resultados[2]['erro'] == 'timeout (0.2s)'
+    assert resultados[2]['latencia_ms'] >= 200
+    assert resultados[3]['erro'] == 'rede indisponível'
+    assert resultados[4]['erro'] == 'falha no envio'
+    assert '2/5 enviados com sucesso' in resumo_transmissao(resultados)
+
+
+def test_timeout_conta_do_inicio_de_cada_envio():
+    # Um trabalhador só: o segundo alvo espera o primeiro sem que isso conte no prazo dele
+    def enviar(maquina):
+        time.sleep(0.15)
+        return True
+
+    resultados = transmitir(['201', '202'], enviar, timeout=0.25, max_trabalhadores=1)
+
+    assert all(r['sucesso'] for r in resultados)
+
+
+def test_sem_alvos():
+    assert transmitir([], lambda maquina: True) == []
@@ -0,0 +1,152 @@
+"""Caixa de comandos por máquina (spool) - comandos pendentes não se sobrescrevem
+
+Cada comando vira um arquivo próprio em <base>/comandos_maq_<N>/:
+    <timestamp em ns>-<id>.json
+
+O remetente grava um temporário (.tmp) na mesma pasta e renomeia com
+os.replace, então o leitor nunca encontra um JSON pela metade e dois comandos
+enviados no mesmo instante não se perdem. O arquivo único legado
+comando_maq_<N>.json continua sendo lido por compatibilidade.
+"""
+
+import json
+import os
+import time
+import uuid
+
+EXTENSAO = ".json"
+TEMPORARIO = ".tmp"
+
+# Arquivo legado ainda sendo escrito (sem rename atômico): espera o próximo evento
+JANELA_ESCRITA_LEGADO = 2.0
+
+
+def pasta_caixa(base, maquina):
+    """Pasta de spool da máquina dentro da base (rede ou local)"""
+    return os.path.join(base, f"comandos_maq_{maquina}")
+
+
+def arquivo_legado(base, maquina):
+    return os.path.join(base, f"comando_maq_{maquina}.json")
+
+
+def preparar_caixas(bases, maquina):
+    """Cria as pastas de spool nas bases acessíveis; retorna as pastas existentes"""
+    pastas = []
+    for base in bases:
+        try:
+            if os.path.isdir(base):
+                pasta = pasta_caixa(base, maquina)
+                os.makedirs(pasta, exist_ok=True)
+                pastas.append(pasta)
+        except OSError as e:
+            print(f"⚠️ Erro ao preparar caixa de comandos em {base}: {e}")
+    return pastas
+
+
+def depositar_comando(base, maquina, comando):
+    """Grava o comando na caixa da máquina (temporário + rename) e retorna o caminho final"""
+    pasta = pasta_caixa(base, maquina)
+    os.makedirs(pasta, exist_ok=True)
+
+    # Instante do envio (epoch) - base da latência de entrega no registro de resultado
+    comando.setdefault('enviado_em', time.time())
+    nome = f"{time.time_ns():020d}-{comando.get('id') or uuid.uuid4()}"
+    temporario = os.path.join(pasta, nome + TEMPORARIO)
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(comando, f, ensure_ascii=False)
+
+    final = os.path.join(pasta, nome + EXTENSAO)
+    os.replace(temporario, final)
+    return final
+
+
+def enviar_comando(maquina, comando, bases):
+    """Deposita o comando em cada base acessível
+
+    Returns:
+        Lista de caminhos gravados (vazia se nenhuma base aceitou)
+    """
+    gravados = []
+    for base in bases:
+        try:
+            if os.path.isdir(base):
+                gravados.append(depositar_comando(base, maquina, comando))
+        except Exception as e:
+            print(f"⚠️ Erro ao depositar comando em {base}: {e}")
+    return gravados
+
+
+def ler_pendentes(bases, maquina):
+    """Comandos pendentes da máquina em todas as bases, na ordem de execução
+
+    Args:
+        bases: Lista de (rotulo, caminho_base) - ex.: [('REDE', ...), ('LOCAL', ...)]
+
+    Returns:
+        Lista de (rotulo, caminho, comando) ordenada por prioridade (maior
+        primeiro) e chegada. `comando` é None para arquivo corrompido, que o
+        chamador deve remover.
+    """
+    pendentes = []
+    for rotulo, base in bases:
+        pasta = pasta_caixa(base, maquina)
+        try:
+            nomes = sorted(e.name for e in os.scandir(pasta) if e.is_file() and e.name.endswith(EXTENSAO))
+        except OSError:
+            nomes = []
+        for nome in nomes:
+            caminho = os.path.join(pasta, nome)
+            prefixo = nome.split('-', 1)[0]
+            try:
+                comando = _ler_json(caminho)
+            except FileNotFoundError:
+                continue  # Já consumido por outro leitor
+            pendentes.append((rotulo, caminho, int(prefixo) if prefixo.isdigit() else 0, comando))
+
+        legado = arquivo_legado(base, maquina)
+        try:
+            info = os.stat(legado)
+        except OSError:
+            continue
+        try:
+            comando = _ler_json(legado) if info.st_size > 0 else None
+        except FileNotFoundError:
+            continue
+        if comando is None and time.time() - info.st_mtime < JANELA_ESCRITA_LEGADO:
+            continue  # Remetente antigo ainda escrevendo - o evento de modificação acorda de novo
+        pendentes.append((rotulo, legado, info.st_mtime_ns, comando))
+
+    def ordem(item):
+        comando = item[3] or {}
+        try:
+            prioridade = float(comando.get('prioridade', 0))
+        except (TypeError, ValueError):
+            prioridade = 0
+        return (-prioridade, item[2])
+
+    pendentes.sort(key=ordem)
+    return [(rotulo, caminho, comando) for rotulo, caminho, _, comando in pendentes]
+
+
+def remover(caminho):
+    try:
+        os.remove(caminho)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        print(f"⚠️ Erro ao remover arquivo de comando {os.path.basename(caminho)}: {e}")
+        return False
+
+
+def _ler_json(caminho):
+    """Conteúdo do arquivo de comando, None se inválido (FileNotFoundError propaga)"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        return dados if isinstance(dados, dict) else None
+    except FileNotFoundError:
+        raise
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,276 @@
+"""Canal direto de comandos por TCP - alternativa ao arquivo no compartilhamento
+
+Protocolo: uma conexão TCP, um comando JSON por linha (UTF-8, terminado em
+"\\n"); para cada linha o receptor responde uma linha JSON:
+
+    -> {"id": "...", "acao": "coletar_dados", "parametros": {}, "destino": "201",
+        "enviado_em": 1700000000.0, "assinatura": "<hmac-sha256>"}
+    <- {"id": "...", "aceito": true, "maquina": "201"}
+
+"aceito" só confirma a entrega; execução e resultado seguem no registro de
+resultados_comandos/<id>.json, como no canal por arquivo. O coletor anuncia a
+porta no status (campo "porta_comandos"); sem ela, ou se a conexão falhar, o
+remetente usa o arquivo.
+
+Cada comando é assinado (HMAC-SHA256) com a chave em CHAVE_CANAL_FILE na pasta
+de rede: só quem lê o compartilhamento consegue enviar - a mesma confiança do
+canal por arquivo. Comando sem assinatura válida, fora de JANELA_ASSINATURA ou
+com id repetido é recusado; sem a chave o canal nem abre. Ações que executam
+programas ou mexem no sistema (ACOES_BLOQUEADAS) só chegam pelo arquivo.
+"""
+
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+
+from config.settings import CAMINHO_REDE, CAMINHO_LOCAL, PORTA_COMANDOS, CHAVE_CANAL_FILE
+from utils import status_frota
+
+TAMANHO_MAXIMO_LINHA = 1024 * 1024
+TIMEOUT_CONEXAO = 2.0
+STATUS_RECENTE = 60  # segundos - status mais velho que isso não serve para achar o IP
+JANELA_ASSINATURA = 120  # segundos - diferença aceita entre o envio e o recebimento (relógios)
+TAMANHO_MINIMO_CHAVE = 16
+
+# Nunca aceitas pelo canal direto (comando do sistema, reinício do processo, arquivos, tela)
+ACOES_BLOQUEADAS = frozenset({'executar_comando_sistema', 'reiniciar_app', 'limpar_cache', 'capturar_tela'})
+
+
+class _TratadorConexao(socketserver.StreamRequestHandler):
+    """Lê comandos linha a linha e responde a confirmação de cada um"""
+
+    def handle(self):
+        while True:
+            linha = self.rfile.readline(TAMANHO_MAXIMO_LINHA + 1)
+            if not linha:
+                return
+            if len(linha) > TAMANHO_MAXIMO_LINHA:
+                self._responder({'aceito': False, 'erro': 'linha muito grande'})
+                return
+            if not linha.strip():
+                continue
+
+            try:
+                comando = json.loads(linha.decode('utf-8'))
+                if not isinstance(comando, dict) or not comando.get('id') or not comando.get('acao'):
+                    raise ValueError("comando sem 'id' ou 'acao'")
+                self.server.validar(comando)
+                resposta = self.server.ao_receber(comando)
+            except Exception as e:
+                resposta = {'aceito': False, 'erro': str(e)}
+            self._responder(resposta)
+
+    def _responder(self, resposta):
+        self.wfile.write((json.dumps(resposta, ensure_ascii=False) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    # No Windows SO_REUSEADDR deixa dois processos escutarem a mesma porta
+    allow_reuse_address = os.name != 'nt'
+
+
+class ServidorComandos:
+    """Escuta comandos na porta configurada e repassa cada um para ao_receber(comando)
+
+    ao_receber roda na thread da conexão e deve apenas enfileirar o comando,
+    devolvendo o dict de resposta. Só comandos assinados com a chave
+    compartilhada chegam até ele (ver validar).
+    """
+
+    def __init__(self, ao_receber, porta=PORTA_COMANDOS, host="0.0.0.0", chave=None):
+        self.ao_receber = ao_receber
+        self.porta = porta
+        self.host = host
+        self.chave = chave
+        self._servidor = None
+        self._thread = None
+        self._vistos = {}  # id -> instante em que sai da janela (contra reenvio do mesmo comando)
+        self._lock_vistos = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self._servidor is not None
+
+    def iniciar(self):
+        """Abre a porta; False (e segue só com arquivos) se ela estiver ocupada/bloqueada"""
+        if self._servidor is not None:
+            return True
+        if self.chave is None:
+            self.chave = ler_chave()
+        if self.chave is None:
+            print(f"⚠️ Canal direto de comandos desligado: chave {CHAVE_CANAL_FILE} ausente na pasta de rede")
+            return False
+        try:
+            servidor = _ServidorTCP((self.host, self.porta), _TratadorConexao)
+        except OSError as e:
+            print(f"⚠️ Canal direto de comandos indisponível (porta {self.porta}): {e}")
+            return False
+
+        servidor.ao_receber = self.ao_receber
+        servidor.validar = self.validar
+        self.porta = servidor.server_address[1]  # Porta 0: a escolhida pelo sistema
+        self._servidor = servidor
+        self._thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"🔌 Canal direto de comandos escutando em {self.host}:{self.porta}")
+        return True
+
+    def parar(self):
+        if self._servidor is None:
+            return
+        try:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+        except Exception as e:
+            print(f"⚠️ Erro ao fechar canal direto: {e}")
+        self._servidor = None
+
+    def validar(self, comando):
+        """Confere ação, assinatura, idade e ineditismo do comando
+
+        Raises:
+            ValueError: comando recusado (o motivo vai na resposta)
+        """
+        if comando.get('acao') in ACOES_BLOQUEADAS:
+            raise ValueError(f"ação '{comando['acao']}' só é aceita pelo arquivo de comando")
+        if not hmac.compare_digest(str(comando.get('assinatura', '')), assinar(comando, self.chave)):
+            raise ValueError("assinatura inválida")
+        try:
+            idade = time.time() - float(comando.get('enviado_em'))
+        except (TypeError, ValueError):
+            raise ValueError("comando sem 'enviado_em'")
+        if abs(idade) > JANELA_ASSINATURA:
+            raise ValueError("comando fora da janela de validade")
+
+        agora = time.monotonic()
+        with self._lock_vistos:
+            for id_visto in [i for i, expira in self._vistos.items() if expira < agora]:
+                del self._vistos[id_visto]
+            if comando['id'] in self._vistos:
+                raise ValueError("comando repetido")
+            self._vistos[comando['id']] = agora + 2 * JANELA_ASSINATURA
+
+
+def ler_chave(base=None):
+    """Chave compartilhada do canal direto (bytes) ou None se ausente/curta demais"""
+    try:
+        with open(os.path.join(base or CAMINHO_REDE, CHAVE_CANAL_FILE), 'rb') as f:
+            chave = f.read().strip()
+    except OSError:
+        return None
+    return chave if len(chave) >= TAMANHO_MINIMO_CHAVE else None
+
+
+def gerar_chave(base=None):
+    """Cria a chave compartilhada na pasta (se ainda não existir) e devolve a chave em uso"""
+    base = base or CAMINHO_REDE
+    try:
+        descritor = os.open(os.path.join(base, CHAVE_CANAL_FILE), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(descritor, 'w', encoding='ascii') as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    return ler_chave(base)
+
+
+def assinar(comando, chave):
+    """HMAC-SHA256 (hex) do comando sem o campo 'assinatura'"""
+    conteudo = {k: v for k, v in comando.items() if k != 'assinatura'}
+    texto = json.dumps(conteudo, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hmac.new(chave, texto.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def enviar_comando_socket(host, comando, porta=PORTA_COMANDOS, timeout=TIMEOUT_CONEXAO, chave=None):
+    """Assina e envia um comando; devolve a resposta do receptor (dict)
+
+    Args:
+        chave: Chave compartilhada (None = lida da pasta de rede)
+
+    Raises:
+        OSError: conexão recusada/timeout; ValueError: resposta inválida ou sem chave
+    """
+    chave = chave if chave is not None else ler_chave()
+    if chave is None:
+        raise ValueError(f"chave {CHAVE_CANAL_FILE} ausente")
+    comando = dict(comando)
+    comando.setdefault('enviado_em', time.time())
+    comando['assinatura'] = assinar(comando, chave)
+
+    with socket.create_connection((host, porta), timeout=timeout) as conexao:
+        conexao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conexao.sendall((json.dumps(comando, ensure_ascii=False) + "\n").encode('utf-8'))
+        with conexao.makefile('rb') as f:
+            linha = f.readline(TAMANHO_MAXIMO_LINHA)
+
+    if not linha:
+        raise ConnectionError("conexão encerrada sem resposta")
+    resposta = json.loads(linha.decode('utf-8'))
+    if not isinstance(resposta, dict):
+        raise ValueError("resposta inválida")
+    return resposta
+
+
+def endereco_maquina(maquina, status=None):
+    """(ip, porta) anunciados no status recente da máquina, ou None
+
+    Args:
+        status: Status da máquina já lido (evita reler o índice da frota)
+    """
+    if status is None:
+        status = _ler_status(maquina)
+    if not status or not status.get('porta_comandos') or not status.get('ip'):
+        return None
+
+    try:
+        idade = (datetime.datetime.now() - datetime.datetime.fromisoformat(status['timestamp'])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return None
+    if idade > STATUS_RECENTE:
+        return None
+
+    return status['ip'], int(status['porta_comandos'])
+
+
+def enviar_direto(maquina, comando, status=None, timeout=TIMEOUT_CONEXAO):
+    """Tenta entregar o comando pelo canal direto
+
+    Returns:
+        True se a máquina aceitou; False se não há canal anunciado ou a entrega
+        falhou - o chamador usa o arquivo de comando.
+    """
+    if comando.get('acao') in ACOES_BLOQUEADAS:
+        return False
+    endereco = endereco_maquina(maquina, status)
+    if endereco is None:
+        return False
+
+    comando.setdefault('enviado_em', time.time())
+    comando.setdefault('destino', str(maquina))
+    try:
+        resposta = enviar_comando_socket(endereco[0], comando, endereco[1], timeout)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Canal direto indisponível para {maquina} ({endereco[0]}:{endereco[1]}): {e}")
+        return False
+
+    if not resposta.get('aceito'):
+        print(f"⚠️ Máquina {maquina} recusou o comando pelo canal direto: {resposta.get('erro', '')}")
+        return False
+    return True
+
+
+def _ler_status(maquina):
+    # Índice da frota: o timestamp do status_maq_<N>.json só muda quando o estado muda
+    for base in (CAMINHO_REDE, CAMINHO_LOCAL):
+        status = status_frota.ler_status_maquinas(base).get(str(maquina))
+        if status:
+            return status
+    return None
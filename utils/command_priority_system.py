@@ -6,11 +6,15 @@ Garante que comandos do desenvolvedor sejam executados com prioridade máxima
 import os
 import json
 import uuid
+import heapq
+import itertools
 import datetime
 import threading
 import time
 from typing import Dict, List, Optional, Callable
 from config.settings import CAMINHO_REDE, CAMINHO_LOCAL
+from utils.observador_arquivos import ObservadorComandos
+from utils import caixa_comandos
 
 class CommandPrioritySystem:
     """Sistema de prioridade para comandos remotos"""
@@ -21,13 +25,24 @@ class CommandPrioritySystem:
     PRIORIDADE_COORDENADOR = 10
     PRIORIDADE_DESENVOLVEDOR = 100  # MÁXIMA PRIORIDADE
     
+    # Pool de execução: trabalhadores gerais pegam qualquer comando por ordem de
+    # prioridade; os reservados só pegam comandos do desenvolvedor, que assim
+    # não esperam um capturar_tela/fazer_backup demorado terminar
+    TRABALHADORES_GERAIS = 2
+    TRABALHADORES_DESENVOLVEDOR = 1
+    
     def __init__(self, maquina_id: str):
         self.maquina_id = str(maquina_id)
-        self.comando_atual = None
-        self.fila_comandos = []
-        self.executando = False
+        self.fila_comandos = []          # heap de (-prioridade, sequência, comando)
+        self.em_execucao = {}            # ident da thread -> comando
         self.thread_monitor = None
+        self.trabalhadores = []
         self.parar_monitor = False
+        self._sequencia = itertools.count()  # Desempate estável: ordem de chegada
+        
+        # Fila protegida por condição: os trabalhadores dormem até alguém enfileirar
+        self._condicao = threading.Condition()
+        self._lock_status = threading.Lock()
         
         # Callbacks para execução
         self.callbacks = {}
@@ -35,82 +50,122 @@ class CommandPrioritySystem:
         # Arquivos de comando
         self.arquivo_comando_rede = os.path.join(CAMINHO_REDE, f"comando_maq_{self.maquina_id}.json")
         self.arquivo_comando_local = os.path.join(CAMINHO_LOCAL, f"comando_maq_{self.maquina_id}.json")
-        self.arquivo_status = os.path.join(CAMINHO_LOCAL, f"status_maq_{self.maquina_id}.json")
+        # Status da fila em arquivo próprio: status_maq_<N>.json é do envio de status da
+        # comunicação (schema e cadência próprios - heartbeat só renova a data dele)
+        self.arquivo_status = os.path.join(CAMINHO_LOCAL, f"status_fila_{self.maquina_id}.json")
+        self.arquivo_status_rede = os.path.join(CAMINHO_REDE, f"status_fila_{self.maquina_id}.json")
+        caixa_comandos.preparar_caixas([CAMINHO_REDE, CAMINHO_LOCAL], self.maquina_id)
+        self.observador = ObservadorComandos(
+            [CAMINHO_REDE, CAMINHO_LOCAL],
+            [f"comando_maq_{self.maquina_id}.json"],
+            [caixa_comandos.pasta_caixa(base, self.maquina_id) for base in (CAMINHO_REDE, CAMINHO_LOCAL)]
+        )
         
         # Log de comandos executados
         self.log_comandos = []
         
         print(f"🎯 Sistema de Prioridade iniciado para máquina {self.maquina_id}")
     
+    @property
+    def executando(self) -> bool:
+        """True se algum trabalhador está executando comando"""
+        return bool(self.em_execucao)
+    
+    @property
+    def comando_atual(self) -> Optional[Dict]:
+        """Comando em execução de maior prioridade (ou None)"""
+        comandos = list(self.em_execucao.values())
+        return max(comandos, key=lambda c: c['prioridade']) if comandos else None
+    
     def iniciar_monitoramento(self):
         """Inicia monitoramento contínuo de comandos"""
         if self.thread_monitor and self.thread_monitor.is_alive():
             return
         
         self.parar_monitor = False
+        self.observador.iniciar()
         self.thread_monitor = threading.Thread(target=self._loop_monitoramento, daemon=True)
         self.thread_monitor.start()
         
-        print(f"🔄 Monitoramento de comandos iniciado (verificação a cada 1ms)")
+        self.trabalhadores = [
+            threading.Thread(target=self._loop_execucao, args=(reservado,), daemon=True)
+            for reservado in [False] * self.TRABALHADORES_GERAIS + [True] * self.TRABALHADORES_DESENVOLVEDOR
+        ]
+        for trabalhador in self.trabalhadores:
+            trabalhador.start()
+        
+        print(f"🔄 Monitoramento de comandos iniciado ({self.observador.modo}, "
+              f"{len(self.trabalhadores)} trabalhadores)")
     
     def parar_monitoramento(self):
         """Para monitoramento de comandos"""
         self.parar_monitor = True
-        if self.thread_monitor:
-            self.thread_monitor.join(timeout=1)
+        self.observador.parar()
+        with self._condicao:
+            self._condicao.notify_all()
+        for thread in [self.thread_monitor] + self.trabalhadores:
+            if thread:
+                thread.join(timeout=1)
         
         print(f"⏹️ Monitoramento de comandos parado")
     
     def _loop_monitoramento(self):
-        """Loop principal de monitoramento (1ms)"""
+        """Lê os arquivos de comando quando o observador acusa que apareceram"""
         while not self.parar_monitor:
             try:
-                # Verificar novos comandos
-                self._verificar_novos_comandos()
-                
-                # Processar fila de comandos
-                self._processar_fila_comandos()
+                if self.observador.aguardar(timeout=1.0) and not self.parar_monitor:
+                    self._verificar_novos_comandos()
+            except Exception as e:
+                print(f"❌ Erro no observador de comandos: {e}")
+                time.sleep(0.1)  # Aguardar mais em caso de erro
+    
+    def _loop_execucao(self, reservado: bool):
+        """Trabalhador do pool - dorme na condição até haver comando da sua faixa"""
+        while not self.parar_monitor:
+            try:
+                with self._condicao:
+                    while not self.parar_monitor and not self._tem_comando_para(reservado):
+                        self._condicao.wait()
+                    if self.parar_monitor:
+                        break
+                    
+                    # Pegar comando de maior prioridade
+                    _, _, comando = heapq.heappop(self.fila_comandos)
+                    self.em_execucao[threading.get_ident()] = comando
                 
-                # Aguardar 1ms (1000 verificações por segundo)
-                time.sleep(0.001)
+                self._executar_comando(comando)
                 
             except Exception as e:
-                print(f"❌ Erro no monitoramento: {e}")
+                print(f"❌ Erro no trabalhador de comandos: {e}")
                 time.sleep(0.1)  # Aguardar mais em caso de erro
     
+    def _tem_comando_para(self, reservado: bool) -> bool:
+        """Há comando na fila que este trabalhador pode pegar? (chamar com a condição)"""
+        if not self.fila_comandos:
+            return False
+        return not reservado or -self.fila_comandos[0][0] >= self.PRIORIDADE_DESENVOLVEDOR
+    
     def _verificar_novos_comandos(self):
-        """Verifica se há novos comandos (rede e local)"""
-        comandos_encontrados = []
+        """Verifica se há novos comandos (caixa de spool e arquivo legado, rede e local)"""
+        pendentes = caixa_comandos.ler_pendentes([('REDE', CAMINHO_REDE), ('LOCAL', CAMINHO_LOCAL)], self.maquina_id)
         
-        # Verificar comando na rede (prioridade)
-        if os.path.exists(self.arquivo_comando_rede):
+        for origem, arquivo, dados in pendentes:
             try:
-                comando = self._ler_comando(self.arquivo_comando_rede)
-                if comando:
-                    comandos_encontrados.append(comando)
-                    os.remove(self.arquivo_comando_rede)  # Remove após ler
-            except Exception as e:
-                print(f"⚠️ Erro ao ler comando da rede: {e}")
-        
-        # Verificar comando local (fallback)
-        if os.path.exists(self.arquivo_comando_local):
-            try:
-                comando = self._ler_comando(self.arquivo_comando_local)
+                comando = self._ler_comando(dados)
+                caixa_comandos.remover(arquivo)  # Remove após ler (inválidos também)
+                
+                # Adicionar comando à fila com prioridade
                 if comando:
-                    comandos_encontrados.append(comando)
-                    os.remove(self.arquivo_comando_local)  # Remove após ler
+                    self._adicionar_comando_fila(comando)
             except Exception as e:
-                print(f"⚠️ Erro ao ler comando local: {e}")
-        
-        # Adicionar comandos à fila com prioridade
-        for comando in comandos_encontrados:
-            self._adicionar_comando_fila(comando)
+                print(f"⚠️ Erro ao ler comando ({origem}): {e}")
     
-    def _ler_comando(self, arquivo: str) -> Optional[Dict]:
-        """Lê comando de arquivo JSON"""
+    def _ler_comando(self, comando: Optional[Dict]) -> Optional[Dict]:
+        """Valida o comando lido do arquivo e define sua prioridade"""
         try:
-            with open(arquivo, 'r', encoding='utf-8') as f:
-                comando = json.load(f)
+            if comando is None:
+                print(f"⚠️ Comando inválido: JSON corrompido")
+                return None
             
             # Validar estrutura básica
             if not all(key in comando for key in ['id', 'acao', 'timestamp']):
@@ -144,42 +199,25 @@ class CommandPrioritySystem:
     def _adicionar_comando_fila(self, comando: Dict):
         """Adiciona comando à fila respeitando prioridade"""
         
-        # Se for comando de desenvolvedor, interromper comando atual se necessário
-        if comando['prioridade'] == self.PRIORIDADE_DESENVOLVEDOR:
-            if self.comando_atual and self.comando_atual['prioridade'] < self.PRIORIDADE_DESENVOLVEDOR:
-                print(f"🚨 COMANDO DESENVOLVEDOR: Interrompendo comando atual para execução prioritária")
-                self.comando_atual['interrompido'] = True
-        
-        # Inserir na fila mantendo ordem de prioridade
-        inserido = False
-        for i, cmd_fila in enumerate(self.fila_comandos):
-            if comando['prioridade'] > cmd_fila['prioridade']:
-                self.fila_comandos.insert(i, comando)
-                inserido = True
-                break
-        
-        if not inserido:
-            self.fila_comandos.append(comando)
+        with self._condicao:
+            # Se for comando de desenvolvedor, sinalizar os comandos em execução de menor prioridade
+            if comando['prioridade'] == self.PRIORIDADE_DESENVOLVEDOR:
+                for em_curso in self.em_execucao.values():
+                    if em_curso['prioridade'] < self.PRIORIDADE_DESENVOLVEDOR:
+                        print(f"🚨 COMANDO DESENVOLVEDOR: Interrompendo comando atual para execução prioritária")
+                        em_curso['interrompido'] = True
+            
+            # Heap por prioridade (maior primeiro); a sequência mantém a ordem de chegada nos empates
+            heapq.heappush(self.fila_comandos, (-comando['prioridade'], next(self._sequencia), comando))
+            
+            # Acorda todos: o reservado ao desenvolvedor só serve se for a vez dele
+            self._condicao.notify_all()
         
         print(f"📥 Comando adicionado à fila: {comando['acao']} (Prioridade: {comando['prioridade']})")
         print(f"📋 Fila atual: {len(self.fila_comandos)} comandos")
     
-    def _processar_fila_comandos(self):
-        """Processa comandos da fila por ordem de prioridade"""
-        if self.executando or not self.fila_comandos:
-            return
-        
-        # Pegar comando de maior prioridade
-        comando = self.fila_comandos.pop(0)
-        
-        # Executar comando
-        self._executar_comando(comando)
-    
     def _executar_comando(self, comando: Dict):
-        """Executa comando específico"""
-        self.executando = True
-        self.comando_atual = comando
-        
+        """Executa comando específico (na thread do trabalhador que o retirou da fila)"""
         inicio = time.time()
         
         try:
@@ -211,19 +249,19 @@ class CommandPrioritySystem:
             comando['tempo_execucao'] = fim - inicio
             comando['executado_em'] = datetime.datetime.now().isoformat()
             
-            # Adicionar ao log
-            self.log_comandos.append(comando)
-            
-            # Manter apenas últimos 100 comandos no log
-            if len(self.log_comandos) > 100:
-                self.log_comandos = self.log_comandos[-100:]
+            with self._condicao:
+                # Adicionar ao log
+                self.log_comandos.append(comando)
+                
+                # Manter apenas últimos 100 comandos no log
+                if len(self.log_comandos) > 100:
+                    self.log_comandos = self.log_comandos[-100:]
+                
+                self.em_execucao.pop(threading.get_ident(), None)
             
             # Atualizar status
             self._atualizar_status_sistema()
             
-            self.executando = False
-            self.comando_atual = None
-            
             print(f"⏱️ Comando finalizado em {comando['tempo_execucao']:.3f}s")
     
     def _atualizar_status_sistema(self):
@@ -234,22 +272,24 @@ class CommandPrioritySystem:
                 'timestamp': datetime.datetime.now().isoformat(),
                 'comandos_na_fila': len(self.fila_comandos),
                 'executando': self.executando,
+                'comandos_em_execucao': len(self.em_execucao),
                 'ultimo_comando': self.log_comandos[-1] if self.log_comandos else None,
                 'total_comandos_executados': len(self.log_comandos),
                 'sistema_ativo': True
             }
             
-            # Salvar status local
-            with open(self.arquivo_status, 'w', encoding='utf-8') as f:
-                json.dump(status, f, indent=2, ensure_ascii=False)
-            
-            # Tentar salvar na rede também
-            try:
-                arquivo_status_rede = os.path.join(CAMINHO_REDE, f"status_maq_{self.maquina_id}.json")
-                with open(arquivo_status_rede, 'w', encoding='utf-8') as f:
+            # Trabalhadores terminam em paralelo: um arquivo gravado por vez
+            with self._lock_status:
+                # Salvar status local
+                with open(self.arquivo_status, 'w', encoding='utf-8') as f:
                     json.dump(status, f, indent=2, ensure_ascii=False)
-            except:
-                pass  # Falha silenciosa na rede
+                
+                # Tentar salvar na rede também
+                try:
+                    with open(self.arquivo_status_rede, 'w', encoding='utf-8') as f:
+                        json.dump(status, f, indent=2, ensure_ascii=False)
+                except:
+                    pass  # Falha silenciosa na rede
                 
         except Exception as e:
             print(f"⚠️ Erro ao atualizar status: {e}")
@@ -288,6 +328,7 @@ class CommandPrioritySystem:
             'maquina_id': self.maquina_id,
             'executando': self.executando,
             'comando_atual': self.comando_atual,
+            'em_execucao': len(self.em_execucao),
             'fila_comandos': len(self.fila_comandos),
             'total_executados': len(self.log_comandos),
             'ultimos_comandos': self.log_comandos[-5:] if self.log_comandos else []
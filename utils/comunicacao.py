@@ -1,22 +1,46 @@
-"""Sistema de Comunicação em Tempo Real - 1ms"""
+"""Sistema de Comunicação em Tempo Real - comandos por evento de arquivo"""
 
 import threading
 import time
+import collections
 import os
 import json
 import datetime
-import uuid
 import socket
 import psutil
 import tkinter as tk
-from tkinter import messagebox
-from config.settings import CAMINHO_REDE
+from config.settings import (CAMINHO_REDE, CANAL_SOCKET_ATIVO, PORTA_COMANDOS,
+                             INTERVALO_HEARTBEAT, INTERVALO_STATUS_COMPLETO)
 from utils.machine_id import gerar_id_computador_avancado
+from utils.observador_arquivos import ObservadorComandos
+from utils import caixa_comandos
+from utils import resultado_comandos
+from utils import status_frota
+from utils.canal_socket import ServidorComandos
 
 
 class SistemaComunicacao:
     """Sistema de comunicação em tempo real entre máquinas"""
     
+    INTERVALO_STATUS = 1.0  # segundos
+    INTERVALO_METRICAS = 10.0   # CPU/memória/disco amostrados em cadência própria
+    INTERVALO_REDE_LOCAL = 60.0  # hostname/IP relidos (DHCP pode trocar o IP)
+    
+    # Campos que mudam a todo envio e não contam como mudança de estado
+    CAMPOS_VOLATEIS = ('timestamp', 'ultima_acao', 'recursos')
+    
+    # Ações aceitas (método _comando_<acao>); as que mexem na interface rodam na thread do Tk
+    ACOES = (
+        'fechar_app', 'abrir_app', 'reiniciar_app', 'alterar_size', 'alterar_lote',
+        'alterar_configuracao_maquina', 'coletar_dados', 'fazer_backup',
+        'coletar_informacoes_sistema', 'executar_comando_sistema', 'testar_conectividade',
+        'obter_logs', 'diagnostico_completo', 'limpar_cache', 'capturar_tela',
+    )
+    ACOES_INTERFACE = (
+        'fechar_app', 'abrir_app', 'reiniciar_app', 'alterar_size', 'alterar_lote',
+        'alterar_configuracao_maquina',
+    )
+    
     def __init__(self):
         self.comandos_ativos = {}
         self.thread_comandos = None
@@ -27,6 +51,17 @@ class SistemaComunicacao:
         self.machine_config = None
         self.batch_config = None
         self.data_manager = None
+        self.maquina_atual = None
+        self.observador = None
+        self.servidor_socket = None
+        self.estado_publicado = None  # Último documento completo publicado (sem campos voláteis)
+        self.tamanho_publicado = 0    # Bytes desse documento - outro tamanho no arquivo = conteúdo alheio
+        self.proximo_status_completo = 0.0
+        self.proximo_heartbeat = 0.0
+        self.metricas = None
+        self.proximas_metricas = 0.0
+        self._rede_local = None  # (hostname, ip, validade)
+        self.fila_socket = collections.deque()  # Comandos recebidos pelo canal direto
         
     def set_root_reference(self, root):
         """Define referência para a janela principal"""
@@ -62,12 +97,25 @@ class SistemaComunicacao:
         else:
             print(f"❌ SEM acesso local: {CAMINHO_LOCAL}")
             
+        self.observador = ObservadorComandos([CAMINHO_REDE, CAMINHO_LOCAL])
+        self._atualizar_maquina_atual()
+        
+        # Canal direto (TCP) opcional - os arquivos continuam valendo
+        if CANAL_SOCKET_ATIVO:
+            self.servidor_socket = ServidorComandos(self._receber_comando_socket, PORTA_COMANDOS)
+            if not self.servidor_socket.iniciar():
+                self.servidor_socket = None
+        
+        # Registros de ack/resultado de dias anteriores
+        for base in (CAMINHO_REDE, CAMINHO_LOCAL):
+            resultado_comandos.limpar_antigos(base)
+        
         self.executando_comandos = True
         self.thread_comandos = threading.Thread(target=self._loop_comunicacao, daemon=True)
         self.thread_comandos.start()
         
         print("🔗 Sistema de comunicação INICIADO!")
-        print("⚡ Verificação de comandos: CADA 1ms (1000x por segundo)")
+        print("⚡ Verificação de comandos: ao chegar o arquivo (evento de sistema de arquivos)")
         print("📊 Envio de status: CADA 1 segundo")
         print("🎯 PRONTO para receber e executar comandos remotos!")
         
@@ -75,6 +123,11 @@ class SistemaComunicacao:
         """Para sistema de comunicação"""
         print("🛑 PARANDO sistema de comunicação...")
         self.executando_comandos = False
+        if self.servidor_socket:
+            self.servidor_socket.parar()
+            self.servidor_socket = None
+        if self.observador:
+            self.observador.parar()  # Acorda a thread que está aguardando
         
         # Aguardar thread terminar
         if self.thread_comandos and self.thread_comandos.is_alive():
@@ -91,27 +144,65 @@ class SistemaComunicacao:
             'ultimo_status': self.ultimo_status.get('timestamp', 'Nunca') if self.ultimo_status else 'Nunca'
         }
         
+    def _atualizar_maquina_atual(self):
+        """Relê a máquina configurada (cache usado pela verificação de comandos)"""
+        if not self.machine_config:
+            return self.maquina_atual
+        try:
+            from config.settings import CAMINHO_LOCAL
+            maquina = self.machine_config.obter_configuracao_maquina()
+            if maquina != self.maquina_atual:
+                caixa_comandos.preparar_caixas([CAMINHO_REDE, CAMINHO_LOCAL], maquina)
+            self.maquina_atual = maquina
+            if self.observador:
+                # Arquivo legado + pastas de spool (comandos_maq_<N>/) na rede e local
+                self.observador.definir_nomes([f"comando_maq_{maquina}.json"])
+                self.observador.definir_caixas([caixa_comandos.pasta_caixa(base, maquina)
+                                                for base in (CAMINHO_REDE, CAMINHO_LOCAL)])
+        except Exception as e:
+            print(f"⚠️ Erro ao ler máquina configurada: {e}")
+        return self.maquina_atual
+        
     def _loop_comunicacao(self):
-        """Loop principal de comunicação - VERIFICA COMANDOS A CADA 1ms (1000x/segundo)"""
-        contador = 0
+        """Loop principal de comunicação - dorme até chegar comando ou vencer o envio de status"""
         contador_status = 0
         contador_comandos_verificados = 0
         contador_comandos_executados = 0
         
-        print("🚀 INICIANDO LOOP DE COMUNICAÇÃO ULTRA-RÁPIDO (1ms)")
-        print("📡 Verificando comandos a cada 1 milissegundo")
-        print("📊 Enviando status a cada 1 segundo")
+        print("🚀 INICIANDO LOOP DE COMUNICAÇÃO POR EVENTOS")
+        self.observador.iniciar()
+        print(f"📡 Comandos: {self.observador.modo}")
+        print(f"📊 Enviando status a cada {self.INTERVALO_STATUS:.0f} segundo")
         
         # Log para arquivo também
         try:
             from utils.logger_executavel import log_info
-            log_info("Sistema de comunicação iniciado - Loop ultra-rápido (1ms)")
+            log_info(f"Sistema de comunicação iniciado - comandos por {self.observador.modo}")
         except:
             pass
         
+        proximo_status = time.monotonic()
+        
         while self.executando_comandos:
             try:
-                # VERIFICAR COMANDOS A CADA 1ms (PRIORIDADE MÁXIMA)
+                # ENVIAR STATUS A CADA 1s (e atualizar a máquina em cache)
+                if time.monotonic() >= proximo_status:
+                    self._atualizar_maquina_atual()
+                    self._enviar_status_maquina()
+                    contador_status += 1
+                    proximo_status = time.monotonic() + self.INTERVALO_STATUS
+                    
+                    # Log detalhado a cada 30 envios (30 segundos)
+                    if contador_status % 30 == 0:
+                        print(f"🔗 COMUNICAÇÃO ATIVA:")
+                        print(f"   📊 Status enviado {contador_status}x")
+                        print(f"   🔍 Verificações de comando: {contador_comandos_verificados}")
+                        print(f"   ⚡ Comandos executados: {contador_comandos_executados}")
+                
+                # Dorme até o arquivo de comando aparecer (ou até o próximo status)
+                if not self.observador.aguardar(timeout=max(0.0, proximo_status - time.monotonic())):
+                    continue
+                
                 comando_executado = self._verificar_comandos()
                 contador_comandos_verificados += 1
                 
@@ -119,52 +210,37 @@ class SistemaComunicacao:
                     contador_comandos_executados += 1
                     print(f"⚡ COMANDO EXECUTADO! Total executados: {contador_comandos_executados}")
                 
-                # ENVIAR STATUS A CADA 1000ms (1 segundo) para não sobrecarregar
-                if contador % 1000 == 0:
-                    self._enviar_status_maquina()
-                    contador_status += 1
-                
-                # Sleep mínimo para verificação ultra-rápida
-                time.sleep(0.001)  # 1ms - VERIFICAÇÃO ULTRA RÁPIDA
-                contador += 1
-                
-                # Log detalhado a cada 30000 iterações (30 segundos)
-                if contador % 30000 == 0:
-                    print(f"🔗 COMUNICAÇÃO ATIVA:")
-                    print(f"   ⏱️  {contador} verificações (1ms cada) = {contador/1000:.1f}s ativo")
-                    print(f"   📊 Status enviado {contador_status}x")
-                    print(f"   🔍 Comandos verificados: {contador_comandos_verificados}")
-                    print(f"   ⚡ Comandos executados: {contador_comandos_executados}")
-                    print(f"   🎯 Taxa execução: {(contador_comandos_executados/contador_comandos_verificados*100):.4f}%")
-                
             except Exception as e:
                 print(f"⚠️ Erro no loop comunicação: {e}")
                 # Continuar mesmo com erro, mas com delay maior
                 time.sleep(0.005)  # 5ms em caso de erro
                 
     def _enviar_status_maquina(self):
-        """Envia status da máquina para rede E local"""
+        """Envia status da máquina para rede E local
+        
+        Chamado a cada INTERVALO_STATUS, mas só regrava status_maq_<N>.json quando
+        o estado muda; sem mudança, a cada INTERVALO_HEARTBEAT apenas renova a data
+        de modificação dos arquivos (sinal de vida sem reescrever o conteúdo) e a
+        entrada da máquina no índice da frota.
+        """
         if not self.machine_config or not self.batch_config or not self.data_manager:
             return
             
         try:
-            MAQUINA_ATUAL = self.machine_config.obter_configuracao_maquina()
+            # Tudo em cache: máquina (relida pelo loop), configs (invalidadas por mtime),
+            # ID do computador (uma vez por processo), hostname/IP e métricas (cadência própria)
+            MAQUINA_ATUAL = self.maquina_atual or self.machine_config.obter_configuracao_maquina()
             CONFIG_SIZE = self.machine_config.obter_configuracao_size()
             config_lote = self.batch_config.obter_configuracao_lote()
             
-            from utils.machine_id import gerar_id_computador_avancado
             from config.settings import CAMINHO_LOCAL
             ID_COMPUTADOR = gerar_id_computador_avancado()
+            hostname, ip = self._obter_rede_local()
             
             # Arquivos de status (rede E local)
             status_file_rede = os.path.join(CAMINHO_REDE, f"status_maq_{MAQUINA_ATUAL}.json")
             status_file_local = os.path.join(CAMINHO_LOCAL, f"status_maq_{MAQUINA_ATUAL}.json")
             
-            # Verificar recursos do sistema
-            cpu_percent = psutil.cpu_percent()
-            mem_percent = psutil.virtual_memory().percent
-            disk_percent = psutil.disk_usage('/').percent
-            
             status_data = {
                 'maquina': MAQUINA_ATUAL,
                 'id_computador': ID_COMPUTADOR,
@@ -178,82 +254,143 @@ class SistemaComunicacao:
                 'caixa_atual': config_lote.get('caixa_atual', 0),
                 'total_caixas': config_lote.get('total_caixas', 0),
                 'caixas_registradas': config_lote.get('caixas_registradas', 0),
-                'recursos': {
-                    'cpu': cpu_percent,
-                    'memoria': mem_percent,
-                    'disco': disk_percent
-                },
+                'recursos': self._obter_metricas(),
                 'comandos_executados': self.comandos_executados[-10:],
-                'hostname': socket.gethostname(),
-                'ip': self._obter_ip_local(),
+                'hostname': hostname,
+                'ip': ip,
                 'versao': '1.0',
+                'porta_comandos': self.servidor_socket.porta if self.servidor_socket else None,
                 'online': True
             }
             
-            # Salvar SEMPRE localmente (para descoberta de máquinas)
-            try:
-                with open(status_file_local, 'w', encoding='utf-8') as f:
-                    json.dump(status_data, f, indent=2, ensure_ascii=False)
-            except Exception as e:
-                print(f"⚠️ Erro salvar status local: {e}")
+            estado = {k: v for k, v in status_data.items() if k not in self.CAMPOS_VOLATEIS}
+            agora = time.monotonic()
+            completo = estado != self.estado_publicado or agora >= self.proximo_status_completo
             
-            # Tentar enviar para rede também
-            try:
-                if os.path.exists(CAMINHO_REDE):
-                    with open(status_file_rede, 'w', encoding='utf-8') as f:
-                        json.dump(status_data, f, indent=2, ensure_ascii=False)
-            except:
-                pass
+            if completo:
+                # Serializado uma vez, compacto, e gravado nos dois destinos
+                conteudo = json.dumps(status_data, ensure_ascii=False, separators=(',', ':'))
+                self.tamanho_publicado = len(conteudo.encode('utf-8'))
+                
+                # Salvar SEMPRE localmente (para descoberta de máquinas)
+                try:
+                    with open(status_file_local, 'w', encoding='utf-8') as f:
+                        f.write(conteudo)
+                except Exception as e:
+                    print(f"⚠️ Erro salvar status local: {e}")
+                
+                # Tentar enviar para rede também
+                try:
+                    if os.path.exists(CAMINHO_REDE):
+                        with open(status_file_rede, 'w', encoding='utf-8') as f:
+                            f.write(conteudo)
+                except:
+                    pass
+                
+                self.estado_publicado = estado
+                self.proximo_status_completo = agora + INTERVALO_STATUS_COMPLETO
+            
+            if completo or agora >= self.proximo_heartbeat:
+                if not completo:
+                    self._renovar_status([status_file_local, status_file_rede])
+                
+                # Índice da frota (um arquivo para todas as máquinas): sinal de vida dos monitores
+                for base in (CAMINHO_REDE, CAMINHO_LOCAL):
+                    status_frota.publicar_status(base, MAQUINA_ATUAL, status_data)
+                self.proximo_heartbeat = agora + INTERVALO_HEARTBEAT
                 
             self.ultimo_status = status_data
             
         except Exception as e:
             print(f"⚠️ Erro enviar status: {e}")
             
+    def _renovar_status(self, arquivos):
+        """Heartbeat: atualiza só a data de modificação dos arquivos de status
+        
+        Se o arquivo não tem mais o tamanho do que foi publicado, alguém o
+        sobrescreveu - o próximo envio regrava o documento completo.
+        """
+        for arquivo in arquivos:
+            try:
+                if os.path.exists(os.path.dirname(arquivo)):
+                    os.utime(arquivo)
+                    if os.stat(arquivo).st_size != self.tamanho_publicado:
+                        self.estado_publicado = None
+            except FileNotFoundError:
+                self.estado_publicado = None  # Arquivo apagado: regravar completo no próximo envio
+            except OSError:
+                pass
+    
+    def _obter_metricas(self):
+        """CPU/memória/disco, reamostrados a cada INTERVALO_METRICAS
+        
+        cpu_percent() sem intervalo mede desde a chamada anterior: com a cadência
+        própria vira a média dos últimos INTERVALO_METRICAS segundos.
+        """
+        agora = time.monotonic()
+        if self.metricas is None or agora >= self.proximas_metricas:
+            self.metricas = {
+                'cpu': psutil.cpu_percent(),
+                'memoria': psutil.virtual_memory().percent,
+                'disco': psutil.disk_usage('/').percent
+            }
+            self.proximas_metricas = agora + self.INTERVALO_METRICAS
+        return self.metricas
+    
+    def _obter_rede_local(self):
+        """(hostname, ip) em cache por INTERVALO_REDE_LOCAL - gethostbyname pode consultar o DNS"""
+        agora = time.monotonic()
+        if self._rede_local is None or agora >= self._rede_local[2]:
+            hostname = socket.gethostname()
+            try:
+                ip = socket.gethostbyname(hostname)
+            except:
+                ip = "127.0.0.1"
+            self._rede_local = (hostname, ip, agora + self.INTERVALO_REDE_LOCAL)
+        return self._rede_local[0], self._rede_local[1]
+    
     def _obter_ip_local(self):
         """Obtém IP local da máquina"""
-        try:
-            hostname = socket.gethostname()
-            return socket.gethostbyname(hostname)
-        except:
-            return "127.0.0.1"
+        return self._obter_rede_local()[1]
             
+    def _receber_comando_socket(self, comando_data):
+        """Chamado na thread da conexão TCP: só enfileira e acorda o loop de comunicação"""
+        maquina = self.maquina_atual
+        destino = comando_data.get('destino')
+        if destino is not None and maquina is not None and str(destino) != str(maquina):
+            return {'id': comando_data.get('id'), 'aceito': False, 'erro': f"esta é a máquina {maquina}"}
+        
+        self.fila_socket.append(comando_data)
+        if self.observador:
+            self.observador.notificar()
+        return {'id': comando_data.get('id'), 'aceito': True, 'maquina': maquina}
+    
     def _verificar_comandos(self):
-        """Verifica se há comandos para executar - A CADA 1ms (ULTRA RÁPIDO)"""
+        """Executa os comandos pendentes (canal direto + caixa de spool + arquivo legado) - chamado quando o observador acorda"""
         if not self.machine_config:
             return False
             
         try:
-            MAQUINA_ATUAL = self.machine_config.obter_configuracao_maquina()
-            
-            # Verificar REDE primeiro (prioridade)
-            comando_file_rede = os.path.join(CAMINHO_REDE, f"comando_maq_{MAQUINA_ATUAL}.json")
-            
-            # Verificar LOCAL também (fallback)
+            MAQUINA_ATUAL = self.maquina_atual or self._atualizar_maquina_atual()
             from config.settings import CAMINHO_LOCAL
-            comando_file_local = os.path.join(CAMINHO_LOCAL, f"comando_maq_{MAQUINA_ATUAL}.json")
             
-            # Lista de arquivos para verificar (ordem de prioridade)
-            arquivos_comando = []
-            if os.path.exists(comando_file_rede):
-                arquivos_comando.append(('REDE', comando_file_rede))
-            if os.path.exists(comando_file_local):
-                arquivos_comando.append(('LOCAL', comando_file_local))
+            def pendentes():
+                # Canal direto primeiro: executa antes de varrer o compartilhamento
+                while self.fila_socket:
+                    yield 'SOCKET', None, self.fila_socket.popleft()
+                # REDE primeiro (prioridade), LOCAL como fallback; dentro disso prioridade/chegada
+                yield from caixa_comandos.ler_pendentes([('REDE', CAMINHO_REDE), ('LOCAL', CAMINHO_LOCAL)], MAQUINA_ATUAL)
             
             # Processar todos os comandos encontrados
             comando_executado = False
             
-            for origem, comando_file in arquivos_comando:
+            for origem, comando_file, comando_data in pendentes():
                 try:
-                    # Verificar se arquivo não está vazio e foi escrito completamente
-                    if os.path.getsize(comando_file) == 0:
+                    if comando_data is None:
+                        print(f"⚠️ Arquivo de comando com JSON inválido ({origem}): {os.path.basename(comando_file)}")
+                        if caixa_comandos.remover(comando_file):
+                            print(f"🗑️ Arquivo corrompido removido: {comando_file}")
                         continue
-                        
-                    # Pequeno delay para garantir escrita completa
-                    time.sleep(0.002)
-                    
-                    with open(comando_file, 'r', encoding='utf-8') as f:
-                        comando_data = json.load(f)
                     
                     comando_id = comando_data.get('id', '')
                     acao = comando_data.get('acao', 'N/A')
@@ -263,7 +400,8 @@ class SistemaComunicacao:
                         self.comandos_ativos[comando_id] = True
                         
                         print(f"🔔 COMANDO RECEBIDO ({origem}): {acao} (ID: {comando_id[:8]}...)")
-                        print(f"📁 Arquivo: {comando_file}")
+                        if comando_file:
+                            print(f"📁 Arquivo: {comando_file}")
                         
                         # Log detalhado
                         try:
@@ -274,7 +412,7 @@ class SistemaComunicacao:
                         
                         # Executar comando IMEDIATAMENTE
                         try:
-                            self._executar_comando(comando_data)
+                            self._executar_comando(comando_data, origem)
                             print(f"✅ COMANDO EXECUTADO COM SUCESSO: {acao}")
                             
                             # Log sucesso
@@ -309,20 +447,9 @@ class SistemaComunicacao:
                             self.comandos_executados = self.comandos_executados[-100:]
                     
                     # Remover arquivo de comando após execução (SEMPRE)
-                    try:
-                        os.remove(comando_file)
+                    if comando_file and caixa_comandos.remover(comando_file):
                         print(f"🗑️ Arquivo de comando removido: {os.path.basename(comando_file)}")
-                    except Exception as e:
-                        print(f"⚠️ Erro ao remover arquivo de comando: {e}")
                         
-                except json.JSONDecodeError as e:
-                    print(f"⚠️ Arquivo de comando com JSON inválido ({origem}): {e}")
-                    # Remover arquivo corrompido
-                    try:
-                        os.remove(comando_file)
-                        print(f"🗑️ Arquivo corrompido removido: {comando_file}")
-                    except:
-                        pass
                 except Exception as e:
                     print(f"⚠️ Erro ao processar comando ({origem}): {e}")
             
@@ -334,57 +461,66 @@ class SistemaComunicacao:
                 print(f"⚠️ Erro crítico verificar comandos: {e}")
             return False
             
-    def _executar_comando(self, comando_data):
-        """Executa comando recebido"""
+    def _executar_comando(self, comando_data, origem=None):
+        """Executa comando recebido, publicando ack e resultado em resultados_comandos/<id>.json"""
+        registro = None
         try:
             acao = comando_data.get('acao', '')
             parametros = comando_data.get('parametros', {})
             
+            registro = resultado_comandos.novo_registro(comando_data, self.maquina_atual, origem)
+            self._publicar_resultado(registro)
+            
             print(f"🔧 Executando comando: {acao}")
             
-            if self.root_ref:
-                if acao == 'fechar_app':
-                    self.root_ref.after(0, lambda: self._comando_fechar_app(parametros))
-                elif acao == 'abrir_app':
-                    self.root_ref.after(0, lambda: self._comando_abrir_app(parametros))
-                elif acao == 'reiniciar_app':
-                    self.root_ref.after(0, lambda: self._comando_reiniciar_app(parametros))
-                elif acao == 'alterar_size':
-                    self.root_ref.after(0, lambda: self._comando_alterar_size(parametros))
-                elif acao == 'alterar_lote':
-                    self.root_ref.after(0, lambda: self._comando_alterar_lote(parametros))
-                elif acao == 'alterar_configuracao_maquina':
-                    self.root_ref.after(0, lambda: self._comando_alterar_configuracao_maquina(parametros))
-                elif acao == 'coletar_dados':
-                    self._comando_coletar_dados(parametros)
-                elif acao == 'fazer_backup':
-                    self._comando_fazer_backup(parametros)
-                elif acao == 'coletar_informacoes_sistema':
-                    self._comando_coletar_informacoes_sistema(parametros)
-                elif acao == 'executar_comando_sistema':
-                    self._comando_executar_comando_sistema(parametros)
-                elif acao == 'testar_conectividade':
-                    self._comando_testar_conectividade(parametros)
-                elif acao == 'obter_logs':
-                    self._comando_obter_logs(parametros)
-                elif acao == 'diagnostico_completo':
-                    self._comando_diagnostico_completo(parametros)
-                elif acao == 'limpar_cache':
-                    self._comando_limpar_cache(parametros)
-                elif acao == 'capturar_tela':
-                    self._comando_capturar_tela(parametros)
+            if not self.root_ref:
+                self._finalizar_registro(registro, erro="Interface não inicializada")
+            elif acao not in self.ACOES:
+                print(f"❌ Comando desconhecido: {acao}")
+                self._finalizar_registro(registro, erro=f"Comando desconhecido: {acao}")
+            else:
+                tratador = getattr(self, f"_comando_{acao}")
+                if acao in self.ACOES_INTERFACE:
+                    self.root_ref.after(0, lambda: self._executar_registrando(tratador, parametros, registro))
                 else:
-                    print(f"❌ Comando desconhecido: {acao}")
+                    self._executar_registrando(tratador, parametros, registro)
                 
         except Exception as e:
             print(f"❌ Erro executar comando: {e}")
+            if registro is not None:
+                self._finalizar_registro(registro, erro=str(e))
+    
+    def _executar_registrando(self, tratador, parametros, registro):
+        """Roda o tratador da ação carimbando início e fim no registro de resultado"""
+        resultado_comandos.marcar(registro, 'executando')
+        self._publicar_resultado(registro)
+        try:
+            retorno = tratador(parametros)
+        except Exception as e:
+            print(f"❌ Erro executar comando {registro.get('acao', '')}: {e}")
+            self._finalizar_registro(registro, erro=str(e))
+            return
+        self._finalizar_registro(registro, resultado=retorno)
+    
+    def _finalizar_registro(self, registro, resultado=None, erro=None):
+        resultado_comandos.marcar(registro, 'erro' if erro else 'concluido', resultado=resultado, erro=erro)
+        self._publicar_resultado(registro)
+        print(f"⏱️ Comando {registro.get('acao', '')}: {resultado_comandos.descrever(registro)}")
+    
+    def _publicar_resultado(self, registro):
+        """Grava o registro na base de onde o comando veio (rede ou local)"""
+        if not registro.get('id'):
+            return
+        from config.settings import CAMINHO_LOCAL
+        base = CAMINHO_LOCAL if registro.get('origem') == 'LOCAL' else CAMINHO_REDE
+        if not os.path.isdir(base):
+            base = CAMINHO_LOCAL
+        resultado_comandos.gravar_resultado(base, registro)
     
     def _comando_fechar_app(self, parametros):
         """Fecha aplicação"""
         print("🛑 Recebido comando: FECHAR APP")
         
-        from tkinter import messagebox
-        
         # Mostrar confirmação SEMPRE NO TOPO
         if self.root_ref:
             # Criar janela de confirmação
@@ -493,6 +629,7 @@ class SistemaComunicacao:
         
         if nova_maquina and self.machine_config:
             self.machine_config.salvar_configuracao_maquina(nova_maquina)
+            self._atualizar_maquina_atual()
             print(f"✅ Máquina alterada: {nova_maquina}")
     
     def _comando_coletar_dados(self, parametros):
@@ -512,7 +649,7 @@ class SistemaComunicacao:
                 'cpu_percent': psutil.cpu_percent(),
                 'memory_percent': psutil.virtual_memory().percent,
                 'disk_percent': psutil.disk_usage('/').percent,
-                'total_registros': len(self.data_manager.df) if self.data_manager.df is not None else 0,
+                'total_registros': self.data_manager.total_registros(),
                 'total_usuarios': len(self.data_manager.df_users) if self.data_manager.df_users is not None else 0
             }
             
@@ -521,8 +658,10 @@ class SistemaComunicacao:
                 json.dump(info_sistema, f, indent=2, ensure_ascii=False)
                 
             print(f"📊 Dados coletados salvos em: {dados_file}")
+            return dados_file
         except Exception as e:
             print(f"❌ Erro coletar dados: {e}")
+            raise  # Vai para o registro de resultado como 'erro'
     
     def _comando_fazer_backup(self, parametros):
         """Faz backup dos dados"""
@@ -547,8 +686,10 @@ class SistemaComunicacao:
                         zipf.write(arquivo, os.path.basename(arquivo))
                         
             print(f"💾 Backup criado: {backup_file}")
+            return backup_file
         except Exception as e:
             print(f"❌ Erro criar backup: {e}")
+            raise
     
     def _comando_coletar_informacoes_sistema(self, parametros):
         """Coleta informações detalhadas do sistema"""
@@ -586,7 +727,7 @@ class SistemaComunicacao:
                     'total_caixas': config_lote.get('total_caixas', 0)
                 },
                 'estatisticas': {
-                    'total_registros': len(self.data_manager.df) if self.data_manager.df is not None else 0,
+                    'total_registros': self.data_manager.total_registros(),
                     'total_usuarios': len(self.data_manager.df_users) if self.data_manager.df_users is not None else 0,
                     'total_logs': len(self.data_manager.df_log) if self.data_manager.df_log is not None else 0
                 },
@@ -601,8 +742,10 @@ class SistemaComunicacao:
                 json.dump(info_detalhada, f, indent=2, ensure_ascii=False)
                 
             print(f"🔍 Informações salvas em: {info_file}")
+            return info_file
         except Exception as e:
             print(f"❌ Erro coletar informações: {e}")
+            raise
     
     def _comando_executar_comando_sistema(self, parametros):
         """Executa comando do sistema operacional"""
@@ -627,8 +770,11 @@ class SistemaComunicacao:
                         f.write(f"Erros:\n{resultado.stderr}\n")
                         
                 print(f"⚙️ Resultado salvo em: {resultado_file}")
+                return {'arquivo': resultado_file, 'returncode': resultado.returncode}
+            return {'returncode': resultado.returncode}
         except Exception as e:
             print(f"❌ Erro executar comando: {e}")
+            raise
     
     def _comando_testar_conectividade(self, parametros):
         """Testa conectividade com rede e serviços"""
@@ -673,8 +819,10 @@ class SistemaComunicacao:
                 f.write("\n".join(resultados))
             
             print(f"🌐 Resultados salvos em: {resultado_file}")
+            return resultado_file
         except Exception as e:
             print(f"❌ Erro testar conectividade: {e}")
+            raise
     
     def _comando_obter_logs(self, parametros):
         """Obtém e envia logs do sistema"""
@@ -705,8 +853,10 @@ class SistemaComunicacao:
                     f.write(f"{cmd['timestamp']} | {cmd['acao']} (ID: {cmd['id']})\n")
             
             print(f"📋 Logs salvos em: {logs_file}")
+            return logs_file
         except Exception as e:
             print(f"❌ Erro obter logs: {e}")
+            raise
     
     def _comando_diagnostico_completo(self, parametros):
         """Executa diagnóstico completo do sistema"""
@@ -743,7 +893,7 @@ class SistemaComunicacao:
                     'comandos_executados': len(self.comandos_executados)
                 },
                 'dados': {
-                    'registros_producao': len(self.data_manager.df) if self.data_manager.df is not None else 0,
+                    'registros_producao': self.data_manager.total_registros(),
                     'usuarios_cadastrados': len(self.data_manager.df_users) if self.data_manager.df_users is not None else 0,
                     'logs_sistema': len(self.data_manager.df_log) if self.data_manager.df_log is not None else 0
                 }
@@ -754,8 +904,10 @@ class SistemaComunicacao:
                 json.dump(diagnostico, f, indent=2, ensure_ascii=False)
             
             print(f"🔧 Diagnóstico salvo em: {diag_file}")
+            return diag_file
         except Exception as e:
             print(f"❌ Erro diagnóstico: {e}")
+            raise
     
     def _comando_limpar_cache(self, parametros):
         """Limpa cache e arquivos temporários"""
@@ -774,8 +926,10 @@ class SistemaComunicacao:
                         pass
             
             print(f"🧹 Cache limpo: {arquivos_removidos} arquivos removidos")
+            return arquivos_removidos
         except Exception as e:
             print(f"❌ Erro limpar cache: {e}")
+            raise
     
     def _comando_capturar_tela(self, parametros):
         """Captura a tela da máquina remota"""
@@ -800,7 +954,7 @@ class SistemaComunicacao:
                 screenshot = pyautogui.screenshot()
                 screenshot.save(screenshot_file)
                 print(f"📸 Screenshot salvo (pyautogui): {screenshot_file}")
-                return
+                return screenshot_file
             except ImportError:
                 print("⚠️ pyautogui não disponível, tentando método alternativo...")
             except Exception as e:
@@ -812,7 +966,7 @@ class SistemaComunicacao:
                 screenshot = ImageGrab.grab()
                 screenshot.save(screenshot_file)
                 print(f"📸 Screenshot salvo (PIL): {screenshot_file}")
-                return
+                return screenshot_file
             except ImportError:
                 print("⚠️ PIL não disponível, tentando PowerShell...")
             except Exception as e:
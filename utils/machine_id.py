@@ -8,8 +8,19 @@ import json
 import datetime
 from config.settings import CAMINHO_LOCAL
 
-def gerar_id_computador_avancado():
-    """Gera ID único baseado em múltiplos componentes de hardware"""
+# ID calculado uma vez por processo (sondagem de hardware + gravação do arquivo)
+_id_em_cache = None
+
+def gerar_id_computador_avancado(atualizar=False):
+    """Gera ID único baseado em múltiplos componentes de hardware
+    
+    O hardware não muda com o app aberto: o ID é calculado na primeira chamada
+    e reaproveitado; atualizar=True força nova sondagem.
+    """
+    global _id_em_cache
+    if _id_em_cache is not None and not atualizar:
+        return _id_em_cache
+    
     try:
         info_parts = []
         
@@ -60,6 +71,7 @@ def gerar_id_computador_avancado():
         with open(id_file, 'w', encoding='utf-8') as f:
             json.dump(info_detalhada, f, indent=2, ensure_ascii=False)
             
+        _id_em_cache = machine_id
         return machine_id
         
     except Exception as e:
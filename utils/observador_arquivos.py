@@ -0,0 +1,265 @@
+"""Observador de arquivos de comando - acorda a thread só quando o arquivo aparece
+
+Backend preferido: watchdog (inotify no Linux, ReadDirectoryChangesW no Windows).
+Pastas que ele não consegue observar (watchdog ausente, compartilhamento
+indisponível na partida) caem no polling com intervalo adaptativo: 1ms logo
+após um comando, dobrando até INTERVALO_MAXIMO enquanto ocioso.
+
+Em compartilhamentos de rede (SMB/CIFS/NFS) escritas feitas por outra máquina
+podem não gerar evento nenhum: essas pastas ficam no watchdog e também no
+polling adaptativo. Uma pasta local em que a varredura de segurança encontra
+arquivo sem ter recebido evento passa para o polling do mesmo jeito.
+"""
+
+import os
+import threading
+import time
+
+# Tipos de sistema de arquivos (Linux, /proc/mounts) em que eventos de escritas remotas não chegam
+SISTEMAS_REDE = frozenset({'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs', '9p'})
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_DISPONIVEL = True
+except ImportError:
+    WATCHDOG_DISPONIVEL = False
+    FileSystemEventHandler = object
+
+
+class _TratadorEventos(FileSystemEventHandler):
+    """Repassa ao observador os eventos dos arquivos de interesse"""
+
+    def __init__(self, observador):
+        super().__init__()
+        self.observador = observador
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type == 'deleted':
+            return  # Remoção do arquivo já processado não é comando novo
+        caminhos = [event.src_path, getattr(event, 'dest_path', '')]
+        if any(c and self.observador.observa(c) for c in caminhos):
+            self.observador.notificar(os.path.dirname(event.src_path))
+
+
+class ObservadorComandos:
+    """Espera eficiente por arquivos com nomes conhecidos em uma ou mais pastas
+
+    Além dos nomes fixos, pastas de "caixa" (spool) podem ser observadas:
+    qualquer .json que surgir nelas acorda quem espera.
+
+    Uso:
+        observador = ObservadorComandos([CAMINHO_REDE, CAMINHO_LOCAL])
+        observador.definir_nomes(["comando_maq_201.json"])
+        observador.definir_caixas([pasta_caixa(CAMINHO_REDE, 201)])
+        observador.iniciar()
+        while ...:
+            if observador.aguardar(timeout=1.0):
+                ...processar arquivos...
+    """
+
+    INTERVALO_MINIMO = 0.001     # Polling logo após atividade (mesma latência do loop antigo)
+    INTERVALO_MAXIMO = 0.1       # Polling ocioso
+    INTERVALO_SEGURANCA = 1.0    # Varredura de garantia nas pastas observadas (SMB pode não notificar)
+
+    def __init__(self, diretorios, nomes=(), caixas=()):
+        self.diretorios = [d for d in dict.fromkeys(diretorios) if d]
+        self._nomes = frozenset(nomes)
+        self._caixas = []
+        self._chaves_caixas = frozenset()
+        self._evento = threading.Event()
+        self._observer = None
+        self._tratador = None
+        self._observadas = set()
+        self._polling = set()        # Observadas pelo watchdog que também ficam no polling
+        self._eventos = {}           # Pasta -> instante do último evento do watchdog
+        self._intervalo = self.INTERVALO_MINIMO
+        self._proxima_varredura = 0.0
+        self._proxima_seguranca = 0.0
+        self.definir_caixas(caixas)
+
+    @property
+    def pastas(self):
+        return self.diretorios + self._caixas
+
+    @property
+    def modo(self):
+        if not self._observadas:
+            return "polling adaptativo"
+        if len(self._observadas) < len(self.pastas) or self._polling:
+            return "watchdog + polling adaptativo"
+        return "watchdog"
+
+    def definir_nomes(self, nomes):
+        """Troca os nomes de arquivo observados (ex.: máquina reconfigurada)"""
+        nomes = frozenset(nomes)
+        if nomes != self._nomes:
+            self._nomes = nomes
+            self._proxima_varredura = 0.0
+            self.notificar()
+
+    def definir_caixas(self, pastas):
+        """Troca as pastas de spool observadas (novas entram no watchdog se ele estiver ativo)"""
+        pastas = [p for p in dict.fromkeys(pastas) if p]
+        if pastas == self._caixas:
+            return
+        self._caixas = pastas
+        self._chaves_caixas = frozenset(_chave(p) for p in pastas)
+        if self._observer is not None:
+            for pasta in pastas:
+                self._observar(pasta)
+        self._proxima_varredura = 0.0
+        self.notificar()
+
+    def observa(self, caminho):
+        if os.path.basename(caminho) in self._nomes:
+            return True
+        return caminho.endswith('.json') and _chave(os.path.dirname(caminho)) in self._chaves_caixas
+
+    def notificar(self, pasta=None):
+        """Acorda quem está em aguardar() (eventos do watchdog ou comandos gerados localmente)"""
+        if pasta is not None:
+            self._eventos[_chave(pasta)] = time.monotonic()
+        self._evento.set()
+
+    def iniciar(self):
+        """Liga o watchdog nas pastas existentes; as demais ficam no polling"""
+        if self._observer is not None or not WATCHDOG_DISPONIVEL:
+            print(f"👁️ Observador de comandos: {self.modo}")
+            return self._observer is not None
+
+        try:
+            self._observer = Observer()
+            self._tratador = _TratadorEventos(self)
+            for pasta in self.pastas:
+                self._observar(pasta)
+
+            if self._observadas:
+                self._observer.daemon = True
+                self._observer.start()
+            else:
+                self._observer = None
+        except Exception as e:
+            print(f"⚠️ Erro ao iniciar watchdog: {e}")
+            self._observer = None
+            self._observadas.clear()
+
+        print(f"👁️ Observador de comandos: {self.modo}")
+        return self._observer is not None
+
+    def _observar(self, pasta):
+        if pasta in self._observadas:
+            return
+        try:
+            if os.path.isdir(pasta):
+                self._observer.schedule(self._tratador, pasta, recursive=False)
+                self._observadas.add(pasta)
+                if _pasta_de_rede(pasta):
+                    self._polling.add(pasta)
+                    print(f"👁️ {pasta} é compartilhamento de rede - watchdog + polling adaptativo")
+        except Exception as e:
+            print(f"⚠️ Watchdog indisponível para {pasta}: {e}")
+
+    def parar(self):
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=2)
+            except Exception:
+                pass
+            self._observer = None
+        self._observadas.clear()
+        self._polling.clear()
+        self.notificar()
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até um arquivo observado surgir/mudar (True) ou o timeout acabar (False)"""
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            if time.monotonic() >= self._proxima_varredura and self._varrer():
+                return True
+
+            espera = max(0.0, self._proxima_varredura - time.monotonic())
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                espera = min(espera, restante)
+
+            if self._evento.wait(espera):
+                self._evento.clear()
+                return True
+
+    def _varrer(self):
+        """Confere a existência dos arquivos; ajusta o intervalo do polling"""
+        agora = time.monotonic()
+        nao_observadas = [p for p in self.pastas if p not in self._observadas or p in self._polling]
+        seguranca = agora >= self._proxima_seguranca
+        pastas = self.pastas if seguranca else nao_observadas
+
+        com_arquivo = [p for p in pastas if self._tem_arquivo(p)]
+        encontrou = bool(com_arquivo)
+
+        if seguranca:
+            # Arquivo parado numa pasta do watchdog sem evento recente: ele não está recebendo
+            # as escritas (ex.: rede não detectada) - a pasta passa para o polling
+            for pasta in com_arquivo:
+                if pasta in nao_observadas or agora - self._eventos.get(_chave(pasta), float('-inf')) < self.INTERVALO_SEGURANCA:
+                    continue
+                self._polling.add(pasta)
+                nao_observadas.append(pasta)
+                print(f"⚠️ Watchdog sem eventos em {pasta} - voltando ao polling adaptativo")
+            self._proxima_seguranca = agora + self.INTERVALO_SEGURANCA
+        if nao_observadas:
+            self._intervalo = self.INTERVALO_MINIMO if encontrou else min(self._intervalo * 2, self.INTERVALO_MAXIMO)
+            self._proxima_varredura = agora + self._intervalo
+        else:
+            self._proxima_varredura = self._proxima_seguranca
+        return encontrou
+
+    def _tem_arquivo(self, pasta):
+        if pasta in self._caixas and _tem_json(pasta):
+            return True
+        return pasta in self.diretorios and any(os.path.exists(os.path.join(pasta, nome)) for nome in self._nomes)
+
+
+def _chave(pasta):
+    return os.path.normcase(os.path.abspath(pasta))
+
+
+def _tem_json(pasta):
+    try:
+        with os.scandir(pasta) as entradas:
+            return any(e.name.endswith('.json') for e in entradas)
+    except OSError:
+        return False
+
+
+def _pasta_de_rede(pasta):
+    """True para pastas em compartilhamento de rede (unidade mapeada/UNC no Windows, cifs/nfs no Linux)"""
+    caminho = os.path.realpath(pasta)
+    if os.name == 'nt':
+        if caminho.startswith('\\\\'):
+            return True
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(caminho)[0] + '\\') == DRIVE_REMOTE
+        except Exception:
+            return False
+
+    # Ponto de montagem mais específico que contém a pasta
+    montagem, tipo = '', ''
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            for linha in f:
+                campos = linha.split()
+                if len(campos) < 3:
+                    continue
+                ponto = campos[1]
+                if (caminho == ponto or caminho.startswith(ponto.rstrip('/') + '/')) and len(ponto) > len(montagem):
+                    montagem, tipo = ponto, campos[2]
+    except OSError:
+        return False
+    return tipo in SISTEMAS_REDE
@@ -0,0 +1,224 @@
+"""Confirmação (ack) e resultado de comandos remotos - um registro por ID de comando
+
+A máquina que recebe o comando grava <base>/resultados_comandos/<id>.json ao
+receber, ao iniciar e ao terminar a execução:
+
+    {
+        "id": ..., "acao": ..., "maquina": ..., "origem": "REDE",
+        "estado": "recebido" | "executando" | "concluido" | "erro",
+        "enviado_em": 1718000000.123,   # epoch (relógio do remetente)
+        "recebido_em": ..., "iniciado_em": ..., "concluido_em": ...,
+        "latencias_ms": {"entrega": ..., "fila": ..., "execucao": ..., "total": ...},
+        "resultado": ...,   # retorno do comando (ex.: arquivo gerado)
+        "erro": ...
+    }
+
+O remetente espera com aguardar_resultado(id, timeout). "entrega" e "total"
+comparam relógios de máquinas diferentes - só são exatos com os relógios
+sincronizados (NTP/domínio).
+"""
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+from config.settings import CAMINHO_REDE, CAMINHO_LOCAL
+
+PASTA_RESULTADOS = "resultados_comandos"
+ESTADOS_FINAIS = ('concluido', 'erro')
+
+# Registros mais antigos que isso são apagados na partida do receptor
+IDADE_MAXIMA_RESULTADO = 24 * 3600
+
+INTERVALO_CONSULTA_MINIMO = 0.005
+INTERVALO_CONSULTA_MAXIMO = 0.2
+
+
+def pasta_resultados(base):
+    return os.path.join(base, PASTA_RESULTADOS)
+
+
+def arquivo_resultado(base, comando_id):
+    return os.path.join(pasta_resultados(base), f"{comando_id}.json")
+
+
+def novo_registro(comando, maquina, origem=None):
+    """Registro no estado 'recebido' para o comando que acabou de chegar"""
+    enviado_em = comando.get('enviado_em')
+    if not isinstance(enviado_em, (int, float)):
+        # Remetente antigo: só tem o timestamp ISO (hora local)
+        try:
+            enviado_em = datetime.datetime.fromisoformat(comando.get('timestamp', '')).timestamp()
+        except (TypeError, ValueError):
+            enviado_em = None
+
+    return marcar({
+        'id': comando.get('id', ''),
+        'acao': comando.get('acao', ''),
+        'maquina': maquina,
+        'origem': origem,
+        'estado': 'recebido',
+        'enviado_em': enviado_em,
+        'recebido_em': time.time(),
+        'iniciado_em': None,
+        'concluido_em': None,
+        'latencias_ms': {},
+        'resultado': None,
+        'erro': None,
+    }, 'recebido')
+
+
+def marcar(registro, estado, resultado=None, erro=None):
+    """Avança o estado do registro, carimbando o instante e recalculando as latências"""
+    agora = time.time()
+    registro['estado'] = estado
+    if estado == 'executando':
+        registro['iniciado_em'] = agora
+    elif estado in ESTADOS_FINAIS:
+        registro['concluido_em'] = agora
+        if registro['iniciado_em'] is None:
+            registro['iniciado_em'] = agora
+        registro['resultado'] = resultado
+        registro['erro'] = erro
+
+    def ms(inicio, fim):
+        if registro[inicio] is None or registro[fim] is None:
+            return None
+        return round((registro[fim] - registro[inicio]) * 1000, 1)
+
+    registro['latencias_ms'] = {
+        'entrega': ms('enviado_em', 'recebido_em'),
+        'fila': ms('recebido_em', 'iniciado_em'),
+        'execucao': ms('iniciado_em', 'concluido_em'),
+        'total': ms('enviado_em', 'concluido_em'),
+    }
+    return registro
+
+
+def gravar_resultado(base, registro):
+    """Grava o registro (temporário + rename, o leitor nunca vê JSON pela metade)"""
+    try:
+        pasta = pasta_resultados(base)
+        os.makedirs(pasta, exist_ok=True)
+        final = arquivo_resultado(base, registro['id'])
+        temporario = final + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(registro, f, ensure_ascii=False, default=str)
+        os.replace(temporario, final)
+        return True
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar resultado do comando {registro.get('id', '')[:8]}: {e}")
+        return False
+
+
+def ler_resultado(comando_id, bases=None):
+    """Registro mais avançado do comando entre as bases (None se ainda não há)"""
+    melhor = None
+    for base in bases or (CAMINHO_REDE, CAMINHO_LOCAL):
+        try:
+            with open(arquivo_resultado(base, comando_id), 'r', encoding='utf-8') as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if melhor is None or _ordem_estado(registro) > _ordem_estado(melhor):
+            melhor = registro
+    return melhor
+
+
+def aguardar_resultado(comando_id, timeout=30.0, bases=None, estados=ESTADOS_FINAIS):
+    """Bloqueia até o registro do comando chegar a um dos `estados` ou o timeout acabar
+
+    Consulta o arquivo com intervalo adaptativo (5ms após uma mudança, dobrando
+    até 200ms) - as latências medidas vêm dos carimbos do receptor, não daqui.
+
+    Returns:
+        O último registro lido - pode estar em estado intermediário (ex.:
+        'recebido') se o timeout venceu - ou None se a máquina nem confirmou.
+    """
+    bases = list(bases or (CAMINHO_REDE, CAMINHO_LOCAL))
+    limite = time.monotonic() + timeout
+    intervalo = INTERVALO_CONSULTA_MINIMO
+    registro = None
+
+    while True:
+        atual = ler_resultado(comando_id, bases)
+        if atual is not None:
+            if atual.get('estado') in estados:
+                return atual
+            if registro is None or atual.get('estado') != registro.get('estado'):
+                intervalo = INTERVALO_CONSULTA_MINIMO
+            registro = atual
+
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return registro
+        time.sleep(min(intervalo, restante))
+        intervalo = min(intervalo * 2, INTERVALO_CONSULTA_MAXIMO)
+
+
+def acompanhar_resultado(widget, comando_id, ao_receber, timeout=30.0, bases=None):
+    """Espera o resultado numa thread e chama ao_receber(registro) na thread do Tk
+
+    O retorno chega por uma fila consultada com widget.after, então
+    ao_receber pode mexer na interface.
+    """
+    fila = queue.Queue()
+    threading.Thread(
+        target=lambda: fila.put(aguardar_resultado(comando_id, timeout, bases)),
+        daemon=True,
+    ).start()
+
+    def verificar():
+        try:
+            registro = fila.get_nowait()
+        except queue.Empty:
+            try:
+                widget.after(100, verificar)
+            except Exception:
+                pass  # Janela fechada antes da resposta
+            return
+        ao_receber(registro)
+
+    widget.after(100, verificar)
+
+
+def descrever(registro):
+    """Resumo de uma linha para log/mensagens"""
+    if registro is None:
+        return "sem confirmação da máquina"
+    latencias = registro.get('latencias_ms') or {}
+    partes = [f"{registro.get('estado', '?')}"]
+    for chave, rotulo in (('entrega', 'entrega'), ('fila', 'fila'), ('execucao', 'execução'), ('total', 'total')):
+        if latencias.get(chave) is not None:
+            partes.append(f"{rotulo} {latencias[chave]:.0f}ms")
+    if registro.get('erro'):
+        partes.append(f"erro: {registro['erro']}")
+    return " | ".join(partes)
+
+
+def limpar_antigos(base, idade_maxima=IDADE_MAXIMA_RESULTADO):
+    """Apaga registros de resultado mais antigos que idade_maxima (segundos)"""
+    removidos = 0
+    limite = time.time() - idade_maxima
+    try:
+        with os.scandir(pasta_resultados(base)) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_file() and entrada.stat().st_mtime < limite:
+                        os.remove(entrada.path)
+                        removidos += 1
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return removidos
+
+
+def _ordem_estado(registro):
+    estado = registro.get('estado')
+    if estado in ESTADOS_FINAIS:
+        return 2
+    return 1 if estado == 'executando' else 0
@@ -0,0 +1,210 @@
+"""Índice de status da frota - um único arquivo com o último status de cada máquina
+
+Cada coletor mescla o próprio status em <base>/status_frota.json quando o
+estado muda e a cada INTERVALO_HEARTBEAT (lê, troca a sua entrada, grava
+temporário + rename). Monitores leem o arquivo inteiro em uma operação, em vez
+de listar a pasta e abrir todos os status_maq_*.json.
+
+A mescla roda sob a trava status_frota.json.lock (criada com O_EXCL, que vale
+também no compartilhamento SMB): dois coletores publicando juntos não apagam a
+entrada um do outro. Se a trava não vier a tempo a publicação fica para o
+próximo heartbeat; maquinas_online ainda confere o status_maq_<N>.json das
+máquinas que o índice mostra como offline.
+
+Formato:
+    {"atualizado_em": "...", "maquinas": {"201": {...status...}, ...}}
+"""
+
+import datetime
+import json
+import os
+import time
+
+from config.constants import MAQUINAS_VALIDAS
+from config.settings import FROTA_FILE
+
+IDADE_MAXIMA_ENTRADA = 7 * 86400  # máquinas sem status há uma semana saem do índice
+TENTATIVAS_GRAVACAO = 3
+ESPERA_TRAVA = 1.0       # segundos tentando obter a trava antes de deixar para a próxima publicação
+TRAVA_EXPIRADA = 10.0    # segundos - trava deixada por um coletor que caiu no meio da gravação
+
+# Campos do status que não vão para o índice (só no arquivo da própria máquina)
+CAMPOS_OMITIDOS = ('comandos_executados',)
+
+
+def arquivo_frota(base):
+    return os.path.join(base, FROTA_FILE)
+
+
+def ler_frota(base):
+    """Entradas do índice {maquina: status}, ou None se o índice não existe/é ilegível"""
+    try:
+        with open(arquivo_frota(base), 'r', encoding='utf-8') as f:
+            conteudo = json.load(f)
+        maquinas = conteudo.get('maquinas')
+        return maquinas if isinstance(maquinas, dict) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def publicar_status(base, maquina, status):
+    """Mescla o status da máquina no índice da base sob trava (temporário + rename)"""
+    if not os.path.isdir(base):
+        return False
+
+    trava = arquivo_frota(base) + ".lock"
+    if not _adquirir_trava(trava):
+        return False
+    try:
+        return _mesclar_status(base, maquina, {k: v for k, v in status.items() if k not in CAMPOS_OMITIDOS})
+    finally:
+        _liberar_trava(trava)
+
+
+def _mesclar_status(base, maquina, entrada):
+    maquinas = ler_frota(base) or {}
+    # Entrada já mais nova no índice (ex.: outra instância da mesma máquina) é mantida
+    atual = maquinas.get(str(maquina))
+    idade_atual, idade_nova = idade_segundos(atual or {}), idade_segundos(entrada)
+    if idade_atual is None or idade_nova is None or idade_nova <= idade_atual:
+        maquinas[str(maquina)] = entrada
+
+    # Descarta máquinas desativadas há muito tempo
+    for chave in [m for m, s in maquinas.items() if (idade_segundos(s) or 0) > IDADE_MAXIMA_ENTRADA]:
+        del maquinas[chave]
+
+    conteudo = {'atualizado_em': datetime.datetime.now().isoformat(), 'maquinas': maquinas}
+    caminho = arquivo_frota(base)
+    temporario = f"{caminho}.{maquina}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(conteudo, f, ensure_ascii=False, separators=(',', ':'))
+    except OSError as e:
+        print(f"⚠️ Erro ao gravar índice da frota: {e}")
+        return False
+
+    # No Windows o rename falha enquanto um monitor está lendo o arquivo
+    for tentativa in range(TENTATIVAS_GRAVACAO):
+        try:
+            os.replace(temporario, caminho)
+            return True
+        except PermissionError:
+            time.sleep(0.05 * (tentativa + 1))
+        except OSError as e:
+            print(f"⚠️ Erro ao publicar índice da frota: {e}")
+            break
+
+    try:
+        os.remove(temporario)
+    except OSError:
+        pass
+    return False
+
+
+def _adquirir_trava(trava):
+    limite = time.monotonic() + ESPERA_TRAVA
+    while True:
+        try:
+            os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(trava) > TRAVA_EXPIRADA:
+                    os.remove(trava)
+                    continue
+            except OSError:
+                continue  # Liberada entre as duas chamadas
+        except OSError as e:
+            print(f"⚠️ Erro ao travar índice da frota: {e}")
+            return False
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(0.02)
+
+
+def _liberar_trava(trava):
+    try:
+        os.remove(trava)
+    except OSError:
+        pass
+
+
+def ler_status_maquinas(base):
+    """{maquina: status} da base - do índice; sem índice, dos arquivos status_maq_*.json"""
+    maquinas = ler_frota(base)
+    if maquinas is not None:
+        return maquinas
+    return _ler_arquivos_status(base)
+
+
+def idade_segundos(status):
+    """Segundos desde o último status (None se o timestamp falta ou é inválido)"""
+    try:
+        timestamp = datetime.datetime.fromisoformat(status['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (datetime.datetime.now() - timestamp).total_seconds()
+
+
+def maquinas_online(bases, idade_maxima):
+    """{maquina: status} das máquinas com status mais novo que idade_maxima (primeira base vence)
+
+    Máquina ausente ou atrasada no índice (publicação que não conseguiu a
+    trava) é conferida no próprio status_maq_<N>.json.
+    """
+    online = {}
+    for base in bases:
+        status_base = ler_status_maquinas(base)
+        for maquina in list(status_base) + [m for m in MAQUINAS_VALIDAS if m not in status_base]:
+            if maquina in online:
+                continue
+            status = status_base.get(maquina)
+            idade = idade_segundos(status) if status else None
+            if idade is None or idade >= idade_maxima:
+                status = _ler_arquivo_status(os.path.join(base, f"status_maq_{maquina}.json"), idade_maxima) or status
+                idade = idade_segundos(status) if status else None
+            if idade is not None and idade < idade_maxima:
+                online[maquina] = status
+    return online
+
+
+def _ler_arquivos_status(base):
+    """Fallback sem índice: lista a pasta e abre cada status_maq_*.json
+
+    O heartbeat só renova a data de modificação do arquivo, então o timestamp
+    considerado é o mais novo entre o do conteúdo e o do arquivo.
+    """
+    maquinas = {}
+    try:
+        entradas = list(os.scandir(base))
+    except OSError:
+        return maquinas
+
+    for entrada in entradas:
+        nome = entrada.name
+        if nome.startswith('status_maq_') and nome.endswith('.json'):
+            status = _ler_arquivo_status(entrada.path)
+            if status is not None:
+                maquinas[nome[len('status_maq_'):-len('.json')]] = status
+    return maquinas
+
+
+def _ler_arquivo_status(caminho, idade_maxima=None):
+    """Status de um status_maq_<N>.json com o timestamp renovado pela data do arquivo
+
+    Com idade_maxima, arquivo modificado há mais tempo que isso nem é aberto (None).
+    """
+    try:
+        modificado = os.path.getmtime(caminho)
+        if idade_maxima is not None and time.time() - modificado >= idade_maxima:
+            return None
+        with open(caminho, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(status, dict):
+        return None
+    modificado = datetime.datetime.fromtimestamp(modificado).isoformat()
+    if modificado > str(status.get('timestamp', '')):
+        status['timestamp'] = modificado
+    return status
@@ -0,0 +1,97 @@
+"""Envio de um comando para várias máquinas em paralelo, com timeout por alvo
+
+Uso:
+    resultados = transmitir(maquinas, lambda maq: enviar_comando(maq, acao))
+    print(resumo_transmissao(resultados))
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+TIMEOUT_POR_ALVO = 5.0     # segundos
+MAX_TRABALHADORES = 32
+INTERVALO_VERIFICACAO = 0.05  # granularidade da checagem de timeout
+
+
+def transmitir(alvos, enviar, timeout=TIMEOUT_POR_ALVO, max_trabalhadores=MAX_TRABALHADORES):
+    """Chama enviar(alvo) para todos os alvos em paralelo
+
+    O timeout conta a partir do início do envio daquele alvo. Um envio que
+    estoura o prazo é reportado como falha, mas a thread não é interrompida:
+    o comando ainda pode chegar depois.
+
+    Args:
+        enviar: Função enviar(alvo) -> valor verdadeiro em caso de sucesso
+                (ex.: ID do comando); falso ou exceção = falha
+
+    Returns:
+        Lista na ordem dos alvos, um dict por alvo:
+        {'maquina', 'sucesso', 'retorno', 'latencia_ms', 'erro'}
+    """
+    alvos = list(dict.fromkeys(alvos))
+    if not alvos:
+        return []
+
+    inicio_envio = {}
+
+    def tarefa(alvo):
+        inicio = inicio_envio[alvo] = time.perf_counter()
+        try:
+            retorno = enviar(alvo)
+            erro = None if retorno else "falha no envio"
+        except Exception as e:
+            retorno, erro = None, str(e)
+        return _resultado(alvo, erro is None, retorno, (time.perf_counter() - inicio) * 1000, erro)
+
+    resultados = {}
+    executor = ThreadPoolExecutor(max_workers=min(max_trabalhadores, len(alvos)),
+                                  thread_name_prefix="transmissao")
+    try:
+        futuros = {executor.submit(tarefa, alvo): alvo for alvo in alvos}
+        pendentes = set(futuros)
+
+        while pendentes:
+            prontos, pendentes = wait(pendentes, timeout=INTERVALO_VERIFICACAO, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                resultados[futuros[futuro]] = futuro.result()
+
+            agora = time.perf_counter()
+            for futuro in list(pendentes):
+                alvo = futuros[futuro]
+                inicio = inicio_envio.get(alvo)
+                if inicio is not None and agora - inicio >= timeout:
+                    pendentes.discard(futuro)
+                    resultados[alvo] = _resultado(alvo, False, None, (agora - inicio) * 1000,
+                                                  f"timeout ({timeout:g}s)")
+    finally:
+        executor.shutdown(wait=False)
+
+    return [resultados[alvo] for alvo in alvos]
+
+
+def resumo_transmissao(resultados):
+    """Relatório em texto: uma linha por máquina + totais e latências"""
+    linhas = []
+    for r in resultados:
+        if r['sucesso']:
+            linhas.append(f"  ✅ {r['maquina']:<15} {r['latencia_ms']:>8.1f}ms")
+        else:
+            linhas.append(f"  ❌ {r['maquina']:<15} {r['latencia_ms']:>8.1f}ms  {r['erro']}")
+
+    sucessos = [r['latencia_ms'] for r in resultados if r['sucesso']]
+    linhas.append(f"📊 {len(sucessos)}/{len(resultados)} enviados com sucesso")
+    if sucessos:
+        linhas.append(f"⏱️ Latência: mín {min(sucessos):.1f}ms | mediana {statistics.median(sucessos):.1f}ms"
+                      f" | máx {max(sucessos):.1f}ms")
+    return "\n".join(linhas)
+
+
+def _resultado(alvo, sucesso, retorno, latencia_ms, erro):
+    return {
+        'maquina': alvo,
+        'sucesso': sucesso,
+        'retorno': retorno,
+        'latencia_ms': round(latencia_ms, 1),
+        'erro': erro,
+    }